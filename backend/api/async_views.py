@@ -0,0 +1,302 @@
+import asyncio
+from calendar import timegm
+from collections import OrderedDict, defaultdict
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import InvalidPage
+from django.db import close_old_connections
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import exceptions, status
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.settings import api_settings
+
+from menu.ingredient_index import ingredient_index
+from menu.models import Favorite, Recipe, ShoppingCart, Tag
+from user.models import Subscription, User
+from .cache import recipe_cache
+from .catalog import (catalog_etag, catalog_last_modified,
+                      get_catalog_version, patch_catalog_cache_control)
+from .filters import IngredientFilter, RecipeFilter
+from .pagination import LimitPagination
+from .serializers import (ShowSubscriptionsSerializer, TagSerializer,
+                          get_recipes_limit)
+from .views import IngredientView, RecipeView, TagView, UsersView
+
+# Django 3.2 не умеет выполнять запросы ORM из корутин, поэтому
+# каждый запрос уходит в пул потоков через sync_to_async
+# с thread_sensitive=False: независимые запросы, собранные
+# в asyncio.gather, выполняются параллельно на разных соединениях.
+# Соединения потоков пула переиспользуются только при CONN_MAX_AGE > 0,
+# поэтому с ASYNC_READ_VIEWS он по умолчанию не нулевой (settings.py).
+
+
+def _run_query(func, args, kwargs):
+    # Поток пула не получает сигналов начала и конца запроса: соединение,
+    # которое устарело или сломалось, закрывается перед запросом.
+    close_old_connections()
+    return func(*args, **kwargs)
+
+
+async def query(func, *args, **kwargs):
+    return await sync_to_async(_run_query, thread_sensitive=False)(
+        func, args, kwargs
+    )
+
+
+def render(data, status_code=status.HTTP_200_OK):
+    """Ответ тем же рендерером, что и у синхронных view по умолчанию."""
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type = f'{content_type}; charset={renderer.charset}'
+    return HttpResponse(
+        renderer.render(data), content_type=content_type, status=status_code
+    )
+
+
+def render_error(request, exc):
+    """Ответ с ошибкой в том же виде, что у обработчика исключений DRF."""
+    if isinstance(exc.detail, (list, dict)):
+        data = exc.detail
+    else:
+        data = {'detail': exc.detail}
+    response = render(data, exc.status_code)
+    if isinstance(exc, (exceptions.NotAuthenticated,
+                        exceptions.AuthenticationFailed)):
+        authentication = api_settings.DEFAULT_AUTHENTICATION_CLASSES[0]()
+        response['WWW-Authenticate'] = authentication.authenticate_header(
+            request
+        )
+    return response
+
+
+class SyncFallback(Exception):
+    """Запрос, который асинхронный view передает синхронному."""
+
+
+def async_read_view(sync_view):
+    """
+    Асинхронная обработка GET. Остальные методы, форматы кроме JSON,
+    запросы, которые не прошли проверки DRF синхронного view,
+    и запросы, для которых view бросает SyncFallback, обрабатывает
+    синхронный view sync_view.
+    """
+    async_sync_view = sync_to_async(sync_view)
+
+    def decorator(func):
+        @wraps(func)
+        async def view(request, *args, **kwargs):
+            if request.method != 'GET' or 'format' in request.GET:
+                return await async_sync_view(request, *args, **kwargs)
+            try:
+                drf_request = await query(
+                    initial, sync_view, request, args, kwargs
+                )
+            except exceptions.APIException:
+                # Ответ с ошибкой, заголовками и метриками - как у DRF.
+                return await async_sync_view(request, *args, **kwargs)
+            try:
+                return await func(drf_request, *args, **kwargs)
+            except SyncFallback:
+                return await async_sync_view(request, *args, **kwargs)
+            except exceptions.APIException as exc:
+                return render_error(drf_request, exc)
+        return view
+    return decorator
+
+
+def initial(sync_view, request, args, kwargs):
+    """
+    Аутентификация, права и троттлинг синхронного view, как в его
+    dispatch: запрос DRF с пользователем.
+    """
+    view = sync_view.cls(**sync_view.initkwargs)
+    view.action_map = sync_view.actions
+    view.args, view.kwargs = args, kwargs
+    view.request = view.initialize_request(request, *args, **kwargs)
+    view.headers = view.default_response_headers
+    view.initial(view.request, *args, **kwargs)
+    return view.request
+
+
+async def user_flags(request, pks):
+    """
+    id рецептов из pks в избранном и в списке покупок пользователя
+    и id авторов, на которых он подписан, - тремя параллельными запросами.
+    """
+    user = request.user
+    if user.is_anonymous:
+        return set(), set(), set()
+    return await asyncio.gather(
+        query(lambda: set(Favorite.objects.filter(
+            user=user, recipe__in=pks
+        ).values_list('recipe_id', flat=True))),
+        query(lambda: set(ShoppingCart.objects.filter(
+            user=user, recipe__in=pks
+        ).values_list('recipe_id', flat=True))),
+        query(lambda: set(Subscription.objects.filter(
+            user=user, author__recipes__in=pks
+        ).values_list('author_id', flat=True))),
+    )
+
+
+async def represent_recipes(request, rows):
+    """
+    Представление рецептов rows - пар (id, id автора) - как у
+    RecipeView: закэшированная часть и флаги пользователя
+    запрашиваются параллельно.
+    """
+    pks = [pk for pk, _ in rows]
+    items, (favorited, in_cart, subscribed) = await asyncio.gather(
+        query(recipe_cache.get_many, pks), user_flags(request, pks),
+    )
+    return [
+        recipe_cache.personalize(item, request, {
+            'is_favorited': pk in favorited,
+            'is_in_shopping_cart': pk in in_cart,
+        }, author_id in subscribed)
+        for (pk, author_id), item in zip(rows, items)
+    ]
+
+
+def paginated(paginator, count, data):
+    return OrderedDict([
+        ('count', count),
+        ('next', paginator.get_next_link()),
+        ('previous', paginator.get_previous_link()),
+        ('results', data),
+    ])
+
+
+@async_read_view(RecipeView.as_view({'get': 'list', 'post': 'create'}))
+async def recipe_list(request):
+    if (not settings.RECIPE_CACHE_ENABLED
+            or LimitPagination.cursor_query_param in request.GET):
+        raise SyncFallback
+    filterset = RecipeFilter(
+        request.GET, queryset=Recipe.objects.all(), request=request
+    )
+    if not await query(filterset.is_valid):
+        raise exceptions.ValidationError(filterset.errors)
+    queryset = filterset.qs
+    pagination = LimitPagination()
+    pagination.request = request
+    pagination.keyset = False
+    page_size = pagination.get_page_size(request)
+    paginator = pagination.django_paginator_class(queryset, page_size)
+    page_number = request.GET.get(pagination.page_query_param) or '1'
+    if page_number in pagination.last_page_strings:
+        raise SyncFallback
+    if not page_number.isdigit() or int(page_number) < 1:
+        raise exceptions.NotFound(pagination.invalid_page_message)
+    offset = (int(page_number) - 1) * page_size
+    # COUNT и строки страницы - параллельно; выход номера страницы
+    # за пределы проверяется, когда известно число рецептов.
+    paginator.count, rows = await asyncio.gather(
+        query(queryset.count),
+        query(lambda: list(queryset.values_list('id', 'author_id')[
+            offset:offset + page_size
+        ])),
+    )
+    try:
+        pagination.page = paginator.page(page_number)
+    except InvalidPage:
+        raise exceptions.NotFound(pagination.invalid_page_message)
+    data = await represent_recipes(request, rows)
+    return render(paginated(pagination, paginator.count, data))
+
+
+@async_read_view(RecipeView.as_view({
+    'get': 'retrieve', 'put': 'update', 'patch': 'partial_update',
+    'delete': 'destroy',
+}))
+async def recipe_detail(request, pk):
+    if not settings.RECIPE_CACHE_ENABLED:
+        raise SyncFallback
+    author_id, (favorited, in_cart, subscribed) = await asyncio.gather(
+        query(lambda: Recipe.objects.filter(pk=pk).values_list(
+            'author_id', flat=True
+        ).first()),
+        user_flags(request, [pk]),
+    )
+    if author_id is None:
+        raise exceptions.NotFound()
+    item, = await query(recipe_cache.get_many, [pk])
+    return render(recipe_cache.personalize(item, request, {
+        'is_favorited': pk in favorited,
+        'is_in_shopping_cart': pk in in_cart,
+    }, author_id in subscribed))
+
+
+async def conditional_catalog(request, catalog, get_data):
+    """Ответ справочника с ETag и Last-Modified по его версии."""
+    version = await query(get_catalog_version, catalog)
+    etag = catalog_etag(catalog, version)
+    last_modified = timegm(catalog_last_modified(version).utctimetuple())
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = render(await get_data(version))
+    response['ETag'] = quote_etag(etag)
+    response['Last-Modified'] = http_date(last_modified)
+    return patch_catalog_cache_control(response)
+
+
+@async_read_view(TagView.as_view({'get': 'list'}))
+async def tag_list(request):
+    return await conditional_catalog(
+        request, TagView.catalog, lambda version: query(
+            lambda: TagSerializer(Tag.objects.all(), many=True).data
+        )
+    )
+
+
+@async_read_view(IngredientView.as_view({'get': 'list'}))
+async def ingredient_list(request):
+    if not settings.INGREDIENT_INDEX_ENABLED:
+        raise SyncFallback
+    return await conditional_catalog(
+        request, IngredientView.catalog, lambda version: query(
+            ingredient_index.search,
+            request.GET.get(IngredientFilter.search_param, ''), version,
+        )
+    )
+
+
+@async_read_view(UsersView.as_view(
+    {'get': 'subscriptions'}, **UsersView.subscriptions.kwargs
+))
+async def subscriptions(request):
+    limit = get_recipes_limit(request)
+    queryset = User.objects.filter(author__user=request.user)
+    paginator = LimitOffsetPagination()
+    paginator.request = request
+    paginator.limit = paginator.get_limit(request)
+    paginator.offset = paginator.get_offset(request)
+    if paginator.limit is None:
+        authors = queryset
+    else:
+        authors = queryset[paginator.offset:paginator.offset + paginator.limit]
+    paginator.count, authors = await asyncio.gather(
+        query(queryset.count), query(list, authors),
+    )
+    recipes = await query(list, Recipe.objects.latest_by_author(
+        [author.id for author in authors], limit
+    ))
+    recipes_by_author = defaultdict(list)
+    for recipe in recipes:
+        recipes_by_author[recipe.author_id].append(recipe)
+    for author in authors:
+        author.is_subscribed = True
+        author.latest_recipes = recipes_by_author[author.id]
+    data = await query(lambda: ShowSubscriptionsSerializer(
+        authors, many=True, context={'request': request}
+    ).data)
+    if paginator.limit is None:
+        return render(data)
+    return render(paginated(paginator, paginator.count, data))
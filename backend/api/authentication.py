@@ -0,0 +1,86 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from backend.db_router import use_primary
+
+
+def token_expired(token):
+    return token.created < timezone.now() - settings.AUTH_TOKEN_TTL
+
+
+class TokenCache:
+    """
+    LRU-кэш токен -> пользователь в памяти процесса.
+    Записи живут не дольше AUTH_TOKEN_CACHE_TTL секунд и сбрасываются
+    сигналами удаления токена и сохранения пользователя.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            token, cached_at = entry
+            if time.monotonic() - cached_at > settings.AUTH_TOKEN_CACHE_TTL:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return token
+
+    def set(self, token):
+        with self._lock:
+            self._entries[token.key] = (token, time.monotonic())
+            self._entries.move_to_end(token.key)
+            while len(self._entries) > settings.AUTH_TOKEN_CACHE_SIZE:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in [key for key, (token, _) in self._entries.items()
+                        if token.user_id == user_id]:
+                del self._entries[key]
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену с кэшем и сроком действия токена."""
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is None:
+            model = self.get_model()
+            try:
+                # Только что выданного токена может еще не быть на реплике.
+                with use_primary():
+                    token = model.objects.select_related('user').get(
+                        key=key
+                    )
+            except model.DoesNotExist:
+                raise AuthenticationFailed('Недопустимый токен.')
+            token_cache.set(token)
+        if token_expired(token):
+            token_cache.invalidate(key)
+            raise AuthenticationFailed('Срок действия токена истек.')
+        if not token.user.is_active:
+            raise AuthenticationFailed(
+                'Пользователь неактивен или удален.'
+            )
+        # Копия, чтобы запросы не изменяли общий объект пользователя.
+        return copy.copy(token.user), token
@@ -0,0 +1,142 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from backend.db_router import use_primary
+from menu.models import Recipe
+from .flat_serializers import serialize_recipes
+from .serializers import RecipeSerializer
+
+# Увеличивается при изменении формата представления рецепта.
+REPRESENTATION_VERSION = 3
+HITS_KEY = 'recipe-representation:hits'
+MISSES_KEY = 'recipe-representation:misses'
+
+
+def _count(key, value):
+    if not value:
+        return
+    try:
+        cache.incr(key, value)
+    except ValueError:
+        cache.set(key, value, None)
+
+
+class RecipeRepresentationCache:
+    """
+    Кэш не зависящей от пользователя части представления рецепта.
+    Флаги is_favorited, is_in_shopping_cart и author.is_subscribed
+    подставляются из аннотаций рецептов текущей страницы
+    (см. RecipeQuerySet.with_user_flags).
+    У каждого рецепта есть версия в кэше без срока действия, она
+    меняется при сбросе. Представление сохраняется вместе с версией,
+    прочитанной до загрузки, и действительно, пока версия та же:
+    загрузка, начатая до сброса, не оставит в кэше устаревшие данные.
+    """
+
+    user_fields = ('is_favorited', 'is_in_shopping_cart')
+    image_fields = ('image', 'image_thumbnail', 'image_medium')
+
+    def key(self, pk):
+        return f'recipe-representation:{REPRESENTATION_VERSION}:{pk}'
+
+    def version_key(self, pk):
+        return f'recipe-representation-version:{pk}'
+
+    def invalidate(self, pks):
+        cache.set_many(
+            {self.version_key(pk): uuid.uuid4().hex for pk in pks}, None
+        )
+
+    def stats(self):
+        counters = cache.get_many([HITS_KEY, MISSES_KEY])
+        return {
+            'hits': counters.get(HITS_KEY, 0),
+            'misses': counters.get(MISSES_KEY, 0),
+        }
+
+    def serialize(self, pks):
+        """Не зависящая от пользователя часть представления рецептов."""
+        if settings.RECIPE_FLAT_SERIALIZER_ENABLED:
+            return serialize_recipes(pks)
+        recipes = Recipe.objects.filter(
+            pk__in=pks
+        ).with_related().select_related('author')
+        # Без request в контексте сериализатор не делает запросов
+        # для флагов пользователя и отдает относительные URL картинок.
+        return RecipeSerializer(recipes, many=True).data
+
+    def _load(self, pks):
+        # Представления живут в кэше долго, поэтому не читаются
+        # с отстающей реплики.
+        with use_primary():
+            data = self.serialize(pks)
+        return {item['id']: item for item in data}
+
+    def get_many(self, pks):
+        found = cache.get_many(
+            [self.key(pk) for pk in pks]
+            + [self.version_key(pk) for pk in pks]
+        )
+        items, versions, missing = {}, {}, []
+        for pk in pks:
+            version = found.get(self.version_key(pk))
+            entry = found.get(self.key(pk))
+            if version is not None and entry is not None \
+                    and entry[0] == version:
+                items[pk] = entry[1]
+                continue
+            if version is None:
+                version = uuid.uuid4().hex
+            versions[pk] = version
+            missing.append(pk)
+        _count(HITS_KEY, len(items))
+        _count(MISSES_KEY, len(missing))
+        if missing:
+            # Версии - до загрузки: сброс во время нее их сменит.
+            cache.set_many({
+                self.version_key(pk): version
+                for pk, version in versions.items()
+                if self.version_key(pk) not in found
+            }, None)
+            loaded = self._load(missing)
+            cache.set_many({
+                self.key(pk): (versions[pk], item)
+                for pk, item in loaded.items()
+            }, settings.RECIPE_CACHE_TTL)
+            items.update(loaded)
+        return [items[pk] for pk in pks]
+
+    def personalize(self, item, request, flags, is_subscribed):
+        """
+        Копия закэшированного представления с флагами пользователя
+        (flags - значения для user_fields) и абсолютными URL картинок.
+        """
+        item = dict(item, **flags)
+        item['author'] = dict(item['author'], is_subscribed=is_subscribed)
+        for field in self.image_fields:
+            if item[field]:
+                item[field] = request.build_absolute_uri(item[field])
+        return item
+
+    def represent(self, recipes, request, items=None):
+        """
+        Представление рецептов для текущего пользователя.
+        recipes должны быть получены через with_user_flags().
+        items - уже готовые представления рецептов, по умолчанию
+        они берутся из кэша.
+        """
+        if items is None:
+            items = self.get_many([recipe.pk for recipe in recipes])
+        return [
+            self.personalize(
+                item, request,
+                {field: getattr(recipe, field) for field in self.user_fields},
+                recipe.author.is_subscribed,
+            )
+            for recipe, item in zip(recipes, items)
+        ]
+
+
+recipe_cache = RecipeRepresentationCache()
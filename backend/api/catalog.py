@@ -0,0 +1,81 @@
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+def _key(catalog):
+    return f'catalog-version:{catalog}'
+
+
+def _now_version():
+    return int(time.time() * 1000)
+
+
+def get_catalog_version(catalog):
+    """
+    Версия справочника - время последнего изменения в миллисекундах.
+    Хранится в общем кэше без срока действия и меняется только
+    bump_catalog_version: запрос к справочнику, в том числе
+    условный, не обращается к базе.
+    """
+    version = cache.get(_key(catalog))
+    if version is None:
+        # Первый запрос после очистки кэша: версия с текущим временем.
+        cache.add(_key(catalog), _now_version(), None)
+        version = cache.get(_key(catalog))
+    return version
+
+
+def bump_catalog_version(catalog):
+    """
+    Новая версия справочника. Вызывается сигналами изменения тегов
+    и ингредиентов и командами, которые пишут в справочник без сигналов.
+    """
+    version = _now_version()
+    current = cache.get(_key(catalog))
+    if current is not None:
+        version = max(version, current + 1)
+    cache.set(_key(catalog), version, None)
+
+
+def catalog_etag(catalog, version):
+    return f'"{catalog}-{version}"'
+
+
+def catalog_last_modified(version):
+    return datetime.fromtimestamp(version / 1000, tz=timezone.utc)
+
+
+def patch_catalog_cache_control(response):
+    if response.status_code in (200, 304):
+        patch_cache_control(
+            response, public=True, must_revalidate=True,
+            max_age=settings.CATALOG_CACHE_MAX_AGE,
+        )
+    return response
+
+
+class ConditionalCatalogMixin:
+    """
+    Отвечает 304 на If-None-Match/If-Modified-Since по версии справочника
+    catalog, не выполняя queryset и сериализатор.
+    """
+
+    catalog = None
+    catalog_version = None
+
+    def _etag(self, request, *args, **kwargs):
+        return catalog_etag(self.catalog, self.catalog_version)
+
+    def _last_modified(self, request, *args, **kwargs):
+        return catalog_last_modified(self.catalog_version)
+
+    def dispatch(self, request, *args, **kwargs):
+        self.catalog_version = get_catalog_version(self.catalog)
+        return patch_catalog_cache_control(condition(
+            etag_func=self._etag, last_modified_func=self._last_modified
+        )(super().dispatch)(request, *args, **kwargs))
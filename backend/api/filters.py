@@ -1,34 +1,86 @@
-from rest_framework.filters import SearchFilter
-from django_filters import rest_framework
-
-from menu.models import Tag, Recipe
-
-
-class IngredientFilter(SearchFilter):
-    search_param = 'name'
-
-
-class RecipeFilter(rest_framework.FilterSet):
-    tags = rest_framework.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        queryset=Tag.objects.all(),
-        label='Tags',
-        to_field_name='slug'
-    )
-    is_favorited = rest_framework.BooleanFilter(method='get_favorite')
-    is_in_shopping_cart = rest_framework.BooleanFilter(
-        method='get_is_in_shopping_cart')
-
-    class Meta:
-        model = Recipe
-        fields = ['tags', 'author', 'is_favorited', 'is_in_shopping_cart']
-
-    def get_favorite(self, queryset, name, value):
-        if value:
-            return queryset.filter(favorites__user=self.request.user)
-        return queryset
-
-    def get_is_in_shopping_cart(self, queryset, name, value):
-        if value:
-            return queryset.filter(shopping_cart__user=self.request.user)
-        return queryset
+from django.db.models import F
+from rest_framework.filters import SearchFilter
+from django_filters import rest_framework
+
+from menu.models import Tag, Recipe
+
+
+class IngredientFilter(SearchFilter):
+    search_param = 'name'
+
+
+class RecipeFilter(rest_framework.FilterSet):
+    TAGS_MODE_ANY = 'any'
+    TAGS_MODE_ALL = 'all'
+
+    tags = rest_framework.ModelMultipleChoiceFilter(
+        field_name='tags__slug',
+        queryset=Tag.objects.all(),
+        label='Tags',
+        to_field_name='slug',
+        method='filter_tags'
+    )
+    tags_mode = rest_framework.ChoiceFilter(
+        choices=((TAGS_MODE_ANY, 'Любой из тегов'),
+                 (TAGS_MODE_ALL, 'Все теги')),
+        label='Tags mode',
+        method='filter_tags_mode'
+    )
+    search = rest_framework.CharFilter(method='filter_search')
+    is_favorited = rest_framework.BooleanFilter(method='get_favorite')
+    is_in_shopping_cart = rest_framework.BooleanFilter(
+        method='get_is_in_shopping_cart')
+
+    class Meta:
+        model = Recipe
+        fields = ['tags', 'tags_mode', 'author', 'search', 'is_favorited',
+                  'is_in_shopping_cart']
+
+    def filter_tags(self, queryset, name, value):
+        """
+        Фильтрует по маске тегов рецепта: любой из тегов (по умолчанию)
+        или все теги при tags_mode=all - без JOIN с таблицей тегов
+        и DISTINCT. Условие на маску не обслуживается индексом: страница
+        ленты читается по индексу даты публикации с проверкой маски
+        каждой строки, что дешево для частых тегов. Теги без бита
+        фильтруются через RecipeTag по индексу (tag, recipe).
+        """
+        if not value:
+            return queryset
+        match_all = (
+            self.form.cleaned_data.get('tags_mode') == self.TAGS_MODE_ALL
+        )
+        if any(tag.bit is None for tag in value):
+            if match_all:
+                for tag in value:
+                    queryset = queryset.filter(tags=tag)
+                return queryset
+            return queryset.filter(tags__in=value).distinct()
+        mask = 0
+        for tag in value:
+            mask |= 1 << tag.bit
+        queryset = queryset.alias(tags_match=F('tags_mask').bitand(mask))
+        if match_all:
+            return queryset.filter(tags_match=mask)
+        return queryset.filter(tags_match__gt=0)
+
+    def filter_tags_mode(self, queryset, name, value):
+        return queryset
+
+    def filter_search(self, queryset, name, value):
+        """
+        Полнотекстовый поиск по названию, описанию и ингридиентам.
+        Результаты упорядочены по релевантности, кроме пагинации
+        с cursor - она всегда идет по дате публикации.
+        """
+        return queryset.search(value)
+
+    def get_favorite(self, queryset, name, value):
+        if value:
+            return queryset.filter(favorites__user=self.request.user)
+        return queryset
+
+    def get_is_in_shopping_cart(self, queryset, name, value):
+        if value:
+            return queryset.filter(shopping_cart__user=self.request.user)
+        return queryset
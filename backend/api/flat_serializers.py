@@ -0,0 +1,79 @@
+from collections import defaultdict
+
+from menu.models import Recipe, RecipeIngredient, RecipeTag
+from user.models import User
+
+RECIPE_FIELDS = ('id', 'author_id', 'name', 'text', 'image',
+                 'image_thumbnail', 'image_medium', 'cooking_time')
+AUTHOR_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+
+
+def file_url(field, name):
+    """URL файла, как его отдает ImageField DRF без request."""
+    if not name:
+        return None
+    return field.storage.url(name)
+
+
+def serialize_recipes(pks):
+    """
+    Представления рецептов pks в том же виде, что у RecipeSerializer
+    без request в контексте, в порядке pks. Рецепты, теги, ингридиенты
+    и авторы читаются четырьмя запросами .values() и собираются
+    в словари без экземпляров моделей и полей сериализаторов.
+    """
+    recipes = {
+        row['id']: row for row in Recipe.objects.filter(
+            pk__in=pks
+        ).order_by().values(*RECIPE_FIELDS)
+    }
+    if not recipes:
+        return []
+    tags = defaultdict(list)
+    for recipe_id, *tag in RecipeTag.objects.filter(
+        recipe__in=recipes
+    ).order_by('tag_id').values_list(
+        'recipe_id', 'tag_id', 'tag__name', 'tag__color', 'tag__slug'
+    ):
+        tags[recipe_id].append(dict(zip(('id', 'name', 'color', 'slug'), tag)))
+    ingredients = defaultdict(list)
+    for recipe_id, *ingredient in RecipeIngredient.objects.filter(
+        recipe__in=recipes
+    ).order_by('id').values_list(
+        'recipe_id', 'ingredient_id', 'ingredient__name', 'amount',
+        'ingredient__measurement_unit',
+    ):
+        ingredients[recipe_id].append(dict(zip(
+            ('id', 'name', 'amount', 'measurement_unit'), ingredient
+        )))
+    authors = {
+        row['id']: dict(row, is_subscribed=False)
+        for row in User.objects.filter(
+            pk__in={row['author_id'] for row in recipes.values()}
+        ).order_by().values(*AUTHOR_FIELDS)
+    }
+    image_fields = {
+        name: Recipe._meta.get_field(name)
+        for name in ('image', 'image_thumbnail', 'image_medium')
+    }
+    data = []
+    for pk in pks:
+        row = recipes.get(pk)
+        if row is None:
+            continue
+        data.append({
+            'id': row['id'],
+            'tags': tags[pk],
+            'author': authors[row['author_id']],
+            'name': row['name'],
+            'text': row['text'],
+            **{
+                name: file_url(field, row[name])
+                for name, field in image_fields.items()
+            },
+            'ingredients': ingredients[pk],
+            'is_favorited': False,
+            'is_in_shopping_cart': False,
+            'cooking_time': row['cooking_time'],
+        })
+    return data
@@ -0,0 +1,101 @@
+import threading
+from bisect import bisect_left
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                    5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+METRICS = {
+    'request_duration_seconds': (
+        'Total request processing time', DURATION_BUCKETS
+    ),
+    'request_db_duration_seconds': (
+        'Time spent executing SQL queries', DURATION_BUCKETS
+    ),
+    'request_serialize_duration_seconds': (
+        'Time spent in the view outside of SQL queries', DURATION_BUCKETS
+    ),
+    'request_render_duration_seconds': (
+        'Time spent rendering the response', DURATION_BUCKETS
+    ),
+    'request_db_queries': (
+        'Number of SQL queries per request', QUERY_BUCKETS
+    ),
+}
+METRICS_PREFIX = 'foodgram_'
+
+
+class Histogram:
+    """Гистограмма наблюдений с фиксированными границами корзин."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            yield bound, total
+
+
+class RouteMetrics:
+    """
+    Гистограммы времени и количества запросов к базе по маршрутам.
+    Хранятся в памяти процесса: каждый воркер отдает свои значения.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+
+    def observe(self, method, route, values):
+        """values - словарь {имя метрики из METRICS: значение}."""
+        with self._lock:
+            for name, value in values.items():
+                key = (name, method, route)
+                histogram = self._histograms.get(key)
+                if histogram is None:
+                    histogram = self._histograms[key] = Histogram(
+                        METRICS[name][1]
+                    )
+                histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+    def prometheus(self):
+        """Метрики в текстовом формате Prometheus 0.0.4."""
+        with self._lock:
+            histograms = sorted(
+                (key, histogram.sum, histogram.count,
+                 list(histogram.cumulative()))
+                for key, histogram in self._histograms.items()
+            )
+        lines = []
+        for metric, (description, _) in METRICS.items():
+            name = METRICS_PREFIX + metric
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} histogram')
+            for (key, total, count, buckets) in histograms:
+                if key[0] != metric:
+                    continue
+                labels = f'method="{key[1]}",route="{key[2]}"'
+                for bound, value in buckets:
+                    lines.append(
+                        f'{name}_bucket{{{labels},le="{bound}"}} {value}'
+                    )
+                lines.append(f'{name}_sum{{{labels}}} {total}')
+                lines.append(f'{name}_count{{{labels}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+route_metrics = RouteMetrics()
@@ -0,0 +1,305 @@
+import asyncio
+import hashlib
+import logging
+import random
+import re
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+from rest_framework.permissions import SAFE_METHODS
+
+from backend.db_router import PRIMARY_DATABASE, read_database
+
+from .metrics import route_metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger('api.performance')
+
+# Замеры текущего запроса. Контекст копируется в потоки sync_to_async,
+# поэтому запросы к базе из них тоже попадают в замеры.
+current_timings = ContextVar('current_timings', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.execute(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection):
+    """
+    Подключает record_query к соединению с базой.
+    Соединения свои у каждого потока, поэтому обертка ставится
+    при создании соединения, а не на время запроса.
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class RequestTimings:
+    """Замеры одного запроса: SQL, работа view и рендеринг ответа."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.db_time = 0
+        self.view_started = None
+        self.view_db_time = 0
+        self.view_finished = None
+        self.rendered = None
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.db_time += duration
+            self.queries.append((duration, sql))
+
+    def start_view(self):
+        self.view_started = time.perf_counter()
+        self.view_db_time = self.db_time
+
+    def finish_view(self):
+        if self.view_started is not None and self.view_finished is None:
+            self.view_finished = time.perf_counter()
+            self.view_db_time = self.db_time - self.view_db_time
+
+    def finish_render(self, response):
+        self.rendered = time.perf_counter()
+
+    def phases(self):
+        """Длительности этапов запроса в секундах."""
+        total = time.perf_counter() - self.started
+        serialize = render = 0
+        if self.view_finished is not None:
+            serialize = max(
+                self.view_finished - self.view_started - self.view_db_time, 0
+            )
+            if self.rendered is not None:
+                render = self.rendered - self.view_finished
+        return {
+            'request_duration_seconds': total,
+            'request_db_duration_seconds': self.db_time,
+            'request_serialize_duration_seconds': serialize,
+            'request_render_duration_seconds': render,
+            'request_db_queries': len(self.queries),
+        }
+
+
+class PerformanceMiddleware(MiddlewareMixin):
+    """
+    Измеряет количество и время SQL-запросов, время работы view
+    (в основном сериализация) и рендеринга ответа.
+    Результат отдается в заголовке Server-Timing и копится
+    в гистограммах по маршрутам (см. api.metrics).
+    Запросы, превысившие SLOW_REQUEST_QUERIES или SLOW_REQUEST_MS,
+    пишутся в лог api.performance вместе с текстом SQL.
+    Работает и в синхронном, и в асинхронном стеке middleware.
+    Стоит после CompressionMiddleware: сжатие в замеры не входит.
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = request.timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        timings = request.timings = RequestTimings()
+        token = current_timings.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        return self.finish(request, response)
+
+    def finish(self, request, response):
+        timings = request.timings
+        timings.finish_view()
+        phases = timings.phases()
+        response['Server-Timing'] = ', '.join((
+            'db;dur={:.1f};desc="{} queries"'.format(
+                phases['request_db_duration_seconds'] * 1000,
+                phases['request_db_queries'],
+            ),
+            'serialize;dur={:.1f}'.format(
+                phases['request_serialize_duration_seconds'] * 1000
+            ),
+            'render;dur={:.1f}'.format(
+                phases['request_render_duration_seconds'] * 1000
+            ),
+            'total;dur={:.1f}'.format(
+                phases['request_duration_seconds'] * 1000
+            ),
+        ))
+        match = request.resolver_match
+        route_metrics.observe(
+            request.method, match.view_name if match else 'unmatched', phases
+        )
+        self.log_slow_request(request, timings, phases)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timings.start_view()
+
+    def process_template_response(self, request, response):
+        request.timings.finish_view()
+        response.add_post_render_callback(request.timings.finish_render)
+        return response
+
+    def log_slow_request(self, request, timings, phases):
+        duration_ms = phases['request_duration_seconds'] * 1000
+        if (
+            len(timings.queries) <= settings.SLOW_REQUEST_QUERIES
+            and duration_ms <= settings.SLOW_REQUEST_MS
+        ):
+            return
+        logger.warning(
+            'Slow request %s %s: %.1f ms, %d queries (%.1f ms)\n%s',
+            request.method, request.get_full_path(), duration_ms,
+            len(timings.queries), timings.db_time * 1000,
+            '\n'.join(
+                f'{duration * 1000:.1f} ms: {sql}'
+                for duration, sql in timings.queries
+            ),
+        )
+
+
+class ReplicaRoutingMiddleware(MiddlewareMixin):
+    """
+    Безопасные запросы (GET, HEAD, OPTIONS) читают с одной из реплик
+    REPLICA_DATABASES, остальные - с основной базы (см. ReplicaRouter).
+    После записи клиент REPLICA_PIN_SECONDS секунд читает с основной
+    базы, чтобы видеть свои изменения без задержки репликации:
+    признак ставится в cookie и, для клиентов без cookie, в кэш
+    по заголовку Authorization.
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = read_database.set(self.choose_database(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            read_database.reset(token)
+        return self.pin(request, response)
+
+    async def __acall__(self, request):
+        token = read_database.set(self.choose_database(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_database.reset(token)
+        return self.pin(request, response)
+
+    def pin_key(self, request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization:
+            return None
+        digest = hashlib.sha256(authorization.encode()).hexdigest()
+        return f'primary-pin:{digest}'
+
+    def choose_database(self, request):
+        if (not settings.REPLICA_DATABASES
+                or request.method not in SAFE_METHODS
+                or settings.REPLICA_PIN_COOKIE in request.COOKIES):
+            return PRIMARY_DATABASE
+        key = self.pin_key(request)
+        if key is not None and cache.get(key):
+            return PRIMARY_DATABASE
+        # Одна реплика на весь запрос: у разных реплик разное отставание.
+        return random.choice(settings.REPLICA_DATABASES)
+
+    def pin(self, request, response):
+        if settings.REPLICA_DATABASES and request.method not in SAFE_METHODS:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+                samesite='Lax',
+            )
+            key = self.pin_key(request)
+            if key is not None:
+                cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+
+ACCEPT_ENCODING_RE = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?')
+# Уровень сжатия brotli для ответов, сжимаемых на каждый запрос:
+# на максимальном 11 сжатие на порядок медленнее при выигрыше
+# в несколько процентов.
+BROTLI_QUALITY = 5
+
+
+def accepted_encodings(request):
+    """Кодировки из Accept-Encoding, кроме запрещенных через q=0."""
+    encodings = set()
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        match = ACCEPT_ENCODING_RE.match(item)
+        if not match:
+            continue
+        encoding, quality = match.groups()
+        try:
+            if quality is not None and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        encodings.add(encoding.lower())
+    return encodings
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Сжимает ответы по путям COMPRESSION_PATHS не меньше
+    COMPRESSION_MIN_SIZE байт: brotli, если он установлен и его
+    принимает клиент, иначе gzip. Потоковые ответы (выгрузка списка
+    покупок) не сжимаются.
+    """
+
+    def process_response(self, request, response):
+        if (response.streaming
+                or response.has_header('Content-Encoding')
+                or len(response.content) < settings.COMPRESSION_MIN_SIZE
+                or not request.path.startswith(settings.COMPRESSION_PATHS)):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encodings = accepted_encodings(request)
+        if brotli is not None and 'br' in encodings:
+            encoding = 'br'
+            content = brotli.compress(
+                response.content, mode=brotli.MODE_TEXT,
+                quality=BROTLI_QUALITY,
+            )
+        elif 'gzip' in encodings:
+            encoding = 'gzip'
+            content = compress_string(response.content)
+        else:
+            return response
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = encoding
+        # Как в GZipMiddleware: сжатый ответ не совпадает побайтно
+        # с несжатым, поэтому сильный ETag становится слабым.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        return response
@@ -1,6 +1,134 @@
-from rest_framework.pagination import PageNumberPagination
-
-
-class LimitPagination(PageNumberPagination):
-    page_size_query_param = 'limit'
-    page_size = 10
+import base64
+import binascii
+from collections import OrderedDict
+from datetime import datetime
+
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# Больший id не поместится в bigint и уронит запрос.
+MAX_CURSOR_ID = 2 ** 63 - 1
+
+
+class LimitPagination(PageNumberPagination):
+    """
+    Постраничная пагинация с параметром limit.
+    С параметром cursor (в том числе пустым) включается пагинация
+    по ключу (pub_date, id) без COUNT и OFFSET.
+    Списки, уже упорядоченные иначе, всегда разбиваются по номеру
+    страницы.
+    """
+
+    page_size_query_param = 'limit'
+    page_size = 10
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def use_keyset(self, queryset, request):
+        return (self.cursor_query_param in request.query_params
+                and isinstance(queryset, QuerySet))
+
+    def keyset_results(self, queryset, position, reverse, limit):
+        """
+        limit объектов после position (pub_date, id) по убыванию даты,
+        при reverse - до position по возрастанию.
+        """
+        if reverse:
+            queryset = queryset.order_by('pub_date', 'id')
+        else:
+            queryset = queryset.order_by('-pub_date', '-id')
+        if position is not None:
+            pub_date, pk = position
+            if reverse:
+                queryset = queryset.filter(
+                    Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=pk)
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+                )
+        return list(queryset[:limit])
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.use_keyset(queryset, request)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request)
+        results = self.keyset_results(
+            queryset, position, reverse, page_size + 1
+        )
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        self.page_results = results
+        return results
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            direction, pub_date, pk = base64.urlsafe_b64decode(
+                encoded.encode('ascii')
+            ).decode('ascii').split('|')
+            pub_date, pk = datetime.fromisoformat(pub_date), int(pk)
+            if (direction not in ('f', 'r') or timezone.is_naive(pub_date)
+                    or not 0 < pk <= MAX_CURSOR_ID):
+                raise ValueError(encoded)
+        except (binascii.Error, UnicodeError, ValueError):
+            raise ValidationError(
+                {self.cursor_query_param: self.invalid_cursor_message}
+            )
+        return (pub_date, pk), direction == 'r'
+
+    def encode_cursor(self, obj, reverse):
+        direction = 'r' if reverse else 'f'
+        cursor = f'{direction}|{obj.pub_date.isoformat()}|{obj.pk}'
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param,
+            base64.urlsafe_b64encode(cursor.encode('ascii')).decode('ascii'),
+        )
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or not self.page_results:
+            return None
+        return self.encode_cursor(self.page_results[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page_results:
+            return None
+        return self.encode_cursor(self.page_results[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class TimelinePagination(LimitPagination):
+    """Пагинация ленты подписок - всегда по ключу (см. menu.timeline)."""
+
+    def use_keyset(self, queryset, request):
+        return True
+
+    def keyset_results(self, timeline, position, reverse, limit):
+        return timeline.page(position, reverse, limit)
@@ -1,20 +1,27 @@
-from rest_framework import permissions
-
-
-class IsAuthorAdminSuperuserOrReadOnlyPermission(
-    permissions.IsAuthenticatedOrReadOnly
-):
-    """
-    Пермишен, позволяющий выполнять безопасные методы для всех пользователей,
-    и дополнительно разрешает действия администраторам,
-    модераторам и авторам объектов.
-    """
-    message = (
-        'Проверка пользователя является ли он администрацией'
-        'или автором объекта, иначе только режим чтения'
-    )
-
-    def has_object_permission(self, request, view, obj):
-        return (request.method in permissions.SAFE_METHODS
-                or request.user.is_admin
-                or obj.author == request.user)
+from rest_framework import permissions
+
+
+class IsAuthorAdminSuperuserOrReadOnlyPermission(
+    permissions.IsAuthenticatedOrReadOnly
+):
+    """
+    Пермишен, позволяющий выполнять безопасные методы для всех пользователей,
+    и дополнительно разрешает действия администраторам,
+    модераторам и авторам объектов.
+    """
+    message = (
+        'Проверка пользователя является ли он администрацией'
+        'или автором объекта, иначе только режим чтения'
+    )
+
+    def has_object_permission(self, request, view, obj):
+        return (request.method in permissions.SAFE_METHODS
+                or request.user.is_admin
+                or obj.author == request.user)
+
+
+class IsAdminPermission(permissions.BasePermission):
+    """Доступ только администраторам: роль admin или суперпользователь."""
+
+    def has_permission(self, request, view):
+        return request.user.is_authenticated and request.user.is_admin
@@ -0,0 +1,195 @@
+import csv
+import io
+import json
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SHOPPING_LIST_TITLE = 'Список покупок:'
+
+
+class ShoppingListRenderer(BaseRenderer, ABC):
+    """
+    Базовый рендерер списка покупок.
+    Строки списка (словари с ключами name, amount, measurement_unit)
+    приходят генератором и отдаются клиенту по частям через stream().
+    """
+
+    charset = 'utf-8'
+
+    @abstractmethod
+    def stream(self, rows):
+        """Части файла со строками rows."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Используется только для ответов с ошибками - они отдаются в JSON,
+        # а не с типом файла списка покупок.
+        response = (renderer_context or {}).get('response')
+        if response is not None and response.status_code >= 400:
+            response['Content-Type'] = (
+                f'{JSONRenderer.media_type}; charset={self.charset}'
+            )
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    """Список покупок в виде текстового файла."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, rows):
+        yield f'{SHOPPING_LIST_TITLE}\n'.encode(self.charset)
+        for row in rows:
+            yield (
+                f"{row['name']} - {row['amount']} "
+                f"{row['measurement_unit']}\n"
+            ).encode(self.charset)
+
+
+class _Echo:
+    """Псевдо-буфер для csv.writer, возвращающий записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    """Список покупок в формате CSV."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, rows):
+        writer = csv.writer(_Echo())
+        yield writer.writerow(
+            ('name', 'amount', 'measurement_unit')
+        ).encode(self.charset)
+        for row in rows:
+            yield writer.writerow(
+                (row['name'], row['amount'], row['measurement_unit'])
+            ).encode(self.charset)
+
+
+@lru_cache(maxsize=None)
+def register_pdf_font():
+    """Регистрирует шрифт с кириллицей один раз на процесс."""
+    font_name = 'ShoppingListFont'
+    pdfmetrics.registerFont(TTFont(font_name, settings.SHOPPING_LIST_FONT))
+    return font_name
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    """
+    Список покупок в формате PDF.
+    reportlab пишет документ только в canvas.save(), поэтому файл целиком
+    собирается в памяти и отдаётся частями уже после этого - память
+    растёт с длиной списка. Потоковые TXT и CSV идут по умолчанию,
+    PDF отдаётся только по явному Accept: application/pdf.
+    """
+
+    media_type = 'application/pdf'
+    format = 'pdf'
+    font_size = 12
+    line_height = 18
+    margin = 50
+    chunk_size = 64 * 1024
+
+    def stream(self, rows):
+        font_name = register_pdf_font()
+        buffer = io.BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        width, height = A4
+        y = height - self.margin
+        pdf.setFont(font_name, self.font_size + 4)
+        pdf.drawString(self.margin, y, SHOPPING_LIST_TITLE)
+        y -= self.line_height * 2
+        pdf.setFont(font_name, self.font_size)
+        for row in rows:
+            if y < self.margin:
+                pdf.showPage()
+                pdf.setFont(font_name, self.font_size)
+                y = height - self.margin
+            pdf.drawString(
+                self.margin, y,
+                f"{row['name']} - {row['amount']} {row['measurement_unit']}"
+            )
+            y -= self.line_height
+        pdf.save()
+        buffer.seek(0)
+        while True:
+            chunk = buffer.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+# Первый рендерер - формат по умолчанию. JSONRenderer в конце нужен,
+# чтобы на Accept: application/json отдавались JSON, а не 406.
+SHOPPING_LIST_RENDERERS = (
+    ShoppingListTextRenderer,
+    ShoppingListCSVRenderer,
+    ShoppingListPDFRenderer,
+    JSONRenderer,
+)
+
+
+class PrometheusRenderer(BaseRenderer):
+    """Метрики в текстовом формате Prometheus."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer на orjson - в несколько раз быстрее json из стандартной
+    библиотеки на больших списках рецептов, с тем же результатом.
+    Без orjson, с отступами (indent в Accept) и для данных,
+    которые orjson не умеет сериализовать, работает как JSONRenderer.
+    """
+
+    # datetime отдаются энкодеру DRF: он округляет время до миллисекунд.
+    orjson_options = orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(
+            accepted_media_type or '', renderer_context or {}
+        ):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=self.orjson_options,
+            )
+        except TypeError:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        # Как JSONRenderer: эти символы недопустимы в строках JavaScript.
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029'
+        )
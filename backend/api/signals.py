@@ -0,0 +1,69 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from menu.models import (Ingredient, Recipe, RecipeIngredient, RecipeTag,
+                         Tag)
+from user.models import User
+from .authentication import token_cache
+from .cache import recipe_cache
+from .catalog import bump_catalog_version
+from .middleware import install_query_recorder
+
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+def invalidate_recipes(pks):
+    pks = list(pks)
+    if pks:
+        transaction.on_commit(lambda: recipe_cache.invalidate(pks))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def invalidate_recipe(instance, **kwargs):
+    invalidate_recipes([instance.pk])
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+@receiver((post_save, post_delete), sender=RecipeTag)
+def invalidate_recipe_relation(instance, **kwargs):
+    invalidate_recipes([instance.recipe_id])
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tag_recipes(instance, **kwargs):
+    transaction.on_commit(lambda: bump_catalog_version('tags'))
+    invalidate_recipes(RecipeTag.objects.filter(
+        tag_id=instance.pk).values_list('recipe_id', flat=True))
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_recipes(instance, **kwargs):
+    transaction.on_commit(lambda: bump_catalog_version('ingredients'))
+    invalidate_recipes(RecipeIngredient.objects.filter(
+        ingredient_id=instance.pk).values_list('recipe_id', flat=True))
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_recipes(instance, update_fields=None, **kwargs):
+    if update_fields is not None and not AUTHOR_FIELDS & set(update_fields):
+        return
+    invalidate_recipes(Recipe.objects.filter(
+        author_id=instance.pk).values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver((post_save, post_delete), sender=User)
+def invalidate_cached_user_tokens(instance, **kwargs):
+    token_cache.invalidate_user(instance.pk)
+
+
+@receiver(connection_created)
+def record_connection_queries(connection, **kwargs):
+    install_query_recorder(connection)
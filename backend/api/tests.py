@@ -0,0 +1,1251 @@
+import base64
+import gzip
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import (APIClient, APIRequestFactory,
+                                 force_authenticate)
+
+from menu.ingredient_index import ingredient_index
+from menu.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                         RecipeTag, ShoppingCart, ShoppingListItem, Tag)
+from user.models import Subscription, User
+from . import async_views, middleware
+from .authentication import CachedTokenAuthentication, TokenCache
+from .cache import recipe_cache
+from .flat_serializers import serialize_recipes
+from .serializers import Base64ImageField, RecipeSerializer
+
+TEST_MEDIA_ROOT = tempfile.mkdtemp()
+# Второй алиас для ReplicaRoutingTests - зеркало тестовой основной базы.
+REPLICA = 'test_replica'
+connections.databases.setdefault(REPLICA, dict(
+    connections.databases['default'], TEST={'MIRROR': 'default'}
+))
+
+
+def tearDownModule():
+    shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
+
+def image_file():
+    buffer = io.BytesIO()
+    Image.new('RGB', (400, 300), 'orange').save(buffer, 'PNG')
+    return SimpleUploadedFile('recipe.png', buffer.getvalue(),
+                              content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class RecipeTestCase(TestCase):
+    """Пользователи, теги и ингредиенты для тестов рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass',
+            first_name='Анна', last_name='Петрова',
+        )
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass',
+            first_name='Олег', last_name='Иванов',
+        )
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {number}', color=f'#00000{number}',
+                               slug=f'tag{number}')
+            for number in range(3)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {number}',
+                                      measurement_unit='г')
+            for number in range(4)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    @classmethod
+    def create_recipe(cls, name, tags=(), ingredients=(), author=None,
+                      variants=True):
+        """Рецепт с тегами и парами (ингредиент, количество)."""
+        recipe = Recipe.objects.create(
+            author=author or cls.author, name=name, text=f'Описание: {name}',
+            cooking_time=15, image=image_file(),
+        )
+        for tag in tags:
+            RecipeTag.objects.create(recipe=recipe, tag=tag)
+        for ingredient, amount in ingredients:
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=amount
+            )
+        if not variants:
+            Recipe.objects.filter(pk=recipe.pk).update(
+                image_thumbnail='', image_medium=''
+            )
+        return Recipe.objects.get(pk=recipe.pk)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def assertAdminOnly(self, url):
+        staff = User.objects.create_user(
+            username='staff', email='staff@example.com', password='pass',
+            is_staff=True,
+        )
+        admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='pass',
+            role=User.ADMIN,
+        )
+        self.assertEqual(APIClient().get(url).status_code, 401)
+        self.assertEqual(self.client_for(staff).get(url).status_code, 403)
+        self.assertEqual(self.client_for(admin).get(url).status_code, 200)
+
+
+class ShoppingListDownloadTests(TestCase):
+    """Выгрузка списка покупок."""
+
+    url = '/api/recipes/download_shopping_cart/'
+
+    def test_error_is_rendered_as_json(self):
+        for media_type in ('application/pdf', 'text/csv', 'text/plain',
+                           'application/json'):
+            with self.subTest(media_type=media_type):
+                response = APIClient().get(self.url, HTTP_ACCEPT=media_type)
+                self.assertEqual(response.status_code, 401)
+                self.assertTrue(
+                    response['Content-Type'].startswith('application/json')
+                )
+
+    def test_download_formats(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(
+            username='buyer', email='buyer@example.com', password='pass'
+        ))
+        for media_type in ('application/pdf', 'text/csv', 'text/plain'):
+            with self.subTest(media_type=media_type):
+                response = client.get(self.url, HTTP_ACCEPT=media_type)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Content-Type'], media_type)
+
+    def test_default_and_json_formats(self):
+        user = User.objects.create_user(
+            username='buyer', email='buyer@example.com', password='pass'
+        )
+        ingredient = Ingredient.objects.create(
+            name='Соль', measurement_unit='г'
+        )
+        ShoppingListItem.objects.create(
+            user=user, ingredient=ingredient, amount=5
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/plain')
+        self.assertEqual(
+            b''.join(response.streaming_content).decode(),
+            'Список покупок:\nСоль - 5 г\n',
+        )
+        response = client.get(self.url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [
+            {'name': 'Соль', 'measurement_unit': 'г', 'amount': 5},
+        ])
+
+
+class RecipeCacheTests(RecipeTestCase):
+    """Сброс кэша представлений рецептов."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe(
+            'Суп', tags=self.tags[:1], ingredients=[(self.ingredients[0], 2)]
+        )
+        self.url = f'/api/recipes/{self.recipe.pk}/'
+
+    def get(self):
+        response = APIClient().get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_recipe_change(self):
+        self.assertEqual(self.get()['name'], 'Суп')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.name = 'Борщ'
+            self.recipe.save()
+        self.assertEqual(self.get()['name'], 'Борщ')
+
+    def test_tag_and_ingredient_change(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeTag.objects.create(recipe=self.recipe, tag=self.tags[1])
+            ingredient = self.ingredients[0]
+            ingredient.name = 'Соль'
+            ingredient.save()
+        data = self.get()
+        self.assertEqual([tag['id'] for tag in data['tags']],
+                         [tag.pk for tag in self.tags[:2]])
+        self.assertEqual(data['ingredients'][0]['name'], 'Соль')
+
+    def test_author_change(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.first_name = 'Мария'
+            self.author.save()
+        self.assertEqual(self.get()['author']['first_name'], 'Мария')
+
+    def test_load_started_before_invalidation(self):
+        serialize = recipe_cache.serialize
+
+        def serialize_and_change(pks):
+            data = serialize(pks)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.recipe.name = 'Борщ'
+                self.recipe.save()
+            return data
+
+        with mock.patch.object(recipe_cache, 'serialize',
+                               serialize_and_change):
+            self.assertEqual(self.get()['name'], 'Суп')
+        self.assertEqual(self.get()['name'], 'Борщ')
+        with self.assertNumQueries(0):
+            item, = recipe_cache.get_many([self.recipe.pk])
+        self.assertEqual(item['name'], 'Борщ')
+
+    def test_cache_stats_for_admins_only(self):
+        self.assertAdminOnly('/api/recipes/cache_stats/')
+
+
+class RecipeListQueryCountTests(RecipeTestCase):
+    """Число запросов списка рецептов не зависит от размера страницы."""
+
+    def setUp(self):
+        super().setUp()
+        Recipe.objects.bulk_create([
+            Recipe(author=self.author, name=f'Рецепт {number}', text='Текст',
+                   cooking_time=10, image='recipes_images/recipe.png')
+            for number in range(60)
+        ])
+        recipes = list(Recipe.objects.all())
+        RecipeTag.objects.bulk_create([
+            RecipeTag(recipe=recipe, tag=tag)
+            for recipe in recipes for tag in self.tags[:2]
+        ])
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+            for recipe in recipes for ingredient in self.ingredients[:2]
+        ])
+        Favorite.objects.bulk_create([
+            Favorite(user=self.reader, recipe=recipe)
+            for recipe in recipes[::2]
+        ])
+
+    def assertQueries(self, client, cold, warm):
+        for limit in (6, 50):
+            cache.clear()
+            with self.assertNumQueries(cold):
+                response = client.get(f'/api/recipes/?limit={limit}')
+            self.assertEqual(len(response.json()['results']), limit)
+            with self.assertNumQueries(warm):
+                client.get(f'/api/recipes/?limit={limit}')
+        return response.json()['results']
+
+    def test_anonymous(self):
+        results = self.assertQueries(APIClient(), cold=7, warm=3)
+        self.assertFalse(any(item['is_favorited'] for item in results))
+
+    def test_authenticated(self):
+        results = self.assertQueries(
+            self.client_for(self.reader), cold=7, warm=3
+        )
+        self.assertEqual(
+            sum(item['is_favorited'] for item in results), 25
+        )
+        self.assertEqual(len(results[0]['tags']), 2)
+        self.assertEqual(len(results[0]['ingredients']), 2)
+
+
+class KeysetPaginationTests(RecipeTestCase):
+    """Пагинация списка рецептов по ключу (pub_date, id)."""
+
+    def setUp(self):
+        super().setUp()
+        Recipe.objects.bulk_create([
+            Recipe(author=self.author, name=f'Рецепт {number}', text='Текст',
+                   cooking_time=10, image='recipes_images/recipe.png')
+            for number in range(7)
+        ])
+        recipes = list(Recipe.objects.order_by('pk'))
+        now = timezone.now()
+        # Три пары рецептов с одинаковой датой и один отдельный.
+        for index, recipe in enumerate(recipes):
+            Recipe.objects.filter(pk=recipe.pk).update(
+                pub_date=now - timedelta(days=index // 2)
+            )
+        self.expected = list(Recipe.objects.order_by(
+            '-pub_date', '-id'
+        ).values_list('id', flat=True))
+
+    def walk(self, url, link):
+        pages = []
+        while url:
+            response = APIClient().get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            pages.append([item['id'] for item in data['results']])
+            url = data[link]
+        return pages
+
+    def test_walk_without_duplicates_or_gaps(self):
+        pages = self.walk('/api/recipes/?limit=2&cursor=', 'next')
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        self.assertEqual(sum(pages, []), self.expected)
+        last = APIClient().get('/api/recipes/?limit=2&cursor=').json()
+        while last['next']:
+            last = APIClient().get(last['next']).json()
+        back = self.walk(last['previous'], 'previous')
+        self.assertEqual(sum(reversed(back), []), self.expected[:-1])
+
+    def test_equal_pub_date(self):
+        Recipe.objects.update(pub_date=timezone.now())
+        pages = self.walk('/api/recipes/?limit=3&cursor=', 'next')
+        self.assertEqual(sum(pages, []), sorted(self.expected, reverse=True))
+
+    def test_malformed_cursor(self):
+        def encode(value):
+            return base64.urlsafe_b64encode(value.encode()).decode()
+
+        date = timezone.now().isoformat()
+        for cursor in ('abc', '%%%', 'Рецепт', encode('f|not-a-date|1'),
+                       encode('x|' + date + '|1'), encode('f|' + date),
+                       encode('f|2024-01-01T00:00:00|1'),
+                       encode(f'f|{date}|{2 ** 70}'),
+                       encode(f'f|{date}|-1')):
+            with self.subTest(cursor=cursor):
+                response = APIClient().get(
+                    '/api/recipes/', {'cursor': cursor}
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('cursor', response.json())
+
+
+class Base64ImageFieldTests(TestCase):
+    """Декодирование картинки из base64."""
+
+    def test_decodes_wrapped_payload(self):
+        content = image_file().read()
+        encoded = base64.encodebytes(content).decode()
+        field = Base64ImageField()
+        field.decode_chunk_size = 64
+        file = field.to_internal_value(f'data:image/png;base64,{encoded}')
+        self.assertIn('\n', encoded)
+        self.assertEqual(file.read(), content)
+
+
+class IngredientIndexTests(TestCase):
+    """Индекс ингредиентов в памяти для поиска по началу названия."""
+
+    def setUp(self):
+        ingredient_index.invalidate()
+        self.salt, self.sugar, self.soda, _ = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('Соль', 'Сахар', 'Сода пищевая', 'Перец')
+        ]
+
+    def names(self, query):
+        return [item['name'] for item in ingredient_index.search(query)]
+
+    def test_prefix_search(self):
+        self.assertEqual(self.names('со'), ['Соль', 'Сода пищевая'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.names('СО, сод'), ['Сода пищевая'])
+            self.assertEqual(self.names('оль'), [])
+            self.assertEqual(len(self.names('')), 4)
+        response = APIClient().get('/api/ingredients/', {'name': 'са'})
+        self.assertEqual([item['id'] for item in response.json()],
+                         [self.sugar.pk])
+
+    def test_ttl(self):
+        self.names('со')
+        Ingredient.objects.bulk_create([
+            Ingredient(name='Сметана', measurement_unit='г')
+        ])
+        self.assertEqual(self.names('см'), [])
+        expired = time.monotonic() + settings.INGREDIENT_INDEX_TTL + 1
+        with mock.patch('menu.ingredient_index.time.monotonic',
+                        return_value=expired):
+            self.assertEqual(self.names('см'), ['Сметана'])
+
+    def test_version(self):
+        ingredient_index.search('со', version=1)
+        Ingredient.objects.bulk_create([
+            Ingredient(name='Сметана', measurement_unit='г')
+        ])
+        with self.assertNumQueries(0):
+            ingredient_index.search('см', version=1)
+        self.assertEqual(
+            [item['name']
+             for item in ingredient_index.search('см', version=2)],
+            ['Сметана'],
+        )
+
+    def test_invalidated_on_save_and_delete(self):
+        self.names('со')
+        self.salt.name = 'Мука'
+        self.salt.save()
+        self.assertEqual(self.names('со'), ['Сода пищевая'])
+        self.assertEqual(self.names('му'), ['Мука'])
+        self.soda.delete()
+        self.assertEqual(self.names('со'), [])
+
+
+class CatalogConditionalGetTests(TestCase):
+    """ETag справочников тегов и ингредиентов."""
+
+    def setUp(self):
+        cache.clear()
+        ingredient_index.invalidate()
+        self.ingredient = Ingredient.objects.create(
+            name='Соль', measurement_unit='г'
+        )
+        self.tag = Tag.objects.create(name='Завтрак', color='#E26C2D',
+                                      slug='breakfast')
+
+    def assertChanged(self, url, change):
+        """После change ответ на прежний ETag - 200 с новым ETag."""
+        etag = APIClient().get(url)['ETag']
+        self.assertEqual(
+            APIClient().get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        return response.json()
+
+    def test_not_modified(self):
+        for url in ('/api/tags/', f'/api/tags/{self.tag.pk}/',
+                    '/api/ingredients/'):
+            with self.subTest(url=url):
+                response = APIClient().get(url)
+                etag = response['ETag']
+                last_modified = response['Last-Modified']
+                self.assertIn('max-age', response['Cache-Control'])
+                for headers in ({'HTTP_IF_NONE_MATCH': etag},
+                                {'HTTP_IF_MODIFIED_SINCE': last_modified}):
+                    response = APIClient().get(url, **headers)
+                    self.assertEqual(response.status_code, 304)
+                    self.assertEqual(response.content, b'')
+                    self.assertEqual(response['ETag'], etag)
+                    self.assertIn('public', response['Cache-Control'])
+                for headers in (
+                    {'HTTP_IF_NONE_MATCH': '"tags-1"'},
+                    {'HTTP_IF_MODIFIED_SINCE':
+                     'Thu, 01 Jan 2015 00:00:00 GMT'},
+                ):
+                    response = APIClient().get(url, **headers)
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(response['ETag'], etag)
+
+    def test_ingredient_rename(self):
+        def rename():
+            self.ingredient.name = 'Сахар'
+            self.ingredient.save()
+
+        data = self.assertChanged('/api/ingredients/', rename)
+        self.assertEqual([item['name'] for item in data], ['Сахар'])
+
+    def test_ingredient_import(self):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix='.csv', encoding='utf-8', delete=False
+        ) as file:
+            file.write('Перец,г\n')
+        self.addCleanup(os.remove, file.name)
+        data = self.assertChanged(
+            '/api/ingredients/', lambda: call_command(
+                'import_ingredients', file.name, stdout=io.StringIO()
+            )
+        )
+        self.assertEqual({item['name'] for item in data}, {'Соль', 'Перец'})
+
+    def test_not_modified_without_queries(self):
+        for url in ('/api/ingredients/', '/api/ingredients/?name=со',
+                    '/api/tags/'):
+            etag = APIClient().get(url)['ETag']
+            with self.assertNumQueries(0):
+                response = APIClient().get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+
+    def test_ingredient_bulk_delete(self):
+        data = self.assertChanged(
+            '/api/ingredients/',
+            lambda: Ingredient.objects.filter(pk=self.ingredient.pk).delete()
+        )
+        self.assertEqual(data, [])
+
+    def test_tag_rename(self):
+        def rename():
+            self.tag.name = 'Обед'
+            self.tag.save()
+
+        data = self.assertChanged('/api/tags/', rename)
+        self.assertEqual([item['name'] for item in data], ['Обед'])
+
+
+class RecipeTagsFilterTests(RecipeTestCase):
+    """Фильтр рецептов по тегам через маску тегов."""
+
+    def setUp(self):
+        super().setUp()
+        first, second, third = self.tags
+        self.first = self.create_recipe('Омлет', tags=[first])
+        self.both = self.create_recipe('Каша', tags=[first, second])
+        self.third = self.create_recipe('Суп', tags=[third])
+        self.create_recipe('Чай')
+
+    def ids(self, query):
+        response = APIClient().get(f'/api/recipes/?limit=100&{query}')
+        self.assertEqual(response.status_code, 200)
+        return {item['id'] for item in response.json()['results']}
+
+    def test_any_tag(self):
+        self.assertEqual(self.ids('tags=tag0&tags=tag1'),
+                         {self.first.pk, self.both.pk})
+
+    def test_all_tags(self):
+        self.assertEqual(self.ids('tags=tag0&tags=tag1&tags_mode=all'),
+                         {self.both.pk})
+
+    def test_mask_follows_recipe_tags(self):
+        RecipeTag.objects.filter(recipe=self.both, tag=self.tags[0]).delete()
+        RecipeTag.objects.create(recipe=self.third, tag=self.tags[0])
+        self.assertEqual(self.ids('tags=tag0'),
+                         {self.first.pk, self.third.pk})
+
+    def test_tag_without_bit(self):
+        Tag.objects.filter(pk=self.tags[2].pk).update(bit=None)
+        Recipe.objects.update_tags_mask()
+        self.assertEqual(self.ids('tags=tag2'), {self.third.pk})
+        tag = Tag.objects.get(pk=self.tags[2].pk)
+        tag.save()
+        self.assertIsNotNone(tag.bit)
+        self.assertEqual(Recipe.objects.get(pk=self.third.pk).tags_mask,
+                         1 << tag.bit)
+        self.assertEqual(self.ids('tags=tag2'), {self.third.pk})
+
+    def test_concurrently_taken_bit_is_retried(self):
+        free = Tag.free_bit()
+        with mock.patch.object(Tag, 'free_bit',
+                               side_effect=[self.tags[0].bit, free]):
+            tag = Tag.objects.create(name='Ужин', color='#000000',
+                                     slug='dinner')
+        self.assertEqual(tag.bit, free)
+
+
+class MetricsTests(RecipeTestCase):
+    """Метрики Prometheus."""
+
+    def test_metrics_for_admins_only(self):
+        self.assertAdminOnly('/api/metrics/')
+
+
+class PerformanceMiddlewareTests(TestCase):
+    """Заголовок Server-Timing и лог медленных запросов."""
+
+    url = '/api/tags/'
+
+    def setUp(self):
+        cache.clear()
+        Tag.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connections['default']) as queries:
+            response = APIClient().get(self.url)
+        phases = dict(re.findall(r'(\w+);dur=([\d.]+)',
+                                 response['Server-Timing']))
+        self.assertEqual(set(phases), {'db', 'serialize', 'render', 'total'})
+        self.assertLessEqual(
+            sum(float(phases[name]) for name in ('db', 'serialize', 'render')),
+            float(phases['total']) + 0.3,
+        )
+        self.assertIn(f'desc="{len(queries)} queries"',
+                      response['Server-Timing'])
+
+    @override_settings(SLOW_REQUEST_QUERIES=0)
+    def test_slow_request_is_logged(self):
+        with self.assertLogs('api.performance', 'WARNING') as logs:
+            APIClient().get(self.url)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn(f'Slow request GET {self.url}', logs.output[0])
+        self.assertIn('menu_tag', logs.output[0])
+
+    def test_fast_request_is_not_logged(self):
+        with mock.patch.object(middleware.logger, 'warning') as warning:
+            APIClient().get(self.url)
+        warning.assert_not_called()
+
+
+class RecipeSearchTests(RecipeTestCase):
+    """Полнотекстовый поиск рецептов."""
+
+    def setUp(self):
+        super().setUp()
+        first, second = self.ingredients[:2]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.soup = self.create_recipe(
+                'Суп', ingredients=[(first, 100), (second, 50)]
+            )
+            self.porridge = self.create_recipe(
+                'Каша', ingredients=[(second, 200)]
+            )
+
+    def ids(self, query):
+        response = APIClient().get(f'/api/recipes/?limit=100&search={query}')
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.json()['results']]
+
+    def test_search_by_name_and_ingredients(self):
+        self.assertEqual(self.ids('суп'), [self.soup.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = self.create_recipe('Ингредиент')
+        ids = self.ids('ингредиент')
+        self.assertEqual(ids[0], recipe.pk)
+        self.assertEqual(set(ids), {recipe.pk, self.soup.pk,
+                                    self.porridge.pk})
+
+    def test_recipe_ingredient_changes_refresh_documents(self):
+        third = self.ingredients[2]
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.create(
+                recipe=self.porridge, ingredient=third, amount=1
+            )
+        self.assertEqual(self.ids('ингредиент 2'), [self.porridge.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.filter(ingredient=third).delete()
+        self.assertEqual(self.ids('ингредиент 2'), [])
+
+    def test_ingredient_rename_and_delete_refresh_documents(self):
+        second = self.ingredients[1]
+        with self.captureOnCommitCallbacks(execute=True):
+            second.name = 'Свекла'
+            second.save()
+        self.assertEqual(set(self.ids('свекла')),
+                         {self.soup.pk, self.porridge.pk})
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertEqual(self.ids('свекла'), [])
+
+
+class BulkRecipesTests(RecipeTestCase):
+    """Добавление и удаление нескольких рецептов одним запросом."""
+
+    def setUp(self):
+        super().setUp()
+        first, second, third = self.ingredients[:3]
+        self.soup = self.create_recipe(
+            'Суп', ingredients=[(first, 100), (second, 50)]
+        )
+        self.porridge = self.create_recipe(
+            'Каша', ingredients=[(second, 200), (third, 10)]
+        )
+        self.client = self.client_for(self.reader)
+
+    def change(self, method, url, recipes):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(
+                url, {'recipes': [recipe.pk for recipe in recipes]},
+                format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+        return {item['id']: item['status']
+                for item in response.json()['results']}
+
+    def counts(self, field):
+        return list(Recipe.objects.filter(
+            pk__in=[self.soup.pk, self.porridge.pk]
+        ).order_by('pk').values_list(field, flat=True))
+
+    def shopping_list(self):
+        return dict(ShoppingListItem.objects.filter(
+            user=self.reader
+        ).values_list('ingredient__name', 'amount'))
+
+    def test_favorites(self):
+        url = '/api/recipes/favorite/'
+        self.change('post', url, [self.soup, self.porridge])
+        self.assertEqual(self.counts('favorites_count'), [1, 1])
+        self.assertEqual(self.change('delete', url, [self.soup, self.soup]),
+                         {self.soup.pk: 'removed'})
+        self.assertEqual(self.counts('favorites_count'), [0, 1])
+        self.assertEqual(
+            list(Favorite.objects.values_list('recipe', flat=True)),
+            [self.porridge.pk],
+        )
+
+    def bulk_recipes(self, count=100):
+        Recipe.objects.bulk_create([
+            Recipe(author=self.author, name=f'Рецепт {number}', text='Текст',
+                   cooking_time=10, image='recipes_images/recipe.png')
+            for number in range(count)
+        ])
+        return list(Recipe.objects.filter(
+            name__startswith='Рецепт '
+        ).order_by('pk'))
+
+    def test_bulk_favorites_query_count(self):
+        url = '/api/recipes/favorite/'
+        recipes = self.bulk_recipes()
+        self.change('post', url, recipes)
+        with self.assertNumQueries(6):
+            results = self.change('delete', url, recipes)
+        self.assertEqual(set(results.values()), {'removed'})
+        self.assertFalse(Favorite.objects.exists())
+        self.assertEqual(set(Recipe.objects.filter(
+            pk__in=results
+        ).values_list('favorites_count', flat=True)), {0})
+
+    def test_bulk_shopping_cart_query_count(self):
+        url = '/api/recipes/shopping_cart/'
+        recipes = self.bulk_recipes(99)
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+            for recipe in recipes
+            for ingredient in self.ingredients[:2]
+        ])
+        self.change('post', url, recipes + [self.soup])
+        self.assertEqual(self.shopping_list(), {
+            'Ингредиент 0': 199, 'Ингредиент 1': 149,
+        })
+        with self.assertNumQueries(13):
+            self.change('delete', url, recipes)
+        self.assertEqual(self.shopping_list(), {
+            'Ингредиент 0': 100, 'Ингредиент 1': 50,
+        })
+        self.change('post', url, recipes)
+        with self.assertNumQueries(11), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete('/api/recipes/clear_shopping_cart/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.shopping_list(), {})
+        self.assertEqual(set(Recipe.objects.values_list(
+            'shopping_cart_count', flat=True
+        )), {0})
+
+    def test_shopping_cart(self):
+        url = '/api/recipes/shopping_cart/'
+        self.change('post', url, [self.soup, self.porridge])
+        self.assertEqual(self.shopping_list(), {
+            'Ингредиент 0': 100, 'Ингредиент 1': 250, 'Ингредиент 2': 10,
+        })
+        self.change('delete', url, [self.porridge])
+        self.assertEqual(self.counts('shopping_cart_count'), [1, 0])
+        self.assertEqual(self.shopping_list(), {
+            'Ингредиент 0': 100, 'Ингредиент 1': 50,
+        })
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete('/api/recipes/clear_shopping_cart/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.counts('shopping_cart_count'), [0, 0])
+        self.assertFalse(ShoppingCart.objects.exists())
+        self.assertEqual(self.shopping_list(), {})
+
+
+class ShoppingListTests(RecipeTestCase):
+    """Список покупок пересчитывается при изменении корзины и рецептов."""
+
+    def setUp(self):
+        super().setUp()
+        first, second, third = self.ingredients[:3]
+        self.soup = self.create_recipe(
+            'Суп', tags=[self.tags[0]],
+            ingredients=[(first, 100), (second, 50)],
+        )
+        self.porridge = self.create_recipe(
+            'Каша', ingredients=[(second, 200), (third, 10)]
+        )
+        self.client = self.client_for(self.reader)
+
+    def shopping_list(self):
+        return dict(ShoppingListItem.objects.filter(
+            user=self.reader
+        ).values_list('ingredient__name', 'amount'))
+
+    def cart(self, method, recipe):
+        url = f'/api/recipes/{recipe.pk}/shopping_cart/'
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(url)
+
+    def test_cart_changes(self):
+        self.assertEqual(self.cart('post', self.soup).status_code, 201)
+        self.assertEqual(self.cart('post', self.porridge).status_code, 201)
+        self.assertEqual(self.shopping_list(), {
+            'Ингредиент 0': 100, 'Ингредиент 1': 250, 'Ингредиент 2': 10,
+        })
+        self.assertEqual(self.cart('delete', self.soup).status_code, 204)
+        self.assertEqual(self.shopping_list(), {
+            'Ингредиент 1': 200, 'Ингредиент 2': 10,
+        })
+
+    def test_recipe_changes(self):
+        self.cart('post', self.soup)
+        self.cart('post', self.porridge)
+        first, second, third, fourth = self.ingredients
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client_for(self.author).patch(
+                f'/api/recipes/{self.soup.pk}/', {
+                    'name': 'Суп', 'text': 'Суп', 'cooking_time': 20,
+                    'tags': [self.tags[0].pk],
+                    'ingredients': [{'id': second.pk, 'amount': 70},
+                                    {'id': fourth.pk, 'amount': 3}],
+                }, format='json',
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.shopping_list(), {
+            'Ингредиент 1': 270, 'Ингредиент 2': 10, 'Ингредиент 3': 3,
+        })
+        with self.captureOnCommitCallbacks(execute=True):
+            self.porridge.delete()
+        self.assertEqual(self.shopping_list(), {
+            'Ингредиент 1': 70, 'Ингредиент 3': 3,
+        })
+
+
+class CompressionTests(TestCase):
+    """Сжатие больших ответов со списками."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create([
+            Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+            for number in range(100)
+        ])
+
+    def test_compression_is_not_timed(self):
+        def slow_compress(content):
+            time.sleep(0.5)
+            return compress_string(content)
+
+        compress_string = middleware.compress_string
+        with mock.patch.object(middleware, 'compress_string', slow_compress):
+            response = self.client.get('/api/ingredients/',
+                                       HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))),
+                         100)
+        total = re.search(r'total;dur=([\d.]+)', response['Server-Timing'])
+        self.assertLess(float(total.group(1)), 500)
+
+
+class FlatSerializerTests(RecipeTestCase):
+    """api.flat_serializers отдает рецепты байт в байт как RecipeSerializer."""
+
+    def setUp(self):
+        super().setUp()
+        other = User.objects.create_user(
+            username='other', email='other@example.com', password='pass',
+            first_name='Мария', last_name='Смирнова',
+        )
+        first, second, third, fourth = self.ingredients
+        self.recipes = [
+            self.create_recipe(
+                'Суп', tags=self.tags,
+                ingredients=[(first, 100), (second, 50), (fourth, 3)],
+            ),
+            self.create_recipe(
+                'Каша', tags=self.tags[1:], ingredients=[(third, 200)],
+                variants=False,
+            ),
+            self.create_recipe(
+                'Чай', tags=[self.tags[2]],
+                ingredients=[(first, 1), (third, 2)], author=other,
+            ),
+            self.create_recipe(
+                'Омлет', tags=self.tags[:2],
+                ingredients=[(second, 30), (fourth, 10)], author=other,
+                variants=False,
+            ),
+        ]
+        Favorite.objects.create(user=self.reader, recipe=self.recipes[0])
+        Favorite.objects.create(user=self.reader, recipe=self.recipes[3])
+        ShoppingCart.objects.create(user=self.reader,
+                                    recipe=self.recipes[1])
+        Subscription.objects.create(user=self.reader, author=other)
+
+    def request(self, user=None):
+        request = APIRequestFactory().get('/api/recipes/')
+        if user is not None:
+            force_authenticate(request, user=user)
+        return Request(request)
+
+    def assertSameAsSerializer(self, user=None):
+        request = self.request(user)
+        pks = [recipe.pk for recipe in self.recipes]
+        recipes = Recipe.objects.with_user_flags(request.user)
+        instances = recipes.with_related().in_bulk(pks)
+        expected = RecipeSerializer(
+            [instances[pk] for pk in pks], many=True,
+            context={'request': request},
+        ).data
+        instances = recipes.in_bulk(pks)
+        actual = recipe_cache.represent(
+            [instances[pk] for pk in pks], request, serialize_recipes(pks)
+        )
+        renderer = JSONRenderer()
+        self.assertEqual(len(actual), len(expected))
+        for expected_item, actual_item in zip(expected, actual):
+            self.assertEqual(renderer.render(actual_item),
+                             renderer.render(expected_item))
+
+    def test_anonymous(self):
+        self.assertSameAsSerializer()
+
+    def test_authenticated(self):
+        self.assertSameAsSerializer(self.reader)
+
+
+class TokenAuthenticationTests(TestCase):
+    """Кэш токенов, выдача токена взамен истекшего и их очистка."""
+
+    def setUp(self):
+        self.user = User.objects.create(
+            username='reader', email='reader@example.com', password='pass',
+        )
+        self.token = Token.objects.create(user=self.user)
+
+    def authenticate(self, key=None):
+        return CachedTokenAuthentication().authenticate_credentials(
+            key or self.token.key
+        )
+
+    def expire(self, *tokens):
+        Token.objects.filter(key__in=[token.key for token in tokens]).update(
+            created=timezone.now() - settings.AUTH_TOKEN_TTL
+            - timedelta(minutes=1)
+        )
+
+    def test_cache_hit(self):
+        with self.assertNumQueries(1):
+            user, token = self.authenticate()
+        with self.assertNumQueries(0):
+            cached_user, cached_token = self.authenticate()
+        self.assertEqual(cached_user.pk, self.user.pk)
+        self.assertEqual(cached_token.key, self.token.key)
+        self.assertIsNot(cached_user, user)
+
+    def test_cache_ttl(self):
+        self.authenticate()
+        expired = time.monotonic() + settings.AUTH_TOKEN_CACHE_TTL + 1
+        with mock.patch('api.authentication.time.monotonic',
+                        return_value=expired), self.assertNumQueries(1):
+            self.authenticate()
+
+    @override_settings(AUTH_TOKEN_CACHE_SIZE=2)
+    def test_cache_lru(self):
+        tokens_cache = TokenCache()
+        tokens = [
+            Token(key=f'key{number}', user_id=self.user.pk)
+            for number in range(3)
+        ]
+        tokens_cache.set(tokens[0])
+        tokens_cache.set(tokens[1])
+        self.assertIs(tokens_cache.get('key0'), tokens[0])
+        tokens_cache.set(tokens[2])
+        self.assertIsNone(tokens_cache.get('key1'))
+        self.assertIs(tokens_cache.get('key0'), tokens[0])
+        self.assertIs(tokens_cache.get('key2'), tokens[2])
+
+    def test_logout_invalidates_cache(self):
+        self.authenticate()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        response = client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_user_change_invalidates_cache(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_expired_token(self):
+        self.expire(self.token)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_login_replaces_expired_token(self):
+        self.expire(self.token)
+        response = APIClient().post('/api/auth/token/login/', {
+            'email': 'reader@example.com', 'password': 'pass',
+        })
+        self.assertEqual(response.status_code, 201)
+        key = response.json()['auth_token']
+        self.assertNotEqual(key, self.token.key)
+        self.assertEqual(
+            list(Token.objects.values_list('key', flat=True)), [key]
+        )
+        self.assertEqual(self.authenticate(key)[0].pk, self.user.pk)
+
+    def test_purge_expired_tokens(self):
+        users = [
+            User.objects.create(username=f'user{number}',
+                                email=f'user{number}@example.com')
+            for number in range(4)
+        ]
+        expired = [Token.objects.create(user=user) for user in users[:3]]
+        self.expire(*expired)
+        fresh = Token.objects.create(user=users[3])
+        stdout = io.StringIO()
+        call_command('purge_expired_tokens', batch_size=2, stdout=stdout)
+        self.assertEqual(
+            stdout.getvalue().splitlines(),
+            ['2 tokens deleted', '3 tokens deleted',
+             'Deleted 3 expired tokens'],
+        )
+        self.assertEqual(set(Token.objects.values_list('key', flat=True)),
+                         {self.token.key, fresh.key})
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT, REPLICA_DATABASES=[REPLICA])
+class ReplicaRoutingTests(TransactionTestCase):
+    """Чтение с реплики и с основной базы (ReplicaRoutingMiddleware)."""
+
+    databases = {'default', REPLICA}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(
+            username='reader', email='reader@example.com', password='pass',
+        )
+        self.token = Token.objects.create(user=self.user)
+        Tag.objects.create(name='Завтрак', color='#000000', slug='breakfast')
+        self.recipe = Recipe.objects.create(
+            author=self.user, name='Суп', text='Текст', cooking_time=10,
+            image=image_file(),
+        )
+
+    def get(self, client, url):
+        """Ответ и SQL запросов к основной базе и к реплике."""
+        with CaptureQueriesContext(connections['default']) as primary, \
+                CaptureQueriesContext(connections[REPLICA]) as replica:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [
+            [query['sql'] for query in context.captured_queries]
+            for context in (primary, replica)
+        ]
+
+    def authorized(self, token):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+    def test_get_reads_from_replica(self):
+        _, (primary, replica) = self.get(APIClient(), '/api/tags/')
+        self.assertEqual(primary, [])
+        self.assertNotEqual(replica, [])
+
+    def test_write_pins_client_to_primary(self):
+        client = self.authorized(self.token)
+        response = client.post(f'/api/recipes/{self.recipe.pk}/favorite/')
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        # Клиент с cookie и клиент с тем же токеном без cookie.
+        for pinned in (client, self.authorized(self.token)):
+            _, (primary, replica) = self.get(pinned, '/api/tags/')
+            self.assertNotEqual(primary, [])
+            self.assertEqual(replica, [])
+        other = Token.objects.create(user=User.objects.create(
+            username='other', email='other@example.com', password='pass',
+        ))
+        _, (_, replica) = self.get(self.authorized(other), '/api/tags/')
+        self.assertNotEqual(replica, [])
+
+    def test_cache_loads_read_from_primary(self):
+        response, (primary, replica) = self.get(
+            APIClient(), f'/api/recipes/{self.recipe.pk}/'
+        )
+        self.assertEqual(response.json()['name'], 'Суп')
+        self.assertNotEqual(replica, [])
+        self.assertTrue(any('menu_recipeingredient' in sql
+                            for sql in primary))
+        self.assertFalse(any('menu_recipeingredient' in sql
+                             for sql in replica))
+        _, (primary, replica) = self.get(
+            APIClient(), '/api/ingredients/?name=со'
+        )
+        self.assertNotEqual(primary, [])
+        self.assertEqual(replica, [])
+
+
+class SubscriptionsTests(RecipeTestCase):
+    """Список подписок с последними рецептами авторов."""
+
+    url = '/api/users/subscriptions/'
+
+    def setUp(self):
+        super().setUp()
+        self.authors = [self.author] + [
+            User.objects.create_user(
+                username=f'author{number}', password='pass',
+                email=f'author{number}@example.com',
+            )
+            for number in range(4)
+        ]
+        for author in self.authors:
+            Subscription.objects.create(user=self.reader, author=author)
+            Recipe.objects.bulk_create([
+                Recipe(author=author, name=f'{author.username} {number}',
+                       text='Текст', cooking_time=10,
+                       image='recipes_images/recipe.png')
+                for number in range(3)
+            ])
+        # bulk_create не обновляет счетчик рецептов автора.
+        User.objects.filter(
+            pk__in=[author.pk for author in self.authors]
+        ).update(recipes_count=3)
+        self.client = self.client_for(self.reader)
+
+    def test_recipes_limit(self):
+        response = self.client.get(self.url, {'recipes_limit': 2})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), 5)
+        for item in results:
+            latest = Recipe.objects.filter(
+                author_id=item['id']
+            ).order_by('-pub_date', '-id')[:2]
+            self.assertEqual([recipe['id'] for recipe in item['recipes']],
+                             [recipe.pk for recipe in latest])
+            self.assertEqual(item['recipes_count'], 3)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        for limit in (2, 5):
+            with self.subTest(limit=limit), self.assertNumQueries(3):
+                response = self.client.get(
+                    self.url, {'limit': limit, 'recipes_limit': 2}
+                )
+            self.assertEqual(len(response.json()['results']), limit)
+
+    def test_invalid_recipes_limit(self):
+        for limit in ('abc', '-1', '0', '1.5'):
+            with self.subTest(limit=limit):
+                response = self.client.get(
+                    self.url, {'recipes_limit': limit}
+                )
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('recipes_limit', response.json())
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class AsyncViewParityTests(TransactionTestCase):
+    """
+    Асинхронные view отвечают так же, как синхронные. Запросы
+    асинхронных view идут из пула потоков, поэтому данные должны быть
+    закоммичены - отсюда TransactionTestCase.
+    """
+
+    def setUp(self):
+        cache.clear()
+        ingredient_index.invalidate()
+        self.reader, author, other = [
+            User.objects.create_user(
+                username=name, email=f'{name}@example.com', password='pass',
+            )
+            for name in ('reader', 'author', 'other')
+        ]
+        tags = [
+            Tag.objects.create(name=f'Тег {number}', color=f'#00000{number}',
+                               slug=f'tag{number}')
+            for number in range(3)
+        ]
+        ingredient = Ingredient.objects.create(name='Ингредиент',
+                                               measurement_unit='г')
+        recipes = []
+        for number, (name, recipe_author) in enumerate(
+            (('Суп', author), ('Каша', author), ('Чай', other))
+        ):
+            recipe = Recipe.objects.create(
+                author=recipe_author, name=name, text=f'Описание: {name}',
+                cooking_time=15, image=image_file(),
+            )
+            recipe.tags.set(tags[number:number + 2])
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=number + 1
+            )
+            recipes.append(recipe)
+        self.recipe = recipes[0]
+        Favorite.objects.create(user=self.reader, recipe=recipes[0])
+        ShoppingCart.objects.create(user=self.reader, recipe=recipes[2])
+        Subscription.objects.create(user=self.reader, author=author)
+        Subscription.objects.create(user=self.reader, author=other)
+        self.token = Token.objects.create(user=self.reader)
+
+    def assertSameResponse(self, view, path, token=None, **kwargs):
+        headers = {}
+        if token is not None:
+            headers['HTTP_AUTHORIZATION'] = f'Token {token.key}'
+        expected = APIClient().get(path, **headers)
+        self.assertEqual(expected.status_code, 200)
+        actual = async_to_sync(view)(
+            APIRequestFactory().get(path, **headers), **kwargs
+        )
+        self.assertEqual(actual.status_code, 200)
+        self.assertEqual(json.loads(actual.content), expected.json())
+
+    def test_recipes(self):
+        pk = self.recipe.pk
+        cases = [
+            (path, token)
+            for token in (None, self.token)
+            for path in ('/api/recipes/', '/api/recipes/?limit=2&page=2',
+                         '/api/recipes/?tags=tag1')
+        ]
+        cases.append(('/api/recipes/?is_favorited=1', self.token))
+        for path, token in cases:
+            with self.subTest(path=path, token=token):
+                self.assertSameResponse(async_views.recipe_list, path, token)
+        for token in (None, self.token):
+            with self.subTest(token=token):
+                self.assertSameResponse(
+                    async_views.recipe_detail, f'/api/recipes/{pk}/',
+                    token, pk=pk,
+                )
+
+    def test_catalogs(self):
+        self.assertSameResponse(async_views.tag_list, '/api/tags/')
+        for path in ('/api/ingredients/', '/api/ingredients/?name=ингр'):
+            with self.subTest(path=path):
+                self.assertSameResponse(async_views.ingredient_list, path)
+
+    def test_subscriptions(self):
+        for path in ('/api/users/subscriptions/',
+                     '/api/users/subscriptions/?limit=1&recipes_limit=1'):
+            with self.subTest(path=path):
+                self.assertSameResponse(
+                    async_views.subscriptions, path, self.token
+                )
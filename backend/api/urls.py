@@ -1,21 +1,37 @@
-from django.conf.urls import url
-from django.urls import include, path
-from rest_framework import routers
-
-from .views import (RecipeView, TagView, IngredientView,
-                    TokenLoginView, UsersView)
-
-app_name = 'api'
-
-v1_router = routers.DefaultRouter()
-v1_router.register('users', UsersView, basename='users')
-v1_router.register('recipes', RecipeView, basename='recipes')
-v1_router.register('tags', TagView, basename='tags')
-v1_router.register('ingredients', IngredientView, basename='ingredients')
-
-urlpatterns = [
-    path('auth/token/login/', TokenLoginView.as_view(
-        {'post': 'login'})),
-    path('', include(v1_router.urls)),
-    url('auth/', include('djoser.urls.authtoken')),
-]
+from django.conf import settings
+from django.conf.urls import url
+from django.urls import include, path
+from rest_framework import routers
+
+from . import async_views
+from .views import (RecipeView, TagView, IngredientView, MetricsView,
+                    TokenLoginView, UsersView)
+
+app_name = 'api'
+
+v1_router = routers.DefaultRouter()
+v1_router.register('users', UsersView, basename='users')
+v1_router.register('recipes', RecipeView, basename='recipes')
+v1_router.register('tags', TagView, basename='tags')
+v1_router.register('ingredients', IngredientView, basename='ingredients')
+
+urlpatterns = [
+    path('auth/token/login/', TokenLoginView.as_view(
+        {'post': 'login'})),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('', include(v1_router.urls)),
+    url('auth/', include('djoser.urls.authtoken')),
+]
+
+if settings.ASYNC_READ_VIEWS:
+    # Асинхронные версии самых частых запросов на чтение - перед роутером.
+    urlpatterns = [
+        path('recipes/', async_views.recipe_list, name='recipes-list'),
+        path('recipes/<int:pk>/', async_views.recipe_detail,
+             name='recipes-detail'),
+        path('tags/', async_views.tag_list, name='tags-list'),
+        path('ingredients/', async_views.ingredient_list,
+             name='ingredients-list'),
+        path('users/subscriptions/', async_views.subscriptions,
+             name='users-subscriptions'),
+    ] + urlpatterns
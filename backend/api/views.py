@@ -1,274 +1,482 @@
-from django.db.models import Sum
-from django.http import HttpResponse
-from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.response import Response
-from rest_framework import permissions, status, viewsets
-from rest_framework.exceptions import ValidationError
-from rest_framework.decorators import action
-from rest_framework.pagination import LimitOffsetPagination
-from django.shortcuts import get_object_or_404
-from rest_framework.authtoken.models import Token
-
-from .permissions import IsAuthorAdminSuperuserOrReadOnlyPermission
-from .serializers import (
-    TokenSerializer, UserCreateSerializer, UsersSerializer,
-    SetPasswordSerializer, ShowSubscriptionsSerializer, SubscriptionSerializer,
-    RecipeSerializer, TagSerializer, IngredientSerialiser,
-    ShoppingCartSerializer, CreateRecipeSerializer, FavoriteSerializer,
-    RecipeIngredient, UserPresentationAfterCreateSerializer
-)
-from menu.models import Recipe, Tag, Ingredient, Favorite, ShoppingCart
-from user.models import User, Subscription
-from .filters import IngredientFilter, RecipeFilter
-from .pagination import LimitPagination
-
-
-class UsersView(viewsets.ModelViewSet):
-    """ViewSet для управления пользователями."""
-
-    serializer_class = UsersSerializer
-    permission_classes = (permissions.AllowAny,)
-    lookup_field = 'id'
-    search_fields = ('id',)
-    http_method_names = ('get', 'post',)
-    pagination_class = LimitOffsetPagination
-
-    def get_queryset(self):
-        queryset = User.objects.all()
-        search_query = self.request.query_params.get('search')
-        if search_query:
-            queryset = queryset.filter(username__icontains=search_query)
-        return queryset
-
-    def create(self, request, *args, **kwargs):
-        """Создание пользователя."""
-
-        serializer = UserCreateSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        user = serializer.create(request.data)
-        serializer_for_response = UserPresentationAfterCreateSerializer(user)
-        return Response(serializer_for_response.data,
-                        status=status.HTTP_201_CREATED)
-
-    @action(
-        detail=False,
-        methods=['get', ],
-        url_path='me',
-        url_name='me',
-        permission_classes=(permissions.IsAuthenticated,))
-    def about_me(self, request):
-        serializer = UsersSerializer(request.user)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-
-    @action(
-        detail=False,
-        methods=['post', ],
-        url_path='set_password',
-        url_name='set_password',
-        permission_classes=(permissions.IsAuthenticated,)
-    )
-    def set_password(seld, request):
-        serializer = SetPasswordSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        user = request.user
-        password = user.password
-        password_for_check = serializer.data['current_password']
-        if password == password_for_check:
-            user.password = serializer.data['new_password']
-            user.save()
-        else:
-            return Response(status=status.HTTP_400_BAD_REQUEST)
-        return Response(status=status.HTTP_204_NO_CONTENT)
-
-    @action(
-        detail=True,
-        methods=['post', 'delete', ],
-        permission_classes=(permissions.IsAuthenticated,))
-    def subscribe(self, request, id):
-        if request.method == 'POST':
-            data = {
-                'user': request.user.id,
-                'author': id
-            }
-            serializer = SubscriptionSerializer(
-                data=data,
-                context={'request': request}
-            )
-            if serializer.is_valid():
-                serializer.save()
-                return Response(serializer.data,
-                                status=status.HTTP_201_CREATED)
-            return Response(status=status.HTTP_400_BAD_REQUEST)
-        else:
-            author = get_object_or_404(User, id=id)
-            if Subscription.objects.filter(
-               user=request.user, author=author).exists():
-                subscription = get_object_or_404(
-                    Subscription, user=request.user, author=author
-                )
-                subscription.delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
-            return Response(status=status.HTTP_400_BAD_REQUEST)
-
-    @action(
-        detail=False,
-        methods=['get', ],
-        permission_classes=(permissions.IsAuthenticated,))
-    def subscriptions(self, request):
-        user = request.user
-        queryset = User.objects.filter(author__user=user)
-        page = self.paginate_queryset(queryset)
-        serializer = ShowSubscriptionsSerializer(
-            page, many=True, context={'request': request}
-        )
-        return self.get_paginated_response(serializer.data)
-
-
-class TokenLoginView(viewsets.ModelViewSet):
-    """ViewSet для получения логина."""
-
-    serializer_class = TokenSerializer
-    permission_classes = (permissions.AllowAny,)
-    http_method_names = ('post',)
-    queryset = User.objects.all()
-
-    def login(self, request):
-        serializer = TokenSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        email = serializer.data['email']
-        user = get_object_or_404(User, email=email)
-        password = serializer.data['password']
-        if user.password != password:
-            raise ValidationError('Неверный пароль')
-        token = Token.objects.create(user=user)
-        return Response({'auth_token': str(token)},
-                        status=status.HTTP_201_CREATED)
-
-
-class RecipeView(viewsets.ModelViewSet):
-    """View для отображение рецептов и действия с ними."""
-
-    permission_classes = (IsAuthorAdminSuperuserOrReadOnlyPermission, )
-    queryset = Recipe.objects.all()
-    serializer_class = RecipeSerializer
-    pagination_class = LimitPagination
-    filterset_class = RecipeFilter
-    filter_backends = [DjangoFilterBackend, ]
-
-    def get_serializer_class(self):
-        if self.request.method == 'GET':
-            return RecipeSerializer
-        return CreateRecipeSerializer
-
-    def get_serializer_context(self):
-        context = super().get_serializer_context()
-        context.update({'request': self.request})
-        return context
-
-    @action(
-        detail=True,
-        methods=['post', 'delete'],
-        permission_classes=(permissions.IsAuthenticated,))
-    def shopping_cart(self, request, pk):
-        if request.method == 'POST':
-            data = {
-                'user': request.user.id,
-                'recipe': pk
-            }
-            recipe = get_object_or_404(Recipe, id=pk)
-            if not ShoppingCart.objects.filter(
-               user=request.user, recipe=recipe).exists():
-                serializer = ShoppingCartSerializer(
-                    data=data, context={'request': request}
-                )
-                if serializer.is_valid(raise_exception=True):
-                    serializer.save()
-                    return Response(serializer.data,
-                                    status=status.HTTP_201_CREATED)
-            return Response(status=status.HTTP_400_BAD_REQUEST)
-        else:
-            recipe = get_object_or_404(Recipe, id=pk)
-        if ShoppingCart.objects.filter(
-           user=request.user, recipe=recipe).exists():
-            ShoppingCart.objects.filter(
-                user=request.user, recipe=recipe
-            ).delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        return Response(status=status.HTTP_400_BAD_REQUEST)
-
-    @action(
-        detail=True,
-        methods=['post', 'delete'],
-        permission_classes=(permissions.IsAuthenticated,))
-    def favorite(self, request, pk):
-        if request.method == 'POST':
-            data = {
-                'user': request.user.id,
-                'recipe': pk
-            }
-            if not Favorite.objects.filter(
-               user=request.user, recipe__id=pk).exists():
-                serializer = FavoriteSerializer(
-                    data=data, context={'request': request}
-                )
-                if serializer.is_valid():
-                    serializer.save()
-                    return Response(serializer.data,
-                                    status=status.HTTP_201_CREATED)
-            return Response(status=status.HTTP_400_BAD_REQUEST)
-        else:
-            recipe = get_object_or_404(Recipe, id=pk)
-            if Favorite.objects.filter(
-               user=request.user, recipe=recipe).exists():
-                Favorite.objects.filter(
-                    user=request.user, recipe=recipe).delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
-            return Response(status=status.HTTP_400_BAD_REQUEST)
-
-    @action(
-        detail=False,
-        methods=['get', ],
-        url_path='download_shopping_cart',
-        url_name='download_shopping_cart',
-        permission_classes=(permissions.IsAuthenticated,))
-    def download_shopping_cart(self, request,):
-        ingredient_list = "Cписок покупок:"
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shopping_cart__user=request.user
-        ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(amount=Sum('amount'))
-        for num, i in enumerate(ingredients):
-            ingredient_list += (
-                f"\n{i['ingredient__name']} - "
-                f"{i['amount']} {i['ingredient__measurement_unit']}"
-            )
-            if num < ingredients.count() - 1:
-                ingredient_list += ', '
-        file = 'shopping_list'
-        response = HttpResponse(ingredient_list,
-                                'Content-Type: application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{file}.pdf"'
-        return response
-
-
-class TagView(viewsets.ModelViewSet):
-    """View для отображение тэгов."""
-
-    http_method_names = ('get', )
-    permission_classes = (permissions.AllowAny,)
-    queryset = Tag.objects.all()
-    serializer_class = TagSerializer
-    pagination_class = None
-
-
-class IngredientView(viewsets.ModelViewSet):
-    """View для отображение ингридиентов."""
-
-    http_method_names = ('get', )
-    permission_classes = (permissions.AllowAny,)
-    queryset = Ingredient.objects.all()
-    serializer_class = IngredientSerialiser
-    pagination_class = None
-    filter_backends = [IngredientFilter, ]
-    search_fields = ['^name', ]
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Value
+from django.http import StreamingHttpResponse
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.response import Response
+from rest_framework import permissions, status, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.decorators import action
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.views import APIView
+from django.shortcuts import get_object_or_404
+from rest_framework.authtoken.models import Token
+
+from .permissions import (IsAdminPermission,
+                          IsAuthorAdminSuperuserOrReadOnlyPermission)
+from .serializers import (
+    TokenSerializer, UserCreateSerializer, UsersSerializer,
+    SetPasswordSerializer, ShowSubscriptionsSerializer, SubscriptionSerializer,
+    RecipeSerializer, TagSerializer, IngredientSerialiser,
+    ShoppingCartSerializer, CreateRecipeSerializer, FavoriteSerializer,
+    UserPresentationAfterCreateSerializer,
+    BulkRecipesSerializer, get_recipes_limit
+)
+from menu.ingredient_index import ingredient_index
+from menu.recipe_match_index import match_in_database, recipe_match_index
+from menu.shopping_list import shopping_list_items
+from menu.timeline import Timeline
+from menu.user_recipes import add_recipes, clear_recipes, remove_recipes
+from menu.models import Recipe, Tag, Ingredient, Favorite, ShoppingCart
+from user.models import User, Subscription
+from .authentication import token_expired
+from .cache import recipe_cache
+from .catalog import ConditionalCatalogMixin
+from .filters import IngredientFilter, RecipeFilter
+from .flat_serializers import serialize_recipes
+from .metrics import route_metrics
+from .pagination import LimitPagination, TimelinePagination
+from .renderers import (SHOPPING_LIST_RENDERERS, PrometheusRenderer,
+                        ShoppingListRenderer)
+
+
+def readable_recipes(user):
+    """Рецепты с флагами пользователя для represent_recipes()."""
+    queryset = Recipe.objects.with_user_flags(user)
+    if not (settings.RECIPE_CACHE_ENABLED
+            or settings.RECIPE_FLAT_SERIALIZER_ENABLED):
+        queryset = queryset.with_related()
+    return queryset
+
+
+def represent_recipes(recipes, request):
+    """Представление рецептов, полученных через readable_recipes()."""
+    if settings.RECIPE_CACHE_ENABLED:
+        return recipe_cache.represent(recipes, request)
+    if settings.RECIPE_FLAT_SERIALIZER_ENABLED:
+        return recipe_cache.represent(recipes, request, serialize_recipes(
+            [recipe.pk for recipe in recipes]
+        ))
+    return RecipeSerializer(
+        recipes, many=True, context={'request': request}
+    ).data
+
+
+class UsersView(viewsets.ModelViewSet):
+    """ViewSet для управления пользователями."""
+
+    serializer_class = UsersSerializer
+    permission_classes = (permissions.AllowAny,)
+    lookup_field = 'id'
+    search_fields = ('id',)
+    http_method_names = ('get', 'post',)
+    pagination_class = LimitOffsetPagination
+
+    def get_queryset(self):
+        queryset = User.objects.all()
+        search_query = self.request.query_params.get('search')
+        if search_query:
+            queryset = queryset.filter(username__icontains=search_query)
+        return queryset
+
+    def create(self, request, *args, **kwargs):
+        """Создание пользователя."""
+
+        serializer = UserCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.create(request.data)
+        serializer_for_response = UserPresentationAfterCreateSerializer(user)
+        return Response(serializer_for_response.data,
+                        status=status.HTTP_201_CREATED)
+
+    @action(
+        detail=False,
+        methods=['get', ],
+        url_path='me',
+        url_name='me',
+        permission_classes=(permissions.IsAuthenticated,))
+    def about_me(self, request):
+        serializer = UsersSerializer(request.user)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(
+        detail=False,
+        methods=['post', ],
+        url_path='set_password',
+        url_name='set_password',
+        permission_classes=(permissions.IsAuthenticated,)
+    )
+    def set_password(seld, request):
+        serializer = SetPasswordSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = request.user
+        password = user.password
+        password_for_check = serializer.data['current_password']
+        if password == password_for_check:
+            user.password = serializer.data['new_password']
+            user.save(update_fields=['password'])
+        else:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(
+        detail=True,
+        methods=['post', 'delete', ],
+        permission_classes=(permissions.IsAuthenticated,))
+    def subscribe(self, request, id):
+        if request.method == 'POST':
+            data = {
+                'user': request.user.id,
+                'author': id
+            }
+            serializer = SubscriptionSerializer(
+                data=data,
+                context={'request': request}
+            )
+            if serializer.is_valid():
+                serializer.save()
+                return Response(serializer.data,
+                                status=status.HTTP_201_CREATED)
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        else:
+            author = get_object_or_404(User, id=id)
+            if Subscription.objects.filter(
+               user=request.user, author=author).exists():
+                subscription = get_object_or_404(
+                    Subscription, user=request.user, author=author
+                )
+                subscription.delete()
+                return Response(status=status.HTTP_204_NO_CONTENT)
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+
+    @action(
+        detail=False,
+        methods=['get', ],
+        permission_classes=(permissions.IsAuthenticated,))
+    def subscriptions(self, request):
+        user = request.user
+        limit = get_recipes_limit(request)
+        queryset = User.objects.filter(author__user=user).annotate(
+            is_subscribed=Value(True),
+        )
+        page = self.paginate_queryset(queryset)
+        recipes_by_author = defaultdict(list)
+        for recipe in Recipe.objects.latest_by_author(
+            [author.id for author in page], limit
+        ):
+            recipes_by_author[recipe.author_id].append(recipe)
+        for author in page:
+            author.latest_recipes = recipes_by_author[author.id]
+        serializer = ShowSubscriptionsSerializer(
+            page, many=True, context={'request': request}
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['get', ],
+        pagination_class=TimelinePagination,
+        permission_classes=(permissions.IsAuthenticated,))
+    def feed(self, request):
+        """Рецепты авторов, на которых подписан пользователь."""
+        page = self.paginate_queryset(
+            Timeline(request.user, readable_recipes(request.user))
+        )
+        return self.get_paginated_response(represent_recipes(page, request))
+
+
+class TokenLoginView(viewsets.ModelViewSet):
+    """ViewSet для получения логина."""
+
+    serializer_class = TokenSerializer
+    permission_classes = (permissions.AllowAny,)
+    http_method_names = ('post',)
+    queryset = User.objects.all()
+
+    def login(self, request):
+        serializer = TokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        email = serializer.data['email']
+        user = get_object_or_404(User, email=email)
+        password = serializer.data['password']
+        if user.password != password:
+            raise ValidationError('Неверный пароль')
+        token, created = Token.objects.get_or_create(user=user)
+        if not created and token_expired(token):
+            token.delete()
+            token = Token.objects.create(user=user)
+        return Response({'auth_token': str(token)},
+                        status=status.HTTP_201_CREATED)
+
+
+class RecipeView(viewsets.ModelViewSet):
+    """View для отображение рецептов и действия с ними."""
+
+    permission_classes = (IsAuthorAdminSuperuserOrReadOnlyPermission, )
+    queryset = Recipe.objects.all()
+    serializer_class = RecipeSerializer
+    pagination_class = LimitPagination
+    filterset_class = RecipeFilter
+    filter_backends = [DjangoFilterBackend, ]
+
+    def get_queryset(self):
+        if self.request.method == 'GET':
+            return readable_recipes(self.request.user)
+        return super().get_queryset()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(represent_recipes(page, request))
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        return Response(represent_recipes([instance], request)[0])
+
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return RecipeSerializer
+        return CreateRecipeSerializer
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context.update({'request': self.request})
+        return context
+
+    @action(
+        detail=True,
+        methods=['post', 'delete'],
+        permission_classes=(permissions.IsAuthenticated,))
+    def shopping_cart(self, request, pk):
+        if request.method == 'POST':
+            data = {
+                'user': request.user.id,
+                'recipe': pk
+            }
+            recipe = get_object_or_404(Recipe, id=pk)
+            if not ShoppingCart.objects.filter(
+               user=request.user, recipe=recipe).exists():
+                serializer = ShoppingCartSerializer(
+                    data=data, context={'request': request}
+                )
+                if serializer.is_valid(raise_exception=True):
+                    serializer.save()
+                    return Response(serializer.data,
+                                    status=status.HTTP_201_CREATED)
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        else:
+            recipe = get_object_or_404(Recipe, id=pk)
+        if ShoppingCart.objects.filter(
+           user=request.user, recipe=recipe).exists():
+            ShoppingCart.objects.filter(
+                user=request.user, recipe=recipe
+            ).delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response(status=status.HTTP_400_BAD_REQUEST)
+
+    @action(
+        detail=True,
+        methods=['post', 'delete'],
+        permission_classes=(permissions.IsAuthenticated,))
+    def favorite(self, request, pk):
+        if request.method == 'POST':
+            data = {
+                'user': request.user.id,
+                'recipe': pk
+            }
+            if not Favorite.objects.filter(
+               user=request.user, recipe__id=pk).exists():
+                serializer = FavoriteSerializer(
+                    data=data, context={'request': request}
+                )
+                if serializer.is_valid():
+                    serializer.save()
+                    return Response(serializer.data,
+                                    status=status.HTTP_201_CREATED)
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        else:
+            recipe = get_object_or_404(Recipe, id=pk)
+            if Favorite.objects.filter(
+               user=request.user, recipe=recipe).exists():
+                Favorite.objects.filter(
+                    user=request.user, recipe=recipe).delete()
+                return Response(status=status.HTTP_204_NO_CONTENT)
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+
+    def change_recipes(self, request, model):
+        """
+        POST добавляет, DELETE удаляет рецепты из тела запроса
+        {"recipes": [id, ...]}; в ответе - результат по каждому id.
+        """
+        serializer = BulkRecipesSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        if request.method == 'POST':
+            results = add_recipes(model, request.user, recipe_ids)
+        else:
+            results = remove_recipes(model, request.user, recipe_ids)
+        return Response({'results': [
+            {'id': recipe_id, 'status': result}
+            for recipe_id, result in results.items()
+        ]})
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='shopping_cart',
+        url_name='shopping_cart_bulk',
+        permission_classes=(permissions.IsAuthenticated,))
+    def shopping_cart_bulk(self, request):
+        return self.change_recipes(request, ShoppingCart)
+
+    @action(
+        detail=False,
+        methods=['post', 'delete'],
+        url_path='favorite',
+        url_name='favorite_bulk',
+        permission_classes=(permissions.IsAuthenticated,))
+    def favorite_bulk(self, request):
+        return self.change_recipes(request, Favorite)
+
+    @action(
+        detail=False,
+        methods=['delete', ],
+        url_path='clear_shopping_cart',
+        url_name='clear_shopping_cart',
+        permission_classes=(permissions.IsAuthenticated,))
+    def clear_shopping_cart(self, request):
+        clear_recipes(ShoppingCart, request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def get_ingredient_ids(self, request):
+        ingredient_ids = []
+        for value in request.query_params.getlist('ingredients'):
+            for item in value.split(','):
+                if not item.strip().isdigit():
+                    raise ValidationError(
+                        {'ingredients': 'Укажите id ингридиентов числами.'}
+                    )
+                ingredient_ids.append(int(item))
+        if not ingredient_ids:
+            raise ValidationError({'ingredients': 'Укажите ингридиенты.'})
+        return ingredient_ids
+
+    @action(
+        detail=False,
+        methods=['get', ],
+        url_path='what_can_i_cook',
+        url_name='what_can_i_cook')
+    def what_can_i_cook(self, request):
+        """
+        Рецепты по имеющимся ингридиентам (?ingredients=1,2,3):
+        сначала те, для которых есть все, затем по числу недостающих.
+        max_missing ограничивает число недостающих ингридиентов.
+        """
+        ingredient_ids = self.get_ingredient_ids(request)
+        max_missing = request.query_params.get('max_missing')
+        if max_missing is not None:
+            if not max_missing.isdigit():
+                raise ValidationError(
+                    {'max_missing': 'Укажите целое неотрицательное число.'}
+                )
+            max_missing = int(max_missing)
+        if settings.RECIPE_MATCH_INDEX_ENABLED:
+            matches = recipe_match_index.match(ingredient_ids, max_missing)
+        else:
+            matches = match_in_database(ingredient_ids, max_missing)
+        page = self.paginate_queryset(matches)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in page]
+        )
+        page = [match for match in page if match[0] in recipes]
+        instances = [recipes[recipe_id] for recipe_id, _, _ in page]
+        data = represent_recipes(instances, request)
+        for item, (_, matched, missing) in zip(data, page):
+            item['matched_ingredients'] = matched
+            item['missing_ingredients'] = missing
+        return self.get_paginated_response(data)
+
+    @action(
+        detail=False,
+        methods=['get', ],
+        url_path='cache_stats',
+        url_name='cache_stats',
+        permission_classes=(IsAdminPermission,))
+    def cache_stats(self, request):
+        return Response(recipe_cache.stats())
+
+    @action(
+        detail=False,
+        methods=['get', ],
+        url_path='shopping_list',
+        url_name='shopping_list',
+        permission_classes=(permissions.IsAuthenticated,))
+    def shopping_list(self, request):
+        """Ингридиенты рецептов из корзины с суммарным количеством."""
+        return Response(list(shopping_list_items(request.user)))
+
+    @action(
+        detail=False,
+        methods=['get', ],
+        url_path='download_shopping_cart',
+        url_name='download_shopping_cart',
+        renderer_classes=SHOPPING_LIST_RENDERERS,
+        permission_classes=(permissions.IsAuthenticated,))
+    def download_shopping_cart(self, request,):
+        rows = shopping_list_items(request.user).iterator()
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, ShoppingListRenderer):
+            return Response(list(rows))
+        response = StreamingHttpResponse(
+            renderer.stream(rows), content_type=renderer.media_type
+        )
+        file = f'shopping_list.{renderer.format}'
+        response['Content-Disposition'] = f'attachment; filename="{file}"'
+        return response
+
+
+class TagView(ConditionalCatalogMixin, viewsets.ModelViewSet):
+    """View для отображение тэгов."""
+
+    catalog = 'tags'
+    http_method_names = ('get', )
+    permission_classes = (permissions.AllowAny,)
+    queryset = Tag.objects.all()
+    serializer_class = TagSerializer
+    pagination_class = None
+
+
+class IngredientView(ConditionalCatalogMixin, viewsets.ModelViewSet):
+    """View для отображение ингридиентов."""
+
+    catalog = 'ingredients'
+    http_method_names = ('get', )
+    permission_classes = (permissions.AllowAny,)
+    queryset = Ingredient.objects.all()
+    serializer_class = IngredientSerialiser
+    pagination_class = None
+    filter_backends = [IngredientFilter, ]
+    search_fields = ['^name', ]
+
+    def list(self, request, *args, **kwargs):
+        if not settings.INGREDIENT_INDEX_ENABLED:
+            return super().list(request, *args, **kwargs)
+        return Response(ingredient_index.search(
+            request.query_params.get(IngredientFilter.search_param, ''),
+            self.catalog_version,
+        ))
+
+
+class MetricsView(APIView):
+    """
+    Гистограммы производительности по маршрутам для Prometheus.
+    Гистограммы хранятся в памяти процесса, ответивший процесс
+    отдает только свои.
+    """
+
+    permission_classes = (IsAdminPermission,)
+    renderer_classes = (PrometheusRenderer,)
+
+    def get(self, request):
+        return Response(route_metrics.prometheus())
@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+PRIMARY_DATABASE = 'default'
+
+# База для чтения в текущем запросе. Реплику выбирает
+# api.middleware.ReplicaRoutingMiddleware только для безопасных
+# запросов (GET, HEAD, OPTIONS): запросы с записью и код вне запросов
+# (команды, миграции) читают с основной базы.
+read_database = ContextVar('read_database', default=PRIMARY_DATABASE)
+
+
+@contextmanager
+def use_primary():
+    """
+    Чтение с основной базы - для данных, которые надолго кэшируются,
+    и для чтения только что записанного внутри безопасного запроса.
+    """
+    token = read_database.set(PRIMARY_DATABASE)
+    try:
+        yield
+    finally:
+        read_database.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Чтение - с базы, выбранной для текущего запроса,
+    запись и миграции - в основную базу.
+    Реплики получают схему и данные репликацией.
+
+    Запись не переключает чтение на основную базу: ContextVar,
+    измененный в потоке sync_to_async или в задаче asyncio.gather,
+    не виден вызывающему коду. Код, который в безопасном запросе
+    пишет и затем читает записанное, делает это внутри use_primary().
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DATABASE
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == PRIMARY_DATABASE
@@ -0,0 +1,43 @@
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+
+def change_counter(model, pk, field, delta):
+    """Атомарно меняет счетчик field объекта pk на delta, не ниже нуля."""
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, Value(0))}
+    )
+
+
+class DenormalizedFieldsMixin:
+    """
+    Модель с денормализованными полями denormalized_fields - счетчиками
+    и другими значениями, которые пересчитываются атомарными UPDATE.
+    Код, сохраняющий уже существующий объект, передает
+    update_fields=fields_without_denormalized() и не перезаписывает
+    их значениями, прочитанными из базы ранее.
+    """
+
+    denormalized_fields = ()
+
+    def fields_without_denormalized(self):
+        deferred = self.get_deferred_fields()
+        return [
+            field.attname for field in self._meta.concrete_fields
+            if not field.primary_key
+            and field.name not in self.denormalized_fields
+            and field.attname not in deferred
+        ]
+
+
+class DenormalizedFieldsAdminMixin:
+    """
+    Админка модели с денормализованными полями: правка объекта
+    их не перезаписывает.
+    """
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            obj.save(update_fields=obj.fields_without_denormalized())
+        else:
+            obj.save()
@@ -1,38 +1,53 @@
-from django.contrib import admin
-
-from .models import Ingredient, Tag, Recipe, ShoppingCart, Favorite
-
-
-class RecipeAdmin(admin.ModelAdmin):
-    list_display = (
-        'id',
-        'name',
-        'pub_date',
-        'cooking_time',
-        'author',
-        'favorites',
-    )
-    search_fields = ('name', 'author__username', 'tags')
-    list_filter = ('name', 'author__username', 'tags')
-    list_editable = ('name', )
-    empty_value_display = '-пусто-'
-
-    def favorites(self, obj):
-        count = 0
-        if Favorite.objects.filter(recipe=obj).exists():
-            count = Favorite.objects.filter(recipe=obj).count()
-        return count
-
-
-class IngredientAdmin(admin.ModelAdmin):
-    list_display = ('name', 'measurement_unit')
-    search_fields = ('name',)
-    list_filter = ('name',)
-    empty_value_display = '-пусто-'
-
-
-admin.site.register(Recipe, RecipeAdmin)
-admin.site.register(Ingredient, IngredientAdmin)
-admin.site.register(Tag)
-admin.site.register(ShoppingCart)
-admin.site.register(Favorite)
+from django.contrib import admin
+
+from backend.denormalized_fields import DenormalizedFieldsAdminMixin
+from .models import Ingredient, Tag, Recipe, ShoppingCart, Favorite
+from .paginators import EstimatedCountPaginator
+
+
+class RecipeAdmin(DenormalizedFieldsAdminMixin, admin.ModelAdmin):
+    list_display = (
+        'id',
+        'name',
+        'pub_date',
+        'cooking_time',
+        'author',
+        'favorites',
+    )
+    search_fields = ('name', 'author__username')
+    list_filter = ('tags',)
+    list_editable = ('name', )
+    list_select_related = ('author',)
+    autocomplete_fields = ('author',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+    @admin.display(description='В избранном', ordering='favorites_count')
+    def favorites(self, obj):
+        return obj.favorites_count
+
+
+class IngredientAdmin(admin.ModelAdmin):
+    list_display = ('name', 'measurement_unit')
+    search_fields = ('^name',)
+    list_filter = ('measurement_unit',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+class UserRecipeRelationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    search_fields = ('user__username', 'recipe__name')
+    autocomplete_fields = ('user', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+admin.site.register(Recipe, RecipeAdmin)
+admin.site.register(Ingredient, IngredientAdmin)
+admin.site.register(Tag)
+admin.site.register(ShoppingCart, UserRecipeRelationAdmin)
+admin.site.register(Favorite, UserRecipeRelationAdmin)
@@ -0,0 +1,50 @@
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from user.models import Subscription, User
+from .models import Favorite, Recipe, ShoppingCart
+
+# Модель со счетчиком, поле счетчика, считаемая модель и ее внешний ключ.
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'shopping_cart_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscription, 'author'),
+)
+
+
+def count_subquery(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+def recalculate_counters(counters=COUNTERS):
+    """
+    Пересчитывает счетчики одним UPDATE на каждый счетчик,
+    затрагивая только строки с расхождением.
+    Возвращает количество исправленных строк по каждому счетчику.
+    """
+    fixed = {}
+    for model, counter, counted_model, field in counters:
+        actual = count_subquery(counted_model, field)
+        fixed[f'{model._meta.model_name}.{counter}'] = (
+            model.objects.exclude(**{counter: actual}).update(
+                **{counter: actual}
+            )
+        )
+    return fixed
+
+
+def update_counters(counted_model, pks):
+    """
+    Пересчитывает счетчики объектов pks, считающие counted_model,
+    одним UPDATE на счетчик - для изменений без сигналов.
+    """
+    for model, counter, model_counted, field in COUNTERS:
+        if model_counted is counted_model:
+            model.objects.filter(pk__in=pks).update(
+                **{counter: count_subquery(counted_model, field)}
+            )
@@ -0,0 +1,70 @@
+import io
+import os
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, features
+
+# Размеры вариантов картинки рецепта: для списков и для страницы рецепта.
+IMAGE_VARIANTS = {
+    'image_thumbnail': (320, 320),
+    'image_medium': (960, 960),
+}
+VARIANT_FORMAT = 'WEBP' if features.check('webp') else 'JPEG'
+VARIANT_QUALITY = 80
+
+
+def render_variant(image, size):
+    """Уменьшенная копия картинки в формате VARIANT_FORMAT."""
+    variant = image.copy()
+    variant.thumbnail(size)
+    if VARIANT_FORMAT == 'JPEG' and variant.mode != 'RGB':
+        variant = variant.convert('RGB')
+    elif variant.mode not in ('RGB', 'RGBA'):
+        variant = variant.convert('RGBA')
+    buffer = io.BytesIO()
+    variant.save(buffer, VARIANT_FORMAT, quality=VARIANT_QUALITY)
+    return buffer.getvalue()
+
+
+def make_image_variants(recipe):
+    """
+    Создает варианты картинки рецепта, не сохраняя сам рецепт.
+    Возвращает имена файлов прежних вариантов - их удаляет
+    delete_image_files после сохранения рецепта.
+    """
+    superseded = [
+        getattr(recipe, field).name for field in IMAGE_VARIANTS
+        if getattr(recipe, field)
+    ]
+    stem = os.path.splitext(os.path.basename(recipe.image.name))[0]
+    extension = VARIANT_FORMAT.lower()
+    recipe.image.open('rb')
+    try:
+        with Image.open(recipe.image) as image:
+            image.load()
+            for field, size in IMAGE_VARIANTS.items():
+                getattr(recipe, field).save(
+                    f'{stem}_{size[0]}.{extension}',
+                    ContentFile(render_variant(image, size)),
+                    save=False,
+                )
+    finally:
+        if recipe.image._committed:
+            recipe.image.close()
+        else:
+            recipe.image.seek(0)
+    return superseded
+
+
+def delete_image_files(recipe, names):
+    """Удаляет файлы names после коммита транзакции с рецептом."""
+    if not names:
+        return
+    storage = recipe.image_thumbnail.storage
+
+    def delete():
+        for name in names:
+            storage.delete(name)
+
+    transaction.on_commit(delete)
@@ -0,0 +1,90 @@
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+from backend.db_router import use_primary
+
+
+class IngredientPrefixIndex:
+    """
+    Индекс ингредиентов в памяти процесса для поиска по началу названия.
+    Хранит отсортированный список названий в нижнем регистре
+    и отвечает на запросы бинарным поиском без обращения к базе.
+    Сбрасывается сигналами сохранения и удаления ингредиентов,
+    при смене версии справочника (api.catalog), переданной в запросе,
+    а также по истечении INGREDIENT_INDEX_TTL секунд - чтобы изменения,
+    сделанные в других процессах, тоже попадали в индекс.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+
+    def invalidate(self):
+        self._data = None
+
+    def _build(self, version):
+        from .models import Ingredient
+
+        with use_primary():
+            rows = sorted(
+                (name.lower(), pk, name, measurement_unit)
+                for pk, name, measurement_unit
+                in Ingredient.objects.values_list(
+                    'id', 'name', 'measurement_unit'
+                )
+            )
+        keys = [row[0] for row in rows]
+        items = [
+            {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+            for _, pk, name, measurement_unit in rows
+        ]
+        by_id = sorted(items, key=lambda item: item['id'])
+        return time.monotonic(), keys, items, by_id, version
+
+    def _is_stale(self, data, version):
+        return (
+            data is None
+            or time.monotonic() - data[0] > settings.INGREDIENT_INDEX_TTL
+            or version is not None and data[4] != version
+        )
+
+    def _get_data(self, version=None):
+        data = self._data
+        if self._is_stale(data, version):
+            with self._lock:
+                data = self._data
+                if self._is_stale(data, version):
+                    data = self._data = self._build(version)
+        return data
+
+    def all(self, version=None):
+        """Все ингредиенты в порядке id, как их отдает база."""
+        return self._get_data(version)[3]
+
+    def search(self, query, version=None):
+        """
+        Ингредиенты, название которых начинается с каждого слова
+        запроса (как SearchFilter с полем '^name'), в порядке id.
+        Индекс перестраивается, если он собран не для версии
+        справочника version.
+        """
+        terms = query.replace(',', ' ').lower().split()
+        if not terms:
+            return self.all(version)
+        _, keys, items, _, _ = self._get_data(version)
+        prefix = max(terms, key=len)
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + '\U0010ffff', start)
+        return sorted(
+            (
+                items[position] for position in range(start, end)
+                if all(keys[position].startswith(term) for term in terms)
+            ),
+            key=lambda item: item['id'],
+        )
+
+
+ingredient_index = IngredientPrefixIndex()
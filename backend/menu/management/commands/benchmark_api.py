@@ -0,0 +1,257 @@
+import base64
+import io
+import json
+import shutil
+import tempfile
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from menu.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                         RecipeTag, ShoppingCart, Tag)
+from user.models import Subscription, User
+
+
+class Rollback(Exception):
+    """Откатывает транзакцию пишущего запроса бенчмарка."""
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(0, -(-len(ordered) * percent // 100) - 1)
+    return ordered[int(rank)]
+
+
+class Command(BaseCommand):
+    help = ('Benchmark every API route through the test client and print '
+            'latency percentiles, throughput and SQL query counts as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=3,
+                            help='Unmeasured requests per endpoint')
+        parser.add_argument('--user', type=str,
+                            help='Username to authenticate as')
+        parser.add_argument('--output', type=str,
+                            help='Write the JSON report to this file')
+
+    def image(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (640, 480), (226, 108, 45)).save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    def create_recipe(self, author, name, tag, ingredient):
+        recipe = Recipe.objects.create(
+            author=author, name=name, text='Рецепт для бенчмарка',
+            cooking_time=10,
+            image=ContentFile(self.image(), name='benchmark.png'),
+        )
+        RecipeTag.objects.create(recipe=recipe, tag=tag)
+        RecipeIngredient.objects.create(recipe=recipe, ingredient=ingredient,
+                                        amount=10)
+        return recipe
+
+    def create_fixtures(self, user, tag, ingredient):
+        """
+        Одноразовые объекты для пишущих запросов: свой рецепт
+        пользователя в избранном и корзине, чужой рецепт, авторы
+        с подпиской и без и администратор. Удаляются после бенчмарка.
+        """
+        run = uuid.uuid4().hex[:8]
+        users = {
+            name: User.objects.create(
+                username=f'benchmark-{name}-{run}',
+                email=f'benchmark-{name}-{run}@example.com',
+                password='password', role=role,
+            )
+            for name, role in (('followed', User.USER),
+                               ('unfollowed', User.USER),
+                               ('admin', User.ADMIN))
+        }
+        Subscription.objects.create(user=user, author=users['followed'])
+        own = self.create_recipe(user, f'Бенчмарк {run}', tag, ingredient)
+        Favorite.objects.create(user=user, recipe=own)
+        ShoppingCart.objects.create(user=user, recipe=own)
+        other = self.create_recipe(users['unfollowed'],
+                                   f'Бенчмарк {run} чужой', tag, ingredient)
+        return run, users, own, other
+
+    def endpoints(self, user, tag, ingredient, fixtures):
+        run, users, own, other = fixtures
+        recipe = Recipe.objects.order_by('-pub_date').first()
+        followed, unfollowed = users['followed'].pk, users['unfollowed'].pk
+        image = base64.b64encode(self.image()).decode()
+        pantry = ','.join(map(str, Ingredient.objects.order_by(
+            'id'
+        ).values_list('id', flat=True)[:20]))
+        recipe_data = {
+            'name': f'Бенчмарк {run} новый', 'text': 'Рецепт для бенчмарка',
+            'cooking_time': 15, 'tags': [tag.pk],
+            'ingredients': [{'id': ingredient.pk, 'amount': 20}],
+        }
+        # Метод, адрес, тело запроса и нужны ли права администратора.
+        return [
+            ('GET', '/api/users/', None, False),
+            ('POST', '/api/users/', {
+                'username': f'benchmark-new-{run}',
+                'email': f'benchmark-new-{run}@example.com',
+                'first_name': 'Имя', 'last_name': 'Фамилия',
+                'password': 'password',
+            }, False),
+            ('GET', f'/api/users/{recipe.author_id}/', None, False),
+            ('GET', '/api/users/me/', None, False),
+            ('POST', '/api/users/set_password/', {
+                'current_password': user.password,
+                'new_password': f'benchmark-{run}',
+            }, False),
+            ('GET', '/api/users/subscriptions/?recipes_limit=3', None, False),
+            ('GET', '/api/users/feed/', None, False),
+            ('POST', f'/api/users/{unfollowed}/subscribe/', None, False),
+            ('DELETE', f'/api/users/{followed}/subscribe/', None, False),
+            ('GET', '/api/recipes/', None, False),
+            ('GET', '/api/recipes/?cursor=', None, False),
+            ('GET', f'/api/recipes/?tags={tag.slug}', None, False),
+            ('GET', '/api/recipes/?is_favorited=1', None, False),
+            ('GET', f'/api/recipes/?search={ingredient.name}', None, False),
+            ('GET', f'/api/recipes/what_can_i_cook/?ingredients={pantry}',
+             None, False),
+            ('GET', f'/api/recipes/{recipe.pk}/', None, False),
+            ('POST', '/api/recipes/',
+             dict(recipe_data, image=f'data:image/png;base64,{image}'),
+             False),
+            ('PATCH', f'/api/recipes/{own.pk}/', recipe_data, False),
+            ('DELETE', f'/api/recipes/{own.pk}/', None, False),
+            ('POST', f'/api/recipes/{other.pk}/favorite/', None, False),
+            ('DELETE', f'/api/recipes/{own.pk}/favorite/', None, False),
+            ('POST', f'/api/recipes/{other.pk}/shopping_cart/', None, False),
+            ('DELETE', f'/api/recipes/{own.pk}/shopping_cart/', None, False),
+            ('POST', '/api/recipes/favorite/',
+             {'recipes': [other.pk, recipe.pk]}, False),
+            ('DELETE', '/api/recipes/favorite/',
+             {'recipes': [own.pk, recipe.pk]}, False),
+            ('POST', '/api/recipes/shopping_cart/',
+             {'recipes': [other.pk, recipe.pk]}, False),
+            ('DELETE', '/api/recipes/shopping_cart/',
+             {'recipes': [own.pk, recipe.pk]}, False),
+            ('DELETE', '/api/recipes/clear_shopping_cart/', None, False),
+            ('GET', '/api/recipes/shopping_list/', None, False),
+            ('GET', '/api/recipes/download_shopping_cart/?format=txt', None,
+             False),
+            ('GET', '/api/recipes/cache_stats/', None, True),
+            ('GET', '/api/tags/', None, False),
+            ('GET', f'/api/tags/{tag.pk}/', None, False),
+            ('GET', '/api/ingredients/', None, False),
+            ('GET', f'/api/ingredients/?name={ingredient.name[:2]}', None,
+             False),
+            ('GET', f'/api/ingredients/{ingredient.pk}/', None, False),
+            ('GET', '/api/metrics/', None, True),
+            ('POST', '/api/auth/token/login/',
+             {'email': user.email, 'password': user.password}, False),
+            ('POST', '/api/auth/token/logout/', None, False),
+        ]
+
+    def call(self, client, method, url, data):
+        if method == 'GET':
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            return response
+        # Пишущие запросы выполняются в транзакции и откатываются.
+        response = None
+        try:
+            with transaction.atomic():
+                response = client.generic(
+                    method, url, data=json.dumps(data or {}),
+                    content_type='application/json',
+                )
+                raise Rollback
+        except Rollback:
+            pass
+        return response
+
+    def client(self, user):
+        token, _ = Token.objects.get_or_create(user=user)
+        return Client(
+            HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Token {token.key}'
+        )
+
+    def measure(self, client, method, url, data, options):
+        for _ in range(options['warmup']):
+            self.call(client, method, url, data)
+        timings = []
+        queries = []
+        status_code = None
+        for _ in range(options['requests']):
+            # Запросы считаются по всем базам, включая реплики.
+            with ExitStack() as stack:
+                contexts = [
+                    stack.enter_context(CaptureQueriesContext(connection))
+                    for connection in connections.all()
+                ]
+                started = time.perf_counter()
+                response = self.call(client, method, url, data)
+                timings.append(time.perf_counter() - started)
+            queries.append(sum(len(context) for context in contexts))
+            status_code = response.status_code
+        total = sum(timings)
+        return {
+            'status': status_code,
+            'requests': len(timings),
+            'p50_ms': round(percentile(timings, 50) * 1000, 3),
+            'p95_ms': round(percentile(timings, 95) * 1000, 3),
+            'p99_ms': round(percentile(timings, 99) * 1000, 3),
+            'rps': round(len(timings) / total, 1) if total else None,
+            'queries': max(queries),
+        }
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['user']:
+            users = users.filter(username=options['user'])
+        user = users.first()
+        tag = Tag.objects.first()
+        ingredient = Ingredient.objects.first()
+        if user is None:
+            raise CommandError('No user to authenticate as')
+        if tag is None or ingredient is None or not Recipe.objects.exists():
+            raise CommandError('Not enough data, run generate_data first')
+        # Картинки одноразовых рецептов пишутся во временный каталог.
+        media_root = tempfile.mkdtemp()
+        report = {}
+        try:
+            with override_settings(MEDIA_ROOT=media_root):
+                fixtures = self.create_fixtures(user, tag, ingredient)
+                try:
+                    clients = {False: self.client(user),
+                               True: self.client(fixtures[1]['admin'])}
+                    for method, url, data, admin in self.endpoints(
+                        user, tag, ingredient, fixtures
+                    ):
+                        key = f'{method} {url}'
+                        report[key] = self.measure(
+                            clients[admin], method, url, data, options
+                        )
+                        self.stderr.write(f'{key}: {report[key]}')
+                finally:
+                    fixtures[2].delete()
+                    for fixture_user in fixtures[1].values():
+                        fixture_user.delete()
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+        output = json.dumps(report, indent=2, ensure_ascii=False,
+                            sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
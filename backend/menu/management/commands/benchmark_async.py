@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from menu.models import Ingredient, Recipe
+from user.models import User
+from .benchmark_api import percentile
+
+
+class Command(BaseCommand):
+    help = ('Compare concurrent throughput of the read endpoints between '
+            'a WSGI deployment (gunicorn backend.wsgi) and an ASGI one '
+            '(ASYNC_READ_VIEWS=True uvicorn backend.asgi) running against '
+            'the same database')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--asgi-url', default='http://127.0.0.1:8001')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per endpoint and deployment')
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--user', type=str,
+                            help='Username to authenticate as')
+        parser.add_argument('--output', type=str,
+                            help='Write the JSON report to this file')
+
+    def endpoints(self):
+        recipe = Recipe.objects.order_by('-pub_date').first()
+        ingredient = Ingredient.objects.first()
+        if recipe is None or ingredient is None:
+            raise CommandError('Not enough data, run generate_data first')
+        return [
+            '/api/recipes/',
+            '/api/recipes/?page=2&limit=10',
+            f'/api/recipes/{recipe.pk}/',
+            '/api/tags/',
+            f'/api/ingredients/?name={ingredient.name[:2]}',
+            '/api/users/subscriptions/?recipes_limit=3',
+        ]
+
+    def run(self, base_url, path, headers, total, concurrency):
+        local = threading.local()
+
+        def fetch(_):
+            session = getattr(local, 'session', None)
+            if session is None:
+                session = local.session = requests.Session()
+                session.headers.update(headers)
+            started = time.perf_counter()
+            response = session.get(base_url + path)
+            return (time.perf_counter() - started, response.status_code,
+                    response.content)
+
+        with ThreadPoolExecutor(concurrency) as executor:
+            fetch(None)
+            started = time.perf_counter()
+            results = list(executor.map(fetch, range(total)))
+            elapsed = time.perf_counter() - started
+        timings = [result[0] for result in results]
+        return {
+            'requests': total,
+            'errors': sum(1 for result in results if result[1] != 200),
+            'p50_ms': round(percentile(timings, 50) * 1000, 3),
+            'p95_ms': round(percentile(timings, 95) * 1000, 3),
+            'p99_ms': round(percentile(timings, 99) * 1000, 3),
+            'rps': round(total / elapsed, 1),
+        }, results[0][2]
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['user']:
+            users = users.filter(username=options['user'])
+        user = users.first()
+        if user is None:
+            raise CommandError('No user to authenticate as')
+        token, _ = Token.objects.get_or_create(user=user)
+        headers = {'Authorization': f'Token {token.key}'}
+        report = {}
+        for path in self.endpoints():
+            report[path] = {}
+            bodies = {}
+            for deployment in ('wsgi', 'asgi'):
+                report[path][deployment], body = self.run(
+                    options[f'{deployment}_url'], path, headers,
+                    options['requests'], options['concurrency'],
+                )
+                # Абсолютные ссылки в ответах отличаются только хостом.
+                bodies[deployment] = json.loads(body.decode().replace(
+                    options[f'{deployment}_url'], ''
+                ))
+                self.stderr.write(
+                    f'{deployment} {path}: {report[path][deployment]}'
+                )
+            report[path]['same_response'] = (
+                bodies['wsgi'] == bodies['asgi']
+            )
+        output = json.dumps(report, indent=2, ensure_ascii=False,
+                            sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,47 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory
+
+from api.views import IngredientView
+from menu.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = ('Compare ingredient autocomplete through the in-memory prefix '
+            'index with the database SearchFilter')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=200,
+                            help='Number of autocomplete requests')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        names = list(Ingredient.objects.values_list('name', flat=True))
+        if not names:
+            self.stdout.write('No ingredients to search, import them first')
+            return
+        rng = random.Random(options['seed'])
+        prefixes = []
+        for _ in range(options['queries']):
+            name = rng.choice(names)
+            prefixes.append(name[:rng.randint(1, min(len(name), 4))])
+        factory = APIRequestFactory()
+        view = IngredientView.as_view({'get': 'list'})
+        for label, enabled in (('database filter', False),
+                               ('prefix index', True)):
+            with override_settings(INGREDIENT_INDEX_ENABLED=enabled):
+                view(factory.get('/api/ingredients/'))
+                started = time.perf_counter()
+                for prefix in prefixes:
+                    response = view(
+                        factory.get('/api/ingredients/', {'name': prefix})
+                    )
+                    response.render()
+                elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{label}: {len(prefixes)} requests in {elapsed:.3f}s, '
+                f'{elapsed / len(prefixes) * 1000:.2f} ms per request'
+            )
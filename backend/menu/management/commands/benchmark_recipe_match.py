@@ -0,0 +1,54 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from menu.models import Ingredient, Recipe
+from menu.recipe_match_index import match_in_database, recipe_match_index
+
+
+class Command(BaseCommand):
+    help = ('Compare "what can I cook" matching through the in-memory '
+            'inverted index with an aggregate query over RecipeIngredient. '
+            'Fill the database first, e.g. generate_data --recipes 100000')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=50,
+                            help='Number of ingredient sets to match')
+        parser.add_argument('--ingredients', type=int, default=10,
+                            help='Ingredients in each set')
+        parser.add_argument('--max-missing', type=int)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if not ingredient_ids:
+            self.stdout.write('No ingredients to match, import them first')
+            return
+        rng = random.Random(options['seed'])
+        size = min(options['ingredients'], len(ingredient_ids))
+        queries = [
+            rng.sample(ingredient_ids, size)
+            for _ in range(options['queries'])
+        ]
+        self.stdout.write(f'{Recipe.objects.count()} recipes')
+        started = time.perf_counter()
+        recipe_match_index.invalidate()
+        recipe_match_index.match([])
+        self.stdout.write(
+            f'index build: {time.perf_counter() - started:.3f}s'
+        )
+        results = {}
+        for label, match in (('database query', match_in_database),
+                             ('inverted index', recipe_match_index.match)):
+            started = time.perf_counter()
+            results[label] = [
+                match(query, options['max_missing']) for query in queries
+            ]
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f'{label}: {len(queries)} requests in {elapsed:.3f}s, '
+                f'{elapsed / len(queries) * 1000:.2f} ms per request'
+            )
+        if results['database query'] != results['inverted index']:
+            self.stderr.write('Results differ between database and index')
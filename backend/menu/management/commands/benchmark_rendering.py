@@ -0,0 +1,97 @@
+import gzip
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+
+from api.middleware import BROTLI_QUALITY, brotli
+from api.renderers import FastJSONRenderer, orjson
+from user.models import User
+from .benchmark_api import percentile
+
+
+class Command(BaseCommand):
+    help = ('Compare JSON rendering time of DRF JSONRenderer and '
+            'FastJSONRenderer on API list pages and show the bytes '
+            'saved by gzip and brotli compression')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limits', type=int, nargs='+',
+                            default=[6, 20, 50],
+                            help='Recipe page sizes to measure')
+        parser.add_argument('--repeat', type=int, default=200,
+                            help='Renders per page and renderer')
+        parser.add_argument('--user', type=str,
+                            help='Username to authenticate as')
+        parser.add_argument('--output', type=str,
+                            help='Write the JSON report to this file')
+
+    def pages(self, limits):
+        yield from (f'/api/recipes/?limit={limit}' for limit in limits)
+        yield '/api/ingredients/'
+
+    def time_render(self, renderer, data, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            renderer.render(data)
+            timings.append(time.perf_counter() - started)
+        return {
+            'p50_ms': round(percentile(timings, 50) * 1000, 3),
+            'p95_ms': round(percentile(timings, 95) * 1000, 3),
+        }
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['user']:
+            users = users.filter(username=options['user'])
+        user = users.first()
+        if user is None:
+            raise CommandError('No user to authenticate as')
+        token, _ = Token.objects.get_or_create(user=user)
+        client = Client(HTTP_HOST='localhost',
+                        HTTP_AUTHORIZATION=f'Token {token.key}')
+        if orjson is None:
+            self.stderr.write('orjson is not installed, FastJSONRenderer '
+                              'falls back to JSONRenderer')
+        report = {}
+        for path in self.pages(options['limits']):
+            response = client.get(path)
+            if response.status_code != 200:
+                raise CommandError(f'{path}: {response.status_code}')
+            data = response.data
+            body = JSONRenderer().render(data)
+            if FastJSONRenderer().render(data) != body:
+                raise CommandError(f'{path}: renderers disagree')
+            sizes = {
+                'json': len(body),
+                'gzip': len(gzip.compress(body, compresslevel=6, mtime=0)),
+            }
+            if brotli is not None:
+                sizes['br'] = len(brotli.compress(
+                    body, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY
+                ))
+            report[path] = {
+                'json_renderer': self.time_render(
+                    JSONRenderer(), data, options['repeat']
+                ),
+                'fast_json_renderer': self.time_render(
+                    FastJSONRenderer(), data, options['repeat']
+                ),
+                'bytes': sizes,
+                'saved_percent': {
+                    encoding: round(100 - size * 100 / sizes['json'], 1)
+                    for encoding, size in sizes.items() if encoding != 'json'
+                },
+            }
+            self.stderr.write(f'{path}: {report[path]}')
+        output = json.dumps(report, indent=2, ensure_ascii=False,
+                            sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,91 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.cache import recipe_cache
+from api.flat_serializers import serialize_recipes
+from api.serializers import RecipeSerializer
+from menu.models import Recipe
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = ('Check that api.flat_serializers renders recipes byte for byte '
+            'like RecipeSerializer and compare their serialization time')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=10,
+                            help='Recipes serialized together')
+        parser.add_argument('--limit', type=int,
+                            help='Check only this many latest recipes')
+        parser.add_argument('--user', type=str,
+                            help='Username whose flags and subscriptions '
+                                 'are rendered, anonymous by default')
+
+    def request(self, username):
+        request = APIRequestFactory().get('/api/recipes/')
+        if username:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f'No user {username}')
+            force_authenticate(request, user=user)
+        return Request(request)
+
+    def handle(self, *args, **options):
+        request = self.request(options['user'])
+        renderer = JSONRenderer()
+        pks = list(Recipe.objects.values_list('id', flat=True)[
+            :options['limit']
+        ])
+        if not pks:
+            raise CommandError('Not enough data, run generate_data first')
+        recipes = Recipe.objects.with_user_flags(request.user)
+        mismatches = []
+        serializer_time = flat_time = 0
+        page_size = options['page_size']
+        for start in range(0, len(pks), page_size):
+            page = pks[start:start + page_size]
+
+            started = time.perf_counter()
+            instances = recipes.with_related().in_bulk(page)
+            expected = RecipeSerializer(
+                [instances[pk] for pk in page], many=True,
+                context={'request': request},
+            ).data
+            serializer_time += time.perf_counter() - started
+
+            started = time.perf_counter()
+            instances = recipes.in_bulk(page)
+            actual = recipe_cache.represent(
+                [instances[pk] for pk in page], request,
+                serialize_recipes(page),
+            )
+            flat_time += time.perf_counter() - started
+
+            for pk, expected_item, actual_item in zip(page, expected, actual):
+                if renderer.render(expected_item) != renderer.render(
+                    actual_item
+                ):
+                    mismatches.append(pk)
+            if len(actual) != len(expected):
+                mismatches.extend(page[len(actual):])
+        self.stdout.write(json.dumps({
+            'recipes': len(pks),
+            'mismatches': len(mismatches),
+            'mismatched_ids': mismatches[:20],
+            'serializer_ms_per_page': round(
+                serializer_time * 1000 * page_size / len(pks), 3
+            ),
+            'flat_ms_per_page': round(
+                flat_time * 1000 * page_size / len(pks), 3
+            ),
+            'speedup': round(serializer_time / flat_time, 1),
+        }, indent=2))
+        if mismatches:
+            raise CommandError(
+                f'{len(mismatches)} recipes differ from RecipeSerializer'
+            )
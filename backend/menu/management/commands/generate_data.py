@@ -0,0 +1,153 @@
+import io
+import random
+import uuid
+
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from PIL import Image
+
+from api.catalog import bump_catalog_version
+from menu.counters import recalculate_counters
+from menu.images import IMAGE_VARIANTS, render_variant
+from menu.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                         RecipeTag, ShoppingCart, Tag)
+from menu.shopping_list import rebuild_shopping_lists
+from menu.timeline import rebuild_timelines
+from user.models import Subscription, User
+
+TAG_COLORS = ('#E26C2D', '#49B64E', '#8775D2', '#F2C94C', '#2D9CDB')
+
+
+class Command(BaseCommand):
+    help = 'Generate synthetic users, recipes and relations for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--tags', type=int, default=5,
+                            help='Minimum number of tags to have')
+        parser.add_argument('--ingredients', type=int, default=200,
+                            help='Minimum number of ingredients to have')
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--tags-per-recipe', type=int, default=2)
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Favorites per user')
+        parser.add_argument('--carts', type=int, default=5,
+                            help='Shopping cart recipes per user')
+        parser.add_argument('--subscriptions', type=int, default=10,
+                            help='Subscriptions per user')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def placeholder_images(self):
+        """Одна картинка и ее варианты на все сгенерированные рецепты."""
+        image = Image.new('RGB', (1280, 960), (226, 108, 45))
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG')
+        recipe = Recipe()
+        recipe.image.save('synthetic.jpg', ContentFile(buffer.getvalue()),
+                          save=False)
+        for field, size in IMAGE_VARIANTS.items():
+            getattr(recipe, field).save(
+                f'synthetic_{size[0]}.webp',
+                ContentFile(render_variant(image, size)),
+                save=False,
+            )
+        return {
+            'image': recipe.image.name,
+            **{field: getattr(recipe, field).name for field in IMAGE_VARIANTS},
+        }
+
+    def bulk_create(self, model, objects, batch_size):
+        model.objects.bulk_create(
+            objects, batch_size=batch_size, ignore_conflicts=True
+        )
+        self.stdout.write(f'{model.__name__}: {len(objects)} rows')
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        run = uuid.UUID(int=rng.getrandbits(128)).hex[:8]
+
+        for i in range(Tag.objects.count(), options['tags']):
+            Tag.objects.create(
+                name=f'Тег {run}-{i}', slug=f'tag-{run}-{i}',
+                color=TAG_COLORS[i % len(TAG_COLORS)],
+            )
+        missing = options['ingredients'] - Ingredient.objects.count()
+        if missing > 0:
+            self.bulk_create(Ingredient, [
+                Ingredient(name=f'ингредиент {run}-{i}', measurement_unit='г')
+                for i in range(missing)
+            ], batch_size)
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+
+        self.bulk_create(User, [
+            User(username=username, email=f'{username}@example.com',
+                 first_name='Имя', last_name='Фамилия', password='password')
+            for username in (
+                f'user-{run}-{i}' for i in range(options['users'])
+            )
+        ], batch_size)
+        user_ids = list(User.objects.filter(
+            username__startswith=f'user-{run}-'
+        ).values_list('id', flat=True))
+
+        images = self.placeholder_images()
+        self.bulk_create(Recipe, [
+            Recipe(name=f'Рецепт {run}-{i}', author_id=rng.choice(user_ids),
+                   text='Описание рецепта', cooking_time=rng.randint(5, 180),
+                   **images)
+            for i in range(options['recipes'])
+        ], batch_size)
+        recipes = Recipe.objects.filter(name__startswith=f'Рецепт {run}-')
+        recipe_ids = list(recipes.values_list('id', flat=True))
+
+        self.bulk_create(RecipeIngredient, [
+            RecipeIngredient(recipe_id=recipe_id, ingredient_id=ingredient_id,
+                             amount=rng.randint(1, 500))
+            for recipe_id in recipe_ids
+            for ingredient_id in rng.sample(
+                ingredient_ids,
+                min(options['ingredients_per_recipe'], len(ingredient_ids))
+            )
+        ], batch_size)
+        self.bulk_create(RecipeTag, [
+            RecipeTag(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in rng.sample(
+                tag_ids, min(options['tags_per_recipe'], len(tag_ids))
+            )
+        ], batch_size)
+        for model, per_user in ((Favorite, options['favorites']),
+                                (ShoppingCart, options['carts'])):
+            self.bulk_create(model, [
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id in user_ids
+                for recipe_id in rng.sample(
+                    recipe_ids, min(per_user, len(recipe_ids))
+                )
+            ], batch_size)
+        self.bulk_create(Subscription, [
+            Subscription(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in rng.sample(
+                user_ids, min(options['subscriptions'], len(user_ids))
+            )
+            if author_id != user_id
+        ], batch_size)
+
+        # bulk_create не вызывает сигналы - пересчитываем
+        # денормализованные поля явно.
+        recipes.update_tags_mask()
+        recipes.update_search_index()
+        rebuild_timelines()
+        rebuild_shopping_lists()
+        recalculate_counters()
+        transaction.on_commit(lambda: bump_catalog_version('ingredients'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated data set {run} (seed {options["seed"]})'
+        ))
@@ -0,0 +1,129 @@
+import csv
+import json
+import os
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from api.catalog import bump_catalog_version
+from menu.ingredient_index import ingredient_index
+from menu.models import Ingredient
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def iter_csv(file, skip):
+    reader = csv.reader(file)
+    for row in reader:
+        if not row:
+            continue
+        if len(row) < 2 or not row[0].strip():
+            skip(f'line {reader.line_num}: {row}')
+            continue
+        yield row[0], row[1]
+
+
+def iter_json(file, skip):
+    """Построчно читает JSON-массив объектов, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    number = 0
+    while True:
+        chunk = file.read(READ_CHUNK_SIZE)
+        buffer += chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and buffer[position:position + 1] == '[':
+                started = True
+                position += 1
+                continue
+            if buffer[position:position + 1] == ']' or position == len(buffer):
+                break
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break
+            number += 1
+            if (not isinstance(item, dict) or not item.get('name')
+                    or 'measurement_unit' not in item):
+                skip(f'item {number}: {item}')
+                continue
+            yield item['name'], item['measurement_unit']
+        buffer = buffer[position:]
+        if not chunk:
+            return
+
+
+READERS = {
+    'csv': iter_csv,
+    'json': iter_json,
+}
+
+
+class Command(BaseCommand):
+    help = 'Import ingredients from CSV or JSON files in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', type=str,
+                            help='Paths to the CSV or JSON files')
+        parser.add_argument('--format', choices=READERS.keys(),
+                            help='File format, detected by extension '
+                                 'if omitted')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of rows per INSERT')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Roll back the import after counting')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive')
+        processed = invalid = 0
+
+        def skip(row):
+            nonlocal invalid
+            invalid += 1
+            self.stderr.write(f'Skipped invalid row, {row}')
+
+        with transaction.atomic():
+            count_before = Ingredient.objects.count()
+            for path in options['files']:
+                file_format = (
+                    options['format']
+                    or os.path.splitext(path)[1].lstrip('.').lower()
+                )
+                if file_format not in READERS:
+                    raise CommandError(f'Unknown file format: {path}')
+                with open(path, 'r', encoding='utf-8') as file:
+                    rows = READERS[file_format](file, skip)
+                    while True:
+                        batch = [
+                            Ingredient(name=name, measurement_unit=unit)
+                            for name, unit in islice(rows, batch_size)
+                        ]
+                        if not batch:
+                            break
+                        Ingredient.objects.bulk_create(
+                            batch, ignore_conflicts=True
+                        )
+                        processed += len(batch)
+                        self.stdout.write(
+                            f'{path}: {processed} rows processed'
+                        )
+            inserted = Ingredient.objects.count() - count_before
+            if options['dry_run']:
+                transaction.set_rollback(True)
+        if inserted and not options['dry_run']:
+            # bulk_create не отправляет сигналы сохранения ингредиентов.
+            ingredient_index.invalidate()
+            bump_catalog_version('ingredients')
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Dry run: " if options["dry_run"] else ""}'
+            f'inserted {inserted}, skipped {processed - inserted}, '
+            f'invalid {invalid}'
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from menu.images import delete_image_files, make_image_variants
+from menu.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Generate resized image variants for recipes missing them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Regenerate variants for every recipe')
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='').only(
+            'id', 'image', 'image_thumbnail', 'image_medium'
+        )
+        if not options['all']:
+            recipes = recipes.filter(image_thumbnail='')
+        processed = 0
+        for recipe in recipes.iterator():
+            superseded = make_image_variants(recipe)
+            recipe.save(update_fields=['image_thumbnail', 'image_medium'])
+            delete_image_files(recipe, superseded)
+            processed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated variants for {processed} recipes'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from menu.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index of recipes'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            Recipe.objects.all().update_search_index()
+        self.stdout.write(f'{Recipe.objects.count()} recipes indexed')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from menu.shopping_list import rebuild_shopping_lists
+
+
+class Command(BaseCommand):
+    help = 'Rebuild aggregated shopping lists from shopping carts'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rows = rebuild_shopping_lists()
+        self.stdout.write(f'{rows} shopping list items created')
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from menu.timeline import rebuild_timelines
+
+
+class Command(BaseCommand):
+    help = 'Rebuild subscription timelines from subscriptions and recipes'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rows = rebuild_timelines()
+        self.stdout.write(f'{rows} timeline entries created')
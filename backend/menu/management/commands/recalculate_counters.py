@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from menu.counters import recalculate_counters
+
+
+class Command(BaseCommand):
+    help = 'Recalculate denormalized favorite, cart and follower counters'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = recalculate_counters()
+        for counter, rows in fixed.items():
+            self.stdout.write(f'{counter}: {rows} rows fixed')
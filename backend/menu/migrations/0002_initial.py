@@ -1,88 +1,88 @@
-# Generated by Django 3.2 on 2024-01-21 12:13
-
-from django.conf import settings
-from django.db import migrations, models
-import django.db.models.deletion
-
-
-class Migration(migrations.Migration):
-
-    initial = True
-
-    dependencies = [
-        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
-        ('menu', '0001_initial'),
-    ]
-
-    operations = [
-        migrations.AddField(
-            model_name='shoppingcart',
-            name='user',
-            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shoppingcart', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
-        ),
-        migrations.AddField(
-            model_name='recipetag',
-            name='recipe',
-            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='menu.recipe'),
-        ),
-        migrations.AddField(
-            model_name='recipetag',
-            name='tag',
-            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='menu.tag'),
-        ),
-        migrations.AddField(
-            model_name='recipeingredient',
-            name='Ingredient',
-            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='menu.ingredient'),
-        ),
-        migrations.AddField(
-            model_name='recipeingredient',
-            name='recipe',
-            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='menu.recipe'),
-        ),
-        migrations.AddField(
-            model_name='recipe',
-            name='Ingredients',
-            field=models.ManyToManyField(help_text='Удерживайте Ctrl для выбора нескольких ингридиентов', related_name='Ingredients', through='menu.RecipeIngredient', to='menu.Ingredient', verbose_name='Ингридиенты'),
-        ),
-        migrations.AddField(
-            model_name='recipe',
-            name='author',
-            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipes', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
-        ),
-        migrations.AddField(
-            model_name='recipe',
-            name='tags',
-            field=models.ManyToManyField(help_text='Удерживайте Ctrl для выбора нескольких вариантов', through='menu.RecipeTag', to='menu.Tag', verbose_name='Теги'),
-        ),
-        migrations.AddConstraint(
-            model_name='ingredient',
-            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='ingredient_name_unit_unique'),
-        ),
-        migrations.AddField(
-            model_name='favorite',
-            name='recipe',
-            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorites', to='menu.recipe', verbose_name='Рецепт'),
-        ),
-        migrations.AddField(
-            model_name='favorite',
-            name='user',
-            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorites', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
-        ),
-        migrations.AddConstraint(
-            model_name='shoppingcart',
-            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='user_shoppingcart_unique'),
-        ),
-        migrations.AddConstraint(
-            model_name='recipetag',
-            constraint=models.UniqueConstraint(fields=('recipe', 'tag'), name='recipe_tag_unique'),
-        ),
-        migrations.AddConstraint(
-            model_name='recipeingredient',
-            constraint=models.UniqueConstraint(fields=('recipe', 'Ingredient'), name='recipe_ingredient_unique'),
-        ),
-        migrations.AddConstraint(
-            model_name='favorite',
-            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='user_favorite_unique'),
-        ),
-    ]
+# Generated by Django 3.2 on 2024-01-21 12:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('menu', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shoppingcart', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddField(
+            model_name='recipetag',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='menu.recipe'),
+        ),
+        migrations.AddField(
+            model_name='recipetag',
+            name='tag',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='menu.tag'),
+        ),
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='Ingredient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='menu.ingredient'),
+        ),
+        migrations.AddField(
+            model_name='recipeingredient',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='menu.recipe'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='Ingredients',
+            field=models.ManyToManyField(help_text='Удерживайте Ctrl для выбора нескольких ингридиентов', related_name='Ingredients', through='menu.RecipeIngredient', to='menu.Ingredient', verbose_name='Ингридиенты'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='author',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipes', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tags',
+            field=models.ManyToManyField(help_text='Удерживайте Ctrl для выбора нескольких вариантов', through='menu.RecipeTag', to='menu.Tag', verbose_name='Теги'),
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='ingredient_name_unit_unique'),
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorites', to='menu.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='favorites', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='user_shoppingcart_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipetag',
+            constraint=models.UniqueConstraint(fields=('recipe', 'tag'), name='recipe_tag_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'Ingredient'), name='recipe_ingredient_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='favorite',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='user_favorite_unique'),
+        ),
+    ]
@@ -1,35 +1,35 @@
-# Generated by Django 3.2 on 2024-01-21 14:33
-
-from django.db import migrations, models
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('menu', '0002_initial'),
-    ]
-
-    operations = [
-        migrations.RemoveConstraint(
-            model_name='recipeingredient',
-            name='recipe_ingredient_unique',
-        ),
-        migrations.RenameField(
-            model_name='recipeingredient',
-            old_name='Ingredient',
-            new_name='ingredient',
-        ),
-        migrations.RemoveField(
-            model_name='recipe',
-            name='Ingredients',
-        ),
-        migrations.AddField(
-            model_name='recipe',
-            name='ingredients',
-            field=models.ManyToManyField(help_text='Удерживайте Ctrl для выбора нескольких ингридиентов', related_name='ingredients', through='menu.RecipeIngredient', to='menu.Ingredient', verbose_name='Ингридиенты'),
-        ),
-        migrations.AddConstraint(
-            model_name='recipeingredient',
-            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='recipe_ingredient_unique'),
-        ),
-    ]
+# Generated by Django 3.2 on 2024-01-21 14:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='recipeingredient',
+            name='recipe_ingredient_unique',
+        ),
+        migrations.RenameField(
+            model_name='recipeingredient',
+            old_name='Ingredient',
+            new_name='ingredient',
+        ),
+        migrations.RemoveField(
+            model_name='recipe',
+            name='Ingredients',
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredients',
+            field=models.ManyToManyField(help_text='Удерживайте Ctrl для выбора нескольких ингридиентов', related_name='ingredients', through='menu.RecipeIngredient', to='menu.Ingredient', verbose_name='Ингридиенты'),
+        ),
+        migrations.AddConstraint(
+            model_name='recipeingredient',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='recipe_ingredient_unique'),
+        ),
+    ]
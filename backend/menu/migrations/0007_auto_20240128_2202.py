@@ -1,21 +1,21 @@
-# Generated by Django 3.2 on 2024-01-28 16:02
-
-from django.db import migrations
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('menu', '0006_alter_recipe_image'),
-    ]
-
-    operations = [
-        migrations.AlterModelOptions(
-            name='favorite',
-            options={'verbose_name': 'Избранное', 'verbose_name_plural': 'Избранное'},
-        ),
-        migrations.AlterModelOptions(
-            name='shoppingcart',
-            options={'verbose_name': 'Список покупок', 'verbose_name_plural': 'Списки покупок'},
-        ),
-    ]
+# Generated by Django 3.2 on 2024-01-28 16:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0006_alter_recipe_image'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='favorite',
+            options={'verbose_name': 'Избранное', 'verbose_name_plural': 'Избранное'},
+        ),
+        migrations.AlterModelOptions(
+            name='shoppingcart',
+            options={'verbose_name': 'Список покупок', 'verbose_name_plural': 'Списки покупок'},
+        ),
+    ]
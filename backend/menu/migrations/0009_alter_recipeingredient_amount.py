@@ -1,19 +1,19 @@
-# Generated by Django 3.2 on 2024-01-30 13:49
-
-import django.core.validators
-from django.db import migrations, models
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('menu', '0008_auto_20240130_1455'),
-    ]
-
-    operations = [
-        migrations.AlterField(
-            model_name='recipeingredient',
-            name='amount',
-            field=models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1, message='Количество ингридиента измеряется целыми числамии не может быть меньше 1!')]),
-        ),
-    ]
+# Generated by Django 3.2 on 2024-01-30 13:49
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0008_auto_20240130_1455'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipeingredient',
+            name='amount',
+            field=models.PositiveSmallIntegerField(validators=[django.core.validators.MinValueValidator(1, message='Количество ингридиента измеряется целыми числамии не может быть меньше 1!')]),
+        ),
+    ]
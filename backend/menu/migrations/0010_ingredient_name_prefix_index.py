@@ -0,0 +1,29 @@
+from django.db import migrations
+
+INDEX_NAME = 'menu_ingredient_name_upper_prefix'
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} '
+        'ON menu_ingredient (UPPER(name::text) text_pattern_ops)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0009_alter_recipeingredient_amount'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 3.2 on 2026-10-18 17:35
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Recipe = apps.get_model('menu', 'Recipe')
+    Favorite = apps.get_model('menu', 'Favorite')
+    ShoppingCart = apps.get_model('menu', 'ShoppingCart')
+    User = apps.get_model('user', 'User')
+    Subscription = apps.get_model('user', 'Subscription')
+    counters = (
+        (Recipe, 'favorites_count', Favorite, 'recipe'),
+        (Recipe, 'shopping_cart_count', ShoppingCart, 'recipe'),
+        (User, 'recipes_count', Recipe, 'author'),
+        (User, 'followers_count', Subscription, 'author'),
+    )
+    for model, counter, counted_model, field in counters:
+        model.objects.update(**{counter: Coalesce(Subquery(
+            counted_model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                count=Count('pk')
+            ).values('count')
+        ), 0)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0012_recipe_pub_date_id_index'),
+        ('user', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='shopping_cart_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В списках покупок'),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
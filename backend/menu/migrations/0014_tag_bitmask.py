@@ -0,0 +1,44 @@
+# Generated by Django 3.2 on 2026-10-18 17:36
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+
+
+def populate_tags_mask(apps, schema_editor):
+    Tag = apps.get_model('menu', 'Tag')
+    Recipe = apps.get_model('menu', 'Recipe')
+    RecipeTag = apps.get_model('menu', 'RecipeTag')
+    for bit, tag in enumerate(Tag.objects.order_by('id')[:63]):
+        tag.bit = bit
+        tag.save(update_fields=['bit'])
+    Recipe.objects.update(tags_mask=Coalesce(Subquery(
+        RecipeTag.objects.filter(
+            recipe=OuterRef('pk'), tag__bit__isnull=False
+        ).order_by().values('recipe').annotate(mask=Cast(
+            Sum(Cast(Value(1), models.BigIntegerField()).bitleftshift(
+                F('tag__bit')
+            )), models.BigIntegerField()
+        )).values('mask')
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0013_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='tags_mask',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Маска тегов'),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='bit',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, unique=True, verbose_name='Бит в маске тегов рецепта'),
+        ),
+        migrations.RunPython(populate_tags_mask, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+from django.db import migrations
+
+POSTGRES_CREATE = (
+    'CREATE TABLE IF NOT EXISTS menu_recipe_search ('
+    'recipe_id bigint PRIMARY KEY '
+    'REFERENCES menu_recipe (id) ON DELETE CASCADE DEFERRABLE INITIALLY '
+    'DEFERRED, document tsvector NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS menu_recipe_search_document '
+    'ON menu_recipe_search USING gin (document)',
+)
+SQLITE_CREATE = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS menu_recipe_search USING fts5('
+    "name, text, ingredients, tokenize = 'unicode61 remove_diacritics 2')",
+    'CREATE TRIGGER IF NOT EXISTS menu_recipe_search_delete '
+    'AFTER DELETE ON menu_recipe BEGIN '
+    'DELETE FROM menu_recipe_search WHERE rowid = old.id; END',
+)
+# Документы индекса для уже существующих рецептов. SQL повторяет
+# menu.search на момент миграции: сама миграция модуль не импортирует.
+INGREDIENT_NAMES = (
+    'SELECT {aggregate} FROM menu_recipeingredient ri '
+    'JOIN menu_ingredient i ON i.id = ri.ingredient_id '
+    'WHERE ri.recipe_id = r.id'
+)
+POSTGRES_POPULATE = (
+    'INSERT INTO menu_recipe_search (recipe_id, document) '
+    "SELECT r.id, setweight(to_tsvector('russian', r.name), 'A') "
+    "|| setweight(to_tsvector('russian', r.text), 'B') "
+    "|| setweight(to_tsvector('russian', coalesce(("
+    + INGREDIENT_NAMES.format(aggregate="string_agg(i.name, ' ')")
+    + "), '')), 'C') FROM menu_recipe r "
+    'ON CONFLICT (recipe_id) DO UPDATE SET document = EXCLUDED.document'
+)
+SQLITE_POPULATE = (
+    'INSERT INTO menu_recipe_search (rowid, name, text, ingredients) '
+    'SELECT r.id, r.name, r.text, ('
+    + INGREDIENT_NAMES.format(aggregate="group_concat(i.name, ' ')")
+    + ') FROM menu_recipe r'
+)
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_CREATE + (POSTGRES_POPULATE,)
+    elif vendor == 'sqlite':
+        statements = SQLITE_CREATE + (SQLITE_POPULATE,)
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TRIGGER IF EXISTS menu_recipe_search_delete')
+    if vendor in ('postgresql', 'sqlite'):
+        schema_editor.execute('DROP TABLE IF EXISTS menu_recipe_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0014_tag_bitmask'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 3.2 on 2026-10-18 17:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Ленты подписчиков авторов, у которых не больше TIMELINE_FANOUT_LIMIT
+# подписчиков. SQL повторяет menu.timeline на момент миграции.
+POPULATE_SQL = (
+    'INSERT INTO menu_timelineentry (user_id, recipe_id, author_id, pub_date) '
+    'SELECT s.user_id, r.id, r.author_id, r.pub_date '
+    'FROM user_subscription s '
+    'JOIN user_user a ON a.id = s.author_id '
+    'JOIN menu_recipe r ON r.author_id = s.author_id '
+    'WHERE a.followers_count <= %s'
+)
+
+
+def populate_timelines(apps, schema_editor):
+    schema_editor.execute(POPULATE_SQL, [settings.TIMELINE_FANOUT_LIMIT])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('user', '0003_user_counters'),
+        ('menu', '0015_recipe_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='menu.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='timeline_user_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='user_timeline_recipe_unique'),
+        ),
+        migrations.RunPython(populate_timelines, migrations.RunPython.noop),
+    ]
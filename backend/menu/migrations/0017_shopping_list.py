@@ -0,0 +1,48 @@
+# Generated by Django 3.2 on 2026-10-18 17:58
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Списки покупок по текущим корзинам. SQL повторяет menu.shopping_list
+# на момент миграции.
+POPULATE_SQL = (
+    'INSERT INTO menu_shoppinglistitem (user_id, ingredient_id, amount) '
+    'SELECT c.user_id, ri.ingredient_id, SUM(ri.amount) '
+    'FROM menu_shoppingcart c '
+    'JOIN menu_recipeingredient ri ON ri.recipe_id = c.recipe_id '
+    'GROUP BY c.user_id, ri.ingredient_id'
+)
+
+
+def populate_shopping_lists(apps, schema_editor):
+    schema_editor.execute(POPULATE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('menu', '0016_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='menu.ingredient', verbose_name='Ингридиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Строка списка покупок',
+                'verbose_name_plural': 'Строки списков покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='user_shopping_list_ingredient_unique'),
+        ),
+        migrations.RunPython(populate_shopping_lists, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 3.2 on 2026-10-18 18:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# В SQLite у документа FTS5 есть только rowid: колонка recipe_id нужна,
+# чтобы RecipeSearchDocument соединялся с рецептами так же, как
+# в PostgreSQL. Таблица PostgreSQL не меняется.
+INGREDIENT_NAMES = (
+    'SELECT group_concat(i.name, \' \') FROM menu_recipeingredient ri '
+    'JOIN menu_ingredient i ON i.id = ri.ingredient_id '
+    'WHERE ri.recipe_id = r.id'
+)
+TOKENIZE = "tokenize = 'unicode61 remove_diacritics 2'"
+SQLITE_FORWARD = (
+    'DROP TABLE IF EXISTS menu_recipe_search',
+    'CREATE VIRTUAL TABLE menu_recipe_search USING fts5('
+    f'recipe_id UNINDEXED, name, text, ingredients, {TOKENIZE})',
+    'INSERT INTO menu_recipe_search (rowid, recipe_id, name, text, '
+    f'ingredients) SELECT r.id, r.id, r.name, r.text, ({INGREDIENT_NAMES}) '
+    'FROM menu_recipe r',
+)
+SQLITE_BACKWARD = (
+    'DROP TABLE IF EXISTS menu_recipe_search',
+    'CREATE VIRTUAL TABLE menu_recipe_search USING fts5('
+    f'name, text, ingredients, {TOKENIZE})',
+    'INSERT INTO menu_recipe_search (rowid, name, text, ingredients) '
+    f'SELECT r.id, r.name, r.text, ({INGREDIENT_NAMES}) FROM menu_recipe r',
+)
+
+
+def run_on_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0018_recipetag_tag_recipe_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchDocument',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='menu.recipe')),
+            ],
+            options={
+                'db_table': 'menu_recipe_search',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(
+            run_on_sqlite(SQLITE_FORWARD), run_on_sqlite(SQLITE_BACKWARD)
+        ),
+    ]
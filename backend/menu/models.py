@@ -1,227 +1,517 @@
-from django.db import models
-from django.contrib.auth import get_user_model
-from django.db.models import UniqueConstraint
-from django.core.validators import MinValueValidator
-
-User = get_user_model()
-
-
-class Ingredient(models.Model):
-    """Модель для ингридиентов."""
-
-    name = models.CharField(
-        max_length=200,
-        verbose_name='Название ингридиента',
-        help_text='Укажите ингридиент',
-        unique=True,
-    )
-    measurement_unit = models.CharField(
-        max_length=200,
-        verbose_name='Единица измерения',
-        help_text='Укажите единицы измерения',
-    )
-
-    class Meta:
-        verbose_name = 'Ингредиент'
-        verbose_name_plural = 'Ингредиенты'
-        constraints = [
-            UniqueConstraint(
-                fields=['name', 'measurement_unit'],
-                name='ingredient_name_unit_unique'
-            )
-        ]
-
-    def __str__(self):
-        return self.name
-
-
-class Tag(models.Model):
-    """Модель для тэгов."""
-
-    name = models.CharField(
-        verbose_name='Тег',
-        help_text='Укажите имя',
-        max_length=200,
-        unique=True
-    )
-    color = models.CharField(
-        verbose_name='Цвет',
-        help_text='Укажите цвет в формате #ffffff',
-        max_length=7
-    )
-    slug = models.SlugField(
-        verbose_name='Slug',
-        help_text='Укажите slug',
-        unique=True,
-        max_length=200
-    )
-
-    class Meta:
-        verbose_name = 'Тег'
-        verbose_name_plural = 'Теги'
-
-    def __str__(self):
-        return self.name
-
-
-class Recipe(models.Model):
-    """Модель для рецептов."""
-
-    name = models.CharField(
-        verbose_name='Название',
-        help_text='Укажите название',
-        unique=True,
-        max_length=200
-    )
-    pub_date = models.DateTimeField(
-        verbose_name='Дата публикации',
-        auto_now_add=True
-    )
-    cooking_time = models.PositiveSmallIntegerField(
-        verbose_name='Время приготовления (в минутах)',
-        help_text='Укажите время приготовления (в минутах)',
-        validators=[MinValueValidator(
-            1, message='Время приготовления должно быть не менее 1 минуты!'
-        )]
-    )
-    author = models.ForeignKey(
-        User,
-        related_name='recipes',
-        on_delete=models.CASCADE,
-        verbose_name='Автор',
-    )
-    text = models.TextField(
-        verbose_name='Введите описание рецепта',
-        max_length=255
-    )
-    image = models.ImageField(
-        upload_to='recipes_images/',
-        verbose_name='Изображение',
-    )
-    tags = models.ManyToManyField(
-        Tag,
-        through='RecipeTag',
-        verbose_name='Теги',
-        help_text='Удерживайте Ctrl для выбора нескольких вариантов'
-    )
-    ingredients = models.ManyToManyField(
-        Ingredient,
-        through='RecipeIngredient',
-        related_name='ingredients',
-        verbose_name='Ингридиенты',
-        help_text='Удерживайте Ctrl для выбора нескольких ингридиентов'
-    )
-
-    class Meta:
-        verbose_name = 'Рецепт'
-        verbose_name_plural = 'Рецепты'
-        ordering = ['-pub_date']
-
-    def __str__(self):
-        return self.name
-
-
-class RecipeIngredient(models.Model):
-    """Модель для ингридиентов и их количества."""
-
-    recipe = models.ForeignKey(
-        Recipe,
-        on_delete=models.CASCADE
-    )
-    ingredient = models.ForeignKey(
-        Ingredient,
-        on_delete=models.CASCADE
-    )
-    amount = models.PositiveSmallIntegerField(
-        validators=[MinValueValidator(
-            1,
-            message=('Количество ингридиента измеряется целыми числами'
-                     + 'и не может быть меньше 1!')
-        )]
-    )
-
-    class Meta:
-        constraints = [
-            UniqueConstraint(
-                fields=['recipe', 'ingredient'],
-                name='recipe_ingredient_unique'
-            )
-        ]
-
-    def __str__(self):
-        return f'{self.recipe} {self.ingredient} {self.amount}'
-
-
-class RecipeTag(models.Model):
-    """Модель тега и рецепта."""
-
-    recipe = models.ForeignKey(
-        Recipe,
-        on_delete=models.CASCADE,
-    )
-    tag = models.ForeignKey(
-        Tag,
-        on_delete=models.CASCADE,
-    )
-
-    class Meta:
-        constraints = [
-            UniqueConstraint(
-                fields=['recipe', 'tag'],
-                name='recipe_tag_unique'
-            )
-        ]
-
-
-class ShoppingCart(models.Model):
-    """Модель корзины."""
-
-    user = models.ForeignKey(
-        User,
-        on_delete=models.CASCADE,
-        verbose_name='Пользователь',
-        related_name='shopping_cart',
-    )
-    recipe = models.ForeignKey(
-        Recipe,
-        on_delete=models.CASCADE,
-        verbose_name='Рецепт',
-        related_name='shopping_cart',
-    )
-
-    class Meta:
-        verbose_name = 'Список покупок'
-        verbose_name_plural = 'Списки покупок'
-        constraints = [
-            UniqueConstraint(
-                fields=['user', 'recipe'],
-                name='user_shopping_cart_unique'
-            )
-        ]
-
-
-class Favorite(models.Model):
-    """Модель избранного."""
-
-    user = models.ForeignKey(
-        User,
-        on_delete=models.CASCADE,
-        verbose_name='Пользователь',
-        related_name='favorites',
-    )
-    recipe = models.ForeignKey(
-        Recipe,
-        on_delete=models.CASCADE,
-        verbose_name='Рецепт',
-        related_name='favorites',
-    )
-
-    class Meta:
-        verbose_name = 'Избранное'
-        verbose_name_plural = 'Избранное'
-        constraints = [
-            UniqueConstraint(
-                fields=['user', 'recipe'],
-                name='user_favorite_unique'
-            )
-        ]
+from django.db import IntegrityError, models, transaction
+from django.contrib.auth import get_user_model
+from django.db.models import (Exists, F, OuterRef, Prefetch, Subquery, Sum,
+                              UniqueConstraint, Value, Window)
+from django.db.models.functions import Cast, Coalesce, RowNumber
+from django.core.exceptions import EmptyResultSet
+from django.core.validators import MinValueValidator
+
+from backend.denormalized_fields import DenormalizedFieldsMixin
+from user.models import Subscription
+from .images import delete_image_files, make_image_variants
+from .search import SEARCH_TABLE, search_recipes, update_search_index
+
+User = get_user_model()
+
+
+class Ingredient(models.Model):
+    """Модель для ингридиентов."""
+
+    name = models.CharField(
+        max_length=200,
+        verbose_name='Название ингридиента',
+        help_text='Укажите ингридиент',
+        unique=True,
+    )
+    measurement_unit = models.CharField(
+        max_length=200,
+        verbose_name='Единица измерения',
+        help_text='Укажите единицы измерения',
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиент'
+        verbose_name_plural = 'Ингредиенты'
+        constraints = [
+            UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='ingredient_name_unit_unique'
+            )
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+# Число тегов, которые помещаются в Recipe.tags_mask (знаковый bigint).
+TAG_MASK_BITS = 63
+# Попытки занять свободный бит, если его одновременно занял другой тег.
+TAG_BIT_ATTEMPTS = 5
+
+
+class Tag(models.Model):
+    """Модель для тэгов."""
+
+    name = models.CharField(
+        verbose_name='Тег',
+        help_text='Укажите имя',
+        max_length=200,
+        unique=True
+    )
+    color = models.CharField(
+        verbose_name='Цвет',
+        help_text='Укажите цвет в формате #ffffff',
+        max_length=7
+    )
+    slug = models.SlugField(
+        verbose_name='Slug',
+        help_text='Укажите slug',
+        unique=True,
+        max_length=200
+    )
+    bit = models.PositiveSmallIntegerField(
+        verbose_name='Бит в маске тегов рецепта',
+        unique=True,
+        null=True,
+        blank=True,
+        editable=False,
+    )
+
+    class Meta:
+        verbose_name = 'Тег'
+        verbose_name_plural = 'Теги'
+
+    @staticmethod
+    def free_bit():
+        used = set(Tag.objects.exclude(bit=None).values_list(
+            'bit', flat=True
+        ))
+        return next(
+            (bit for bit in range(TAG_MASK_BITS) if bit not in used), None
+        )
+
+    def save(self, *args, **kwargs):
+        if self.bit is not None:
+            return super().save(*args, **kwargs)
+        adding = self._state.adding
+        for attempt in range(TAG_BIT_ATTEMPTS):
+            self.bit = self.free_bit()
+            try:
+                # Точка сохранения: после конфликта по уникальному биту
+                # внешняя транзакция продолжается со следующим битом.
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+            except IntegrityError:
+                if (self.bit is None or attempt == TAG_BIT_ATTEMPTS - 1
+                        or not Tag.objects.filter(bit=self.bit).exists()):
+                    raise
+            else:
+                break
+        if not adding and self.bit is not None:
+            # Тег получил освободившийся бит - он попадает в маски рецептов.
+            Recipe.objects.filter(tags=self).update_tags_mask()
+
+    def __str__(self):
+        return self.name
+
+
+class RecipeQuerySet(models.QuerySet):
+    """Queryset рецептов для выдачи на чтение."""
+
+    def with_related(self):
+        """Подгружает теги и ингридиенты без запросов на каждый рецепт."""
+        return self.prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'
+                ).order_by('id')
+            ),
+        )
+
+    def with_user_flags(self, user):
+        """
+        Аннотирует рецепты флагами is_favorited и is_in_shopping_cart,
+        а автора - флагом is_subscribed для текущего пользователя.
+        """
+        authors = User.objects.all()
+        if user.is_anonymous:
+            authors = authors.annotate(is_subscribed=Value(False))
+            return self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+            ).prefetch_related(Prefetch('author', queryset=authors))
+        authors = authors.annotate(is_subscribed=Exists(
+            Subscription.objects.filter(user=user, author=OuterRef('pk'))
+        ))
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+        ).prefetch_related(Prefetch('author', queryset=authors))
+
+    def update_tags_mask(self):
+        """Пересчитывает tags_mask рецептов по их тегам одним UPDATE."""
+        return self.update(tags_mask=Coalesce(Subquery(
+            RecipeTag.objects.filter(
+                recipe=OuterRef('pk'), tag__bit__isnull=False
+            ).order_by().values('recipe').annotate(mask=Cast(
+                Sum(Cast(Value(1), models.BigIntegerField()).bitleftshift(
+                    F('tag__bit')
+                )), models.BigIntegerField()
+            )).values('mask')
+        ), 0))
+
+    def search(self, query):
+        """Полнотекстовый поиск с сортировкой по релевантности."""
+        return search_recipes(self, query)
+
+    def update_search_index(self):
+        """Обновляет документы рецептов в поисковом индексе."""
+        update_search_index(self)
+
+    def latest_by_author(self, authors, limit=None):
+        """
+        Последние рецепты каждого из авторов одним запросом.
+        При указанном limit (положительное число) берется не более limit
+        рецептов на автора (ROW_NUMBER() в разрезе автора).
+        """
+        recipes = self.filter(author__in=authors)
+        if not limit:
+            return recipes.order_by('author_id', '-pub_date')
+        windowed = recipes.annotate(row_number=Window(
+            expression=RowNumber(),
+            partition_by=[F('author_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()],
+        )).order_by().values(
+            'id', 'name', 'image', 'image_thumbnail', 'cooking_time',
+            'pub_date', 'author_id', 'row_number',
+        )
+        try:
+            sql, params = windowed.query.sql_with_params()
+        except EmptyResultSet:
+            return self.none()
+        return self.raw(
+            f'SELECT * FROM ({sql}) AS windowed '
+            'WHERE row_number <= %s ORDER BY author_id, row_number',
+            (*params, limit),
+        )
+
+
+class Recipe(DenormalizedFieldsMixin, models.Model):
+    """Модель для рецептов."""
+
+    name = models.CharField(
+        verbose_name='Название',
+        help_text='Укажите название',
+        unique=True,
+        max_length=200
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации',
+        auto_now_add=True
+    )
+    cooking_time = models.PositiveSmallIntegerField(
+        verbose_name='Время приготовления (в минутах)',
+        help_text='Укажите время приготовления (в минутах)',
+        validators=[MinValueValidator(
+            1, message='Время приготовления должно быть не менее 1 минуты!'
+        )]
+    )
+    author = models.ForeignKey(
+        User,
+        related_name='recipes',
+        on_delete=models.CASCADE,
+        verbose_name='Автор',
+    )
+    text = models.TextField(
+        verbose_name='Введите описание рецепта',
+        max_length=255
+    )
+    image = models.ImageField(
+        upload_to='recipes_images/',
+        verbose_name='Изображение',
+    )
+    image_thumbnail = models.ImageField(
+        upload_to='recipes_images/variants/',
+        verbose_name='Миниатюра изображения',
+        blank=True,
+        editable=False,
+    )
+    image_medium = models.ImageField(
+        upload_to='recipes_images/variants/',
+        verbose_name='Изображение среднего размера',
+        blank=True,
+        editable=False,
+    )
+    tags = models.ManyToManyField(
+        Tag,
+        through='RecipeTag',
+        verbose_name='Теги',
+        help_text='Удерживайте Ctrl для выбора нескольких вариантов'
+    )
+    ingredients = models.ManyToManyField(
+        Ingredient,
+        through='RecipeIngredient',
+        related_name='ingredients',
+        verbose_name='Ингридиенты',
+        help_text='Удерживайте Ctrl для выбора нескольких ингридиентов'
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False,
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name='В списках покупок',
+        default=0,
+        editable=False,
+    )
+    tags_mask = models.BigIntegerField(
+        verbose_name='Маска тегов',
+        default=0,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
+    denormalized_fields = (
+        'favorites_count', 'shopping_cart_count', 'tags_mask',
+    )
+
+    class Meta:
+        verbose_name = 'Рецепт'
+        verbose_name_plural = 'Рецепты'
+        ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='recipe_pub_date_id_idx'
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Имя картинки в базе: при сохранении варианты пересоздаются,
+        # только если картинка сменилась.
+        instance._image_name = instance.__dict__.get('image')
+        return instance
+
+    def save(self, *args, **kwargs):
+        superseded = []
+        if ('image' not in self.get_deferred_fields() and self.image
+                and (self.image.name != getattr(self, '_image_name', None)
+                     or not self.image_thumbnail)):
+            superseded = make_image_variants(self)
+        super().save(*args, **kwargs)
+        self._image_name = self.image.name
+        delete_image_files(self, superseded)
+
+    def __str__(self):
+        return self.name
+
+
+class RecipeSearchDocument(models.Model):
+    """
+    Документ полнотекстового индекса рецепта. Таблицу создают и заполняют
+    миграции и menu.search, модель нужна, чтобы поиск соединял ее
+    с рецептами через ORM.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        primary_key=True,
+        on_delete=models.DO_NOTHING,
+        related_name='search_document',
+    )
+
+    class Meta:
+        managed = False
+        db_table = SEARCH_TABLE
+
+
+class RecipeIngredient(models.Model):
+    """Модель для ингридиентов и их количества."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE
+    )
+    amount = models.PositiveSmallIntegerField(
+        validators=[MinValueValidator(
+            1,
+            message=('Количество ингридиента измеряется целыми числами'
+                     + 'и не может быть меньше 1!')
+        )]
+    )
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=['recipe', 'ingredient'],
+                name='recipe_ingredient_unique'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} {self.ingredient} {self.amount}'
+
+
+class RecipeTag(models.Model):
+    """Модель тега и рецепта."""
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+    )
+    tag = models.ForeignKey(
+        Tag,
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=['recipe', 'tag'],
+                name='recipe_tag_unique'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['tag', 'recipe'], name='recipetag_tag_recipe_idx'
+            ),
+        ]
+
+
+class ShoppingCart(models.Model):
+    """Модель корзины."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='shopping_cart',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+        related_name='shopping_cart',
+    )
+
+    class Meta:
+        verbose_name = 'Список покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='user_shopping_cart_unique'
+            )
+        ]
+
+
+class Favorite(models.Model):
+    """Модель избранного."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='favorites',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+        related_name='favorites',
+    )
+
+    class Meta:
+        verbose_name = 'Избранное'
+        verbose_name_plural = 'Избранное'
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='user_favorite_unique'
+            )
+        ]
+
+
+class TimelineEntry(models.Model):
+    """
+    Рецепт в ленте подписчика автора.
+    Записи добавляются при публикации рецепта (см. menu.timeline).
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Подписчик',
+        related_name='timeline',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт',
+        related_name='timeline_entries',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Автор',
+        related_name='+',
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='user_timeline_recipe_unique'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-recipe'],
+                name='timeline_user_pub_date_idx'
+            ),
+        ]
+
+
+class ShoppingListItem(models.Model):
+    """
+    Ингридиент в списке покупок пользователя: сумма количества
+    по рецептам в его корзине. Строки пересчитываются при изменении
+    корзины и ингридиентов рецептов в ней (см. menu.shopping_list).
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='shopping_list',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингридиент',
+        related_name='+',
+    )
+    amount = models.PositiveIntegerField(verbose_name='Количество')
+
+    class Meta:
+        verbose_name = 'Строка списка покупок'
+        verbose_name_plural = 'Строки списков покупок'
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='user_shopping_list_ingredient_unique'
+            )
+        ]
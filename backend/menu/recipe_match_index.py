@@ -0,0 +1,206 @@
+import threading
+import time
+from array import array
+from collections import Counter
+from itertools import chain, count, groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db.models import Count, F, Q
+
+from backend.db_router import use_primary
+
+
+def sort_matches(matches):
+    """Сначала рецепты без недостающих ингридиентов, затем по их числу."""
+    matches.sort(key=lambda match: (match[2], -match[1], -match[0]))
+    return matches
+
+
+class RecipeMatchIndex:
+    """
+    Инвертированный индекс в памяти процесса: для каждого ингридиента -
+    id рецептов, в которых он есть. Подбор рецептов по набору
+    ингридиентов сводится к подсчету вхождений id в их списках.
+    Рецепты обновляются в индексе сигналами после коммита,
+    а целиком индекс перестраивается по истечении
+    RECIPE_MATCH_INDEX_TTL секунд - чтобы изменения, сделанные
+    в других процессах, тоже попадали в индекс.
+    """
+
+    def __init__(self):
+        # Защищает данные индекса, пока их читают или меняют.
+        self._lock = threading.RLock()
+        # Перестраивает индекс только один поток.
+        self._build_lock = threading.Lock()
+        self._built = None
+        # id ингридиента -> array id рецептов. Список, который меняет
+        # refresh, становится множеством до следующей перестройки.
+        self._postings = {}
+        # id рецепта -> кортеж id его ингридиентов.
+        self._recipes = {}
+        # Рецепты, измененные во время перестройки, None - если
+        # индекс не перестраивается.
+        self._dirty = None
+        # Номера чтений из базы по порядку их начала: данные чтения,
+        # начатого раньше, не заменяют в индексе данные более позднего.
+        self._tickets = count(1)
+        # Номер чтения, по которому построен индекс, и номера чтений
+        # рецептов, обновленных в нем после этого.
+        self._built_ticket = 0
+        self._recipe_tickets = {}
+
+    def invalidate(self):
+        self._built = None
+
+    def _rows(self, recipe_ids=None):
+        from .models import RecipeIngredient
+
+        rows = RecipeIngredient.objects.order_by('recipe_id')
+        if recipe_ids is not None:
+            rows = rows.filter(recipe_id__in=recipe_ids)
+        return groupby(
+            rows.values_list('recipe_id', 'ingredient_id').iterator(),
+            key=itemgetter(0),
+        )
+
+    def _read(self, recipe_ids):
+        """Кортежи ингридиентов рецептов recipe_ids, пустые - для удаленных."""
+        recipes = dict.fromkeys(recipe_ids, ())
+        with use_primary():
+            for recipe_id, rows in self._rows(recipe_ids):
+                recipes[recipe_id] = tuple(row[1] for row in rows)
+        return recipes
+
+    def _build(self):
+        postings = {}
+        recipes = {}
+        # Индекс живет до TTL, поэтому не строится по отстающей реплике.
+        with use_primary():
+            for recipe_id, rows in self._rows():
+                ingredients = recipes[recipe_id] = tuple(
+                    row[1] for row in rows
+                )
+                for ingredient_id in ingredients:
+                    posting = postings.get(ingredient_id)
+                    if posting is None:
+                        posting = postings[ingredient_id] = array('q')
+                    posting.append(recipe_id)
+        return postings, recipes
+
+    def _is_stale(self):
+        built = self._built
+        return built is None or (
+            time.monotonic() - built > settings.RECIPE_MATCH_INDEX_TTL
+        )
+
+    def _ensure_built(self):
+        if not self._is_stale():
+            return
+        # Пока один поток строит индекс без блокировки данных, остальные
+        # подбирают рецепты по прежнему индексу, а если его еще нет - ждут.
+        if not self._build_lock.acquire(blocking=not self._recipes):
+            return
+        try:
+            if not self._is_stale():
+                return
+            with self._lock:
+                self._dirty = set()
+                ticket = next(self._tickets)
+            try:
+                postings, recipes = self._build()
+            except BaseException:
+                with self._lock:
+                    self._dirty = None
+                raise
+            with self._lock:
+                dirty, self._dirty = self._dirty, None
+                self._postings, self._recipes = postings, recipes
+                self._built_ticket, self._recipe_tickets = ticket, {}
+                self._built = time.monotonic()
+            # Рецепты, измененные после начала перестройки, могли попасть
+            # в новый индекс в прежнем виде.
+            if dirty:
+                self.refresh(dirty)
+        finally:
+            self._build_lock.release()
+
+    def _apply(self, recipes):
+        for recipe_id, ingredients in recipes.items():
+            old = self._recipes.pop(recipe_id, ())
+            for ingredient_id in set(old) - set(ingredients):
+                self._posting_set(ingredient_id).discard(recipe_id)
+            for ingredient_id in set(ingredients) - set(old):
+                self._posting_set(ingredient_id).add(recipe_id)
+            if ingredients:
+                self._recipes[recipe_id] = ingredients
+
+    def _posting_set(self, ingredient_id):
+        # array.remove - проход по всему массиву, поэтому изменяемый
+        # список один раз превращается в множество.
+        posting = self._postings.get(ingredient_id)
+        if not isinstance(posting, set):
+            posting = self._postings[ingredient_id] = set(posting or ())
+        return posting
+
+    def refresh(self, recipe_ids):
+        """Перечитывает из базы ингридиенты рецептов recipe_ids."""
+        if self._built is None and self._dirty is None:
+            return
+        with self._lock:
+            if self._dirty is not None:
+                self._dirty.update(recipe_ids)
+            if self._built is None:
+                return
+            ticket = next(self._tickets)
+        # Чтение из базы - без блокировки: match и другие refresh его
+        # не ждут. Рецепты, которые уже обновлены более поздним чтением
+        # или перестройкой, здесь не меняются.
+        recipes = self._read(recipe_ids)
+        with self._lock:
+            recipes = {
+                recipe_id: ingredients
+                for recipe_id, ingredients in recipes.items()
+                if ticket > max(self._built_ticket,
+                                self._recipe_tickets.get(recipe_id, 0))
+            }
+            self._apply(recipes)
+            self._recipe_tickets.update(dict.fromkeys(recipes, ticket))
+
+    def match(self, ingredient_ids, max_missing=None):
+        """
+        Рецепты, в которых есть хотя бы один из ингридиентов:
+        список (id рецепта, есть ингридиентов, не хватает ингридиентов).
+        """
+        self._ensure_built()
+        with self._lock:
+            matched = Counter(chain.from_iterable(
+                self._postings.get(ingredient_id, ())
+                for ingredient_id in set(ingredient_ids)
+            ))
+            matches = [
+                (recipe_id, count, len(self._recipes[recipe_id]) - count)
+                for recipe_id, count in matched.items()
+            ]
+        if max_missing is not None:
+            matches = [match for match in matches if match[2] <= max_missing]
+        return sort_matches(matches)
+
+
+def match_in_database(ingredient_ids, max_missing=None):
+    """То же, что RecipeMatchIndex.match, одним запросом к базе."""
+    from .models import RecipeIngredient
+
+    rows = RecipeIngredient.objects.values('recipe_id').annotate(
+        total=Count('id'),
+        matched=Count('id', filter=Q(ingredient_id__in=ingredient_ids)),
+    ).filter(matched__gt=0)
+    if max_missing is not None:
+        rows = rows.filter(total__lte=F('matched') + max_missing)
+    return sort_matches([
+        (row['recipe_id'], row['matched'], row['total'] - row['matched'])
+        for row in rows.order_by()
+    ])
+
+
+recipe_match_index = RecipeMatchIndex()
@@ -0,0 +1,100 @@
+import re
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connections, models
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# Полнотекстовый индекс рецептов: в PostgreSQL - таблица с колонкой
+# tsvector и GIN-индексом, в SQLite - виртуальная таблица FTS5.
+# Создается миграцией 0015_recipe_search_index, колонку recipe_id
+# в SQLite добавляет 0019_recipesearchdocument.
+SEARCH_TABLE = 'menu_recipe_search'
+SEARCH_CONFIG = 'russian'
+MAX_SEARCH_TERMS = 10
+SEARCH_TERM_RE = re.compile(r'[^\W_]+')
+
+INGREDIENT_NAMES_SQL = (
+    'SELECT {aggregate} FROM menu_recipeingredient ri '
+    'JOIN menu_ingredient i ON i.id = ri.ingredient_id '
+    'WHERE ri.recipe_id = r.id'
+)
+POSTGRES_UPDATE_SQL = (
+    f'INSERT INTO {SEARCH_TABLE} (recipe_id, document) '
+    f"SELECT r.id, setweight(to_tsvector('{SEARCH_CONFIG}', r.name), 'A') "
+    f"|| setweight(to_tsvector('{SEARCH_CONFIG}', r.text), 'B') "
+    f"|| setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(("
+    + INGREDIENT_NAMES_SQL.format(aggregate="string_agg(i.name, ' ')")
+    + "), '')), 'C') FROM menu_recipe r WHERE r.id IN ({ids}) "
+    'ON CONFLICT (recipe_id) DO UPDATE SET document = EXCLUDED.document'
+)
+SQLITE_DELETE_SQL = f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({{ids}})'
+SQLITE_INSERT_SQL = (
+    f'INSERT INTO {SEARCH_TABLE} (rowid, recipe_id, name, text, ingredients) '
+    'SELECT r.id, r.id, r.name, r.text, ('
+    + INGREDIENT_NAMES_SQL.format(aggregate="group_concat(i.name, ' ')")
+    + ') FROM menu_recipe r WHERE r.id IN ({ids})'
+)
+# Веса колонок recipe_id, name, text, ingredients для bm25 - как A, B, C
+# в PostgreSQL, recipe_id не индексируется.
+SQLITE_RANK = f'-bm25({SEARCH_TABLE}, 0.0, 10.0, 4.0, 1.0)'
+
+
+def search_terms(query):
+    """Слова запроса в нижнем регистре, без знаков препинания."""
+    return SEARCH_TERM_RE.findall(query.lower())[:MAX_SEARCH_TERMS]
+
+
+def update_search_index(queryset):
+    """Перестраивает документы поискового индекса для рецептов queryset."""
+    connection = connections[queryset.db]
+    try:
+        sql, params = queryset.values('id').query.sql_with_params()
+    except EmptyResultSet:
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(POSTGRES_UPDATE_SQL.format(ids=sql), params)
+        elif connection.vendor == 'sqlite':
+            cursor.execute(SQLITE_DELETE_SQL.format(ids=sql), params)
+            cursor.execute(SQLITE_INSERT_SQL.format(ids=sql), params)
+
+
+def search_recipes(queryset, query):
+    """
+    Рецепты, в названии, описании или ингридиентах которых есть
+    все слова запроса (в том числе как начало слова),
+    упорядоченные по релевантности.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        search_query = ' & '.join(f'{term}:*' for term in terms)
+        tsquery = f"to_tsquery('{SEARCH_CONFIG}', %s)"
+        match = f'{SEARCH_TABLE}.document @@ {tsquery}'
+        rank = f'ts_rank({SEARCH_TABLE}.document, {tsquery})'
+        rank_params = [search_query]
+    elif vendor == 'sqlite':
+        search_query = ' '.join(f'"{term}"*' for term in terms)
+        match = f'{SEARCH_TABLE} MATCH %s'
+        rank = SQLITE_RANK
+        rank_params = []
+    else:
+        condition = Q()
+        for term in terms:
+            condition &= (
+                Q(name__icontains=term) | Q(text__icontains=term)
+                | Q(ingredients__name__icontains=term)
+            )
+        return queryset.filter(condition).distinct()
+    # Рецепты соединяются с документами индекса (RecipeSearchDocument),
+    # отбор идет по индексу (GIN или FTS5). Ранг нужен только
+    # для сортировки: alias не попадает в SELECT и в COUNT(*) пагинации.
+    return queryset.filter(
+        RawSQL(match, [search_query], models.BooleanField()),
+        search_document__isnull=False,
+    ).alias(
+        search_rank=RawSQL(rank, rank_params, models.FloatField())
+    ).order_by('-search_rank', '-pub_date', '-id')
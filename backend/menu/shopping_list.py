@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F, Sum
+
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem, User
+
+REBUILD_SQL = (
+    'INSERT INTO menu_shoppinglistitem (user_id, ingredient_id, amount) '
+    'SELECT c.user_id, ri.ingredient_id, SUM(ri.amount) '
+    'FROM menu_shoppingcart c '
+    'JOIN menu_recipeingredient ri ON ri.recipe_id = c.recipe_id '
+    'GROUP BY c.user_id, ri.ingredient_id'
+)
+
+
+def recipe_ingredient_ids(recipe_ids):
+    return list(RecipeIngredient.objects.filter(
+        recipe__in=recipe_ids
+    ).values_list('ingredient_id', flat=True).distinct())
+
+
+def cart_user_ids(recipe_ids):
+    return list(ShoppingCart.objects.filter(
+        recipe__in=recipe_ids
+    ).values_list('user_id', flat=True).distinct())
+
+
+def refresh(user_ids, ingredient_ids=None):
+    """
+    Пересчитывает по корзинам строки списков покупок пользователей
+    user_ids - только по ингридиентам ingredient_ids, если они заданы.
+    """
+    items = ShoppingListItem.objects.filter(user__in=user_ids)
+    totals = RecipeIngredient.objects.filter(
+        recipe__shopping_cart__user__in=user_ids
+    )
+    if ingredient_ids is not None:
+        items = items.filter(ingredient__in=ingredient_ids)
+        totals = totals.filter(ingredient__in=ingredient_ids)
+    totals = totals.values(
+        'recipe__shopping_cart__user', 'ingredient'
+    ).annotate(total=Sum('amount')).order_by()
+    with transaction.atomic():
+        # Пересчеты списков одного пользователя идут по очереди: иначе
+        # два пересчета удаляют строки, а затем оба их вставляют.
+        list(User.objects.select_for_update().filter(
+            pk__in=user_ids
+        ).order_by('pk').values_list('pk', flat=True))
+        items.delete()
+        ShoppingListItem.objects.bulk_create([
+            ShoppingListItem(user_id=row['recipe__shopping_cart__user'],
+                             ingredient_id=row['ingredient'],
+                             amount=row['total'])
+            for row in totals.iterator()
+        ], batch_size=settings.SHOPPING_LIST_BATCH_SIZE)
+
+
+def refresh_recipes(user_ids, recipe_ids):
+    """Пересчитывает строки с ингридиентами рецептов recipe_ids."""
+    ingredient_ids = recipe_ingredient_ids(recipe_ids)
+    if ingredient_ids:
+        refresh(user_ids, ingredient_ids)
+
+
+def refresh_recipe_ingredients(recipe_id, ingredient_ids):
+    """Пересчитывает ингридиенты рецепта в корзинах с этим рецептом."""
+    if not ingredient_ids:
+        return
+    user_ids = cart_user_ids([recipe_id])
+    if user_ids:
+        refresh(user_ids, ingredient_ids)
+
+
+def rebuild_shopping_lists(using='default'):
+    """Заполняет списки покупок всех пользователей одним INSERT ... SELECT."""
+    ShoppingListItem.objects.using(using).all().delete()
+    with connections[using].cursor() as cursor:
+        cursor.execute(REBUILD_SQL)
+        return cursor.rowcount
+
+
+def shopping_list_items(user):
+    """Строки списка покупок пользователя в порядке названий."""
+    return ShoppingListItem.objects.filter(user=user).values(
+        'amount',
+        name=F('ingredient__name'),
+        measurement_unit=F('ingredient__measurement_unit'),
+    ).order_by('ingredient__name')
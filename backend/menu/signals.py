@@ -0,0 +1,140 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from backend.denormalized_fields import change_counter
+from .ingredient_index import ingredient_index
+from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                     RecipeTag, ShoppingCart, Subscription, User)
+from .recipe_match_index import recipe_match_index
+from .shopping_list import (recipe_ingredient_ids, refresh,
+                            refresh_recipe_ingredients, refresh_recipes)
+from .timeline import backfill, fan_out, unfollow
+from .user_recipes import bulk_change
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(instance, created, **kwargs):
+    if created:
+        change_counter(User, instance.author_id, 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(instance, **kwargs):
+    change_counter(User, instance.author_id, 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Favorite)
+def increment_favorites_count(instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def decrement_favorites_count(instance, **kwargs):
+    if bulk_change.get():
+        return
+    change_counter(Recipe, instance.recipe_id, 'favorites_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def increment_shopping_cart_count(instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, instance.recipe_id, 'shopping_cart_count', 1)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def decrement_shopping_cart_count(instance, **kwargs):
+    if bulk_change.get():
+        return
+    change_counter(Recipe, instance.recipe_id, 'shopping_cart_count', -1)
+
+
+@receiver((post_save, post_delete), sender=RecipeTag)
+def update_recipe_tags_mask(instance, **kwargs):
+    Recipe.objects.filter(pk=instance.recipe_id).update_tags_mask()
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_index(instance, **kwargs):
+    # После коммита: ингридиенты сохраняются уже после самого рецепта.
+    transaction.on_commit(
+        Recipe.objects.filter(pk=instance.pk).update_search_index
+    )
+
+
+@receiver(post_save, sender=Ingredient)
+def update_ingredient_recipes_search_index(instance, created, **kwargs):
+    if not created:
+        transaction.on_commit(
+            Recipe.objects.filter(ingredients=instance).update_search_index
+        )
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def update_recipe_ingredient_search_index(instance, **kwargs):
+    # Удаление ингридиента каскадом удаляет и строки RecipeIngredient.
+    transaction.on_commit(
+        Recipe.objects.filter(pk=instance.recipe_id).update_search_index
+    )
+
+
+def refresh_recipe_match_index(recipe_id):
+    transaction.on_commit(lambda: recipe_match_index.refresh([recipe_id]))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def update_recipe_match_index(instance, **kwargs):
+    refresh_recipe_match_index(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def update_recipe_ingredient_match_index(instance, **kwargs):
+    refresh_recipe_match_index(instance.recipe_id)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: fan_out(instance))
+
+
+@receiver(post_save, sender=Subscription)
+def backfill_timeline(instance, created, **kwargs):
+    if created:
+        backfill(instance)
+
+
+@receiver(post_delete, sender=Subscription)
+def clear_timeline(instance, **kwargs):
+    unfollow(instance)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(instance, created, **kwargs):
+    if created:
+        refresh_recipes([instance.user_id], [instance.recipe_id])
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(instance, **kwargs):
+    # Одна строка корзины. Массовые удаления (menu.user_recipes)
+    # пересчитывают список покупок сами, один раз на все рецепты.
+    if bulk_change.get():
+        return
+    # Ингридиенты запоминаются до удаления: при удалении рецепта
+    # его RecipeIngredient могут быть удалены раньше строки корзины.
+    ingredient_ids = recipe_ingredient_ids([instance.recipe_id])
+    transaction.on_commit(
+        lambda: refresh([instance.user_id], ingredient_ids)
+    )
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def update_recipe_ingredient_shopping_lists(instance, **kwargs):
+    refresh_recipe_ingredients(instance.recipe_id, [instance.ingredient_id])
@@ -0,0 +1,352 @@
+import os
+import shutil
+import tempfile
+import threading
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from user.models import Subscription, User
+from .counters import recalculate_counters
+from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                     ShoppingCart, TimelineEntry)
+from .recipe_match_index import RecipeMatchIndex, match_in_database
+from .timeline import Timeline, rebuild_timelines
+
+TEST_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def tearDownModule():
+    shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
+
+
+def image_file(color='orange'):
+    buffer = BytesIO()
+    Image.new('RGB', (400, 300), color).save(buffer, 'PNG')
+    return SimpleUploadedFile('recipe.png', buffer.getvalue(),
+                              content_type='image/png')
+
+
+class ImportIngredientsTests(TestCase):
+    """Команда import_ingredients."""
+
+    def import_file(self, content, suffix):
+        with tempfile.NamedTemporaryFile(
+            'w', suffix=suffix, encoding='utf-8', delete=False
+        ) as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        stderr = StringIO()
+        call_command('import_ingredients', file.name,
+                     stdout=StringIO(), stderr=stderr)
+        return stderr.getvalue()
+
+    def test_invalid_csv_rows_are_skipped(self):
+        errors = self.import_file('соль,г\nперец\n\n,кг\nсахар,г\n', '.csv')
+        self.assertIn('line 2', errors)
+        self.assertIn('line 4', errors)
+        self.assertEqual(
+            set(Ingredient.objects.values_list('name', flat=True)),
+            {'соль', 'сахар'},
+        )
+
+    def test_invalid_json_items_are_skipped(self):
+        errors = self.import_file(
+            '[{"name": "соль", "measurement_unit": "г"}, {"name": "перец"}]',
+            '.json',
+        )
+        self.assertIn('item 2', errors)
+        self.assertEqual(
+            list(Ingredient.objects.values_list('name', flat=True)), ['соль']
+        )
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class RecipeImageVariantsTests(TestCase):
+    """Варианты картинки рецепта."""
+
+    def setUp(self):
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        self.recipe = Recipe.objects.create(
+            author=author, name='Суп', text='Суп', cooking_time=10,
+            image=image_file(),
+        )
+
+    def variant_paths(self, recipe):
+        return [recipe.image_thumbnail.path, recipe.image_medium.path]
+
+    def test_variants_are_created(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        for path in self.variant_paths(recipe):
+            self.assertTrue(os.path.exists(path))
+
+    def test_unchanged_image_keeps_variants(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        thumbnail = recipe.image_thumbnail.name
+        recipe.name = 'Борщ'
+        recipe.save()
+        self.assertEqual(recipe.image_thumbnail.name, thumbnail)
+
+    def test_superseded_variants_are_deleted(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        old_paths = self.variant_paths(recipe)
+        recipe.image = image_file('green')
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        for path in old_paths:
+            self.assertFalse(os.path.exists(path))
+        for path in self.variant_paths(recipe):
+            self.assertTrue(os.path.exists(path))
+
+    def test_regenerating_all_deletes_old_variants(self):
+        old_paths = self.variant_paths(self.recipe)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('make_image_variants', '--all', stdout=StringIO())
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        for path in old_paths:
+            self.assertFalse(os.path.exists(path))
+        for path in self.variant_paths(recipe):
+            self.assertTrue(os.path.exists(path))
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class CounterTests(TestCase):
+    """Денормализованные счетчики рецептов и пользователей."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        cls.reader = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Суп', text='Суп', cooking_time=10,
+            image=image_file(),
+        )
+
+    def counters(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        author = User.objects.get(pk=self.author.pk)
+        return {
+            'favorites_count': recipe.favorites_count,
+            'shopping_cart_count': recipe.shopping_cart_count,
+            'recipes_count': author.recipes_count,
+            'followers_count': author.followers_count,
+        }
+
+    def test_counters_follow_relations(self):
+        self.assertEqual(self.counters(), {
+            'favorites_count': 0, 'shopping_cart_count': 0,
+            'recipes_count': 1, 'followers_count': 0,
+        })
+        favorite = Favorite.objects.create(user=self.reader,
+                                           recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.reader, recipe=self.recipe)
+        subscription = Subscription.objects.create(user=self.reader,
+                                                   author=self.author)
+        self.assertEqual(self.counters(), {
+            'favorites_count': 1, 'shopping_cart_count': 1,
+            'recipes_count': 1, 'followers_count': 1,
+        })
+        favorite.delete()
+        subscription.delete()
+        Recipe.objects.filter(pk=self.recipe.pk).delete()
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).recipes_count, 0
+        )
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).followers_count, 0
+        )
+
+    def test_saving_stale_object_keeps_counters(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        author = User.objects.get(pk=self.author.pk)
+        Favorite.objects.create(user=self.reader, recipe=self.recipe)
+        Subscription.objects.create(user=self.reader, author=self.author)
+        recipe.name = 'Борщ'
+        recipe.save(update_fields=recipe.fields_without_denormalized())
+        author.first_name = 'Анна'
+        author.save(update_fields=author.fields_without_denormalized())
+        self.assertEqual(self.counters()['favorites_count'], 1)
+        self.assertEqual(self.counters()['followers_count'], 1)
+        self.assertEqual(Recipe.objects.get(pk=self.recipe.pk).name, 'Борщ')
+
+    def test_recalculate_counters(self):
+        Favorite.objects.bulk_create([
+            Favorite(user=self.reader, recipe=self.recipe)
+        ])
+        User.objects.filter(pk=self.author.pk).update(recipes_count=5)
+        fixed = recalculate_counters()
+        self.assertEqual(fixed['recipe.favorites_count'], 1)
+        self.assertEqual(fixed['user.recipes_count'], 1)
+        self.assertEqual(self.counters()['favorites_count'], 1)
+        self.assertEqual(self.counters()['recipes_count'], 1)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class RecipeMatchIndexTests(TestCase):
+    """Инвертированный индекс для подбора рецептов по ингридиентам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'Ингредиент {number}',
+                                      measurement_unit='г')
+            for number in range(4)
+        ]
+        cls.recipes = [
+            Recipe.objects.create(author=cls.author, name=f'Рецепт {number}',
+                                  text='Текст', cooking_time=10,
+                                  image=image_file())
+            for number in range(3)
+        ]
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+            for recipe, ingredients in zip(cls.recipes, (
+                cls.ingredients[:2], cls.ingredients[1:3], cls.ingredients[3:]
+            ))
+            for ingredient in ingredients
+        ])
+
+    def assertMatchesDatabase(self, index):
+        for ingredients in ([0], [1], [1, 2], [0, 3], [0, 1, 2, 3]):
+            ids = [self.ingredients[number].pk for number in ingredients]
+            self.assertEqual(index.match(ids), match_in_database(ids))
+
+    def test_refresh_follows_recipe_ingredients(self):
+        index = RecipeMatchIndex()
+        self.assertMatchesDatabase(index)
+        first, second, third = self.recipes
+        recipe_ids = [recipe.pk for recipe in self.recipes]
+        RecipeIngredient.objects.filter(recipe=first).delete()
+        RecipeIngredient.objects.create(
+            recipe=first, ingredient=self.ingredients[3], amount=1
+        )
+        RecipeIngredient.objects.create(
+            recipe=third, ingredient=self.ingredients[0], amount=1
+        )
+        second.delete()
+        index.refresh(recipe_ids)
+        self.assertMatchesDatabase(index)
+
+    def test_changes_during_build_are_applied(self):
+        index = RecipeMatchIndex()
+        build = index._build
+
+        def build_and_change():
+            data = build()
+            RecipeIngredient.objects.create(
+                recipe=self.recipes[2], ingredient=self.ingredients[0],
+                amount=1,
+            )
+            index.refresh([self.recipes[2].pk])
+            return data
+
+        with mock.patch.object(index, '_build', build_and_change):
+            index.match([])
+        self.assertMatchesDatabase(index)
+
+    def test_refresh_reads_outside_lock(self):
+        index = RecipeMatchIndex()
+        index.match([])
+        read = index._read
+        recipe_id = self.recipes[2].pk
+
+        def try_lock():
+            acquired.append(index._lock.acquire(blocking=False))
+            if acquired[-1]:
+                index._lock.release()
+
+        def read_and_change(recipe_ids):
+            data = read(recipe_ids)
+            thread = threading.Thread(target=try_lock)
+            thread.start()
+            thread.join()
+            if recipe_ids == [recipe_id]:
+                # Более позднее чтение успевает обновить рецепт раньше.
+                RecipeIngredient.objects.create(
+                    recipe=self.recipes[2], ingredient=self.ingredients[0],
+                    amount=1,
+                )
+                index.refresh([recipe_id, self.recipes[0].pk])
+            return data
+
+        acquired = []
+        with mock.patch.object(index, '_read', read_and_change):
+            index.refresh([recipe_id])
+        self.assertEqual(acquired, [True, True])
+        self.assertMatchesDatabase(index)
+
+
+@override_settings(MEDIA_ROOT=TEST_MEDIA_ROOT)
+class TimelineTests(TestCase):
+    """Лента рецептов авторов, на которых подписан пользователь."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.other, cls.reader = [
+            User.objects.create_user(
+                username=name, email=f'{name}@example.com', password='pass'
+            )
+            for name in ('author', 'other', 'reader')
+        ]
+
+    def create_recipe(self, author, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Recipe.objects.create(
+                author_id=author.pk, name=name, text=name, cooking_time=10,
+                image=image_file(),
+            )
+
+    def feed(self, user=None):
+        timeline = Timeline(user or self.reader, Recipe.objects.all())
+        return [recipe.name for recipe in timeline.page(None, False, 10)]
+
+    def test_subscription_backfills_and_new_recipes_fan_out(self):
+        self.create_recipe(self.author, 'Суп')
+        self.create_recipe(self.other, 'Чай')
+        Subscription.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.feed(), ['Суп'])
+        self.create_recipe(self.author, 'Каша')
+        self.create_recipe(self.other, 'Кофе')
+        self.assertEqual(self.feed(), ['Каша', 'Суп'])
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 2
+        )
+
+    def test_unfollow_clears_timeline(self):
+        Subscription.objects.create(user=self.reader, author=self.author)
+        Subscription.objects.create(user=self.reader, author=self.other)
+        self.create_recipe(self.author, 'Суп')
+        self.create_recipe(self.other, 'Чай')
+        Subscription.objects.get(user=self.reader, author=self.author).delete()
+        self.assertEqual(self.feed(), ['Чай'])
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader, author=self.author
+        ).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_authors_are_merged_on_read(self):
+        Subscription.objects.create(user=self.reader, author=self.author)
+        self.create_recipe(self.author, 'Суп')
+        self.create_recipe(self.author, 'Каша')
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), ['Каша', 'Суп'])
+
+    def test_rebuild_timelines(self):
+        Subscription.objects.create(user=self.reader, author=self.author)
+        self.create_recipe(self.author, 'Суп')
+        TimelineEntry.objects.all().delete()
+        self.assertEqual(rebuild_timelines(), 1)
+        self.assertEqual(self.feed(), ['Суп'])
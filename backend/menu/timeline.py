@@ -0,0 +1,126 @@
+from heapq import merge
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+
+from user.models import Subscription
+from .models import Recipe, TimelineEntry
+
+REBUILD_SQL = (
+    'INSERT INTO menu_timelineentry (user_id, recipe_id, author_id, pub_date) '
+    'SELECT s.user_id, r.id, r.author_id, r.pub_date '
+    'FROM user_subscription s '
+    'JOIN user_user a ON a.id = s.author_id '
+    'JOIN menu_recipe r ON r.author_id = s.author_id '
+    'WHERE a.followers_count <= %s'
+)
+
+
+def fans_out_on_write(author):
+    """Рецепты автора раскладываются по лентам подписчиков при записи."""
+    return author.followers_count <= settings.TIMELINE_FANOUT_LIMIT
+
+
+def fan_out(recipe):
+    """Добавляет рецепт в ленты подписчиков автора пачками."""
+    if not fans_out_on_write(recipe.author):
+        return
+    followers = Subscription.objects.filter(
+        author_id=recipe.author_id
+    ).values_list('user_id', flat=True).order_by()
+    followers = followers.iterator(chunk_size=settings.TIMELINE_BATCH_SIZE)
+    while True:
+        batch = list(islice(followers, settings.TIMELINE_BATCH_SIZE))
+        if not batch:
+            break
+        TimelineEntry.objects.bulk_create([
+            TimelineEntry(user_id=user_id, recipe_id=recipe.pk,
+                          author_id=recipe.author_id,
+                          pub_date=recipe.pub_date)
+            for user_id in batch
+        ], ignore_conflicts=True)
+
+
+def backfill(subscription):
+    """Добавляет в ленту нового подписчика уже опубликованные рецепты."""
+    if not fans_out_on_write(subscription.author):
+        return
+    recipes = Recipe.objects.filter(
+        author_id=subscription.author_id
+    ).values_list('id', 'pub_date').order_by()
+    TimelineEntry.objects.bulk_create([
+        TimelineEntry(user_id=subscription.user_id, recipe_id=recipe_id,
+                      author_id=subscription.author_id, pub_date=pub_date)
+        for recipe_id, pub_date in recipes.iterator()
+    ], batch_size=settings.TIMELINE_BATCH_SIZE, ignore_conflicts=True)
+
+
+def unfollow(subscription):
+    TimelineEntry.objects.filter(
+        user_id=subscription.user_id, author_id=subscription.author_id
+    ).delete()
+
+
+def rebuild_timelines(using='default'):
+    """Заполняет ленты всех пользователей заново одним INSERT ... SELECT."""
+    TimelineEntry.objects.using(using).all().delete()
+    with connections[using].cursor() as cursor:
+        cursor.execute(REBUILD_SQL, [settings.TIMELINE_FANOUT_LIMIT])
+        return cursor.rowcount
+
+
+def keyset(queryset, position, reverse, date_field, id_field):
+    """(pub_date, id) записей queryset после position в порядке ленты."""
+    if reverse:
+        ordering = (date_field, id_field)
+    else:
+        ordering = (f'-{date_field}', f'-{id_field}')
+    if position is not None:
+        pub_date, pk = position
+        lookup = 'gt' if reverse else 'lt'
+        queryset = queryset.filter(
+            Q(**{f'{date_field}__{lookup}': pub_date})
+            | Q(**{date_field: pub_date, f'{id_field}__{lookup}': pk})
+        )
+    return queryset.order_by(*ordering).values_list(date_field, id_field)
+
+
+class Timeline:
+    """
+    Лента рецептов авторов, на которых подписан пользователь.
+    Читаются только записи ленты пользователя; рецепты авторов
+    с числом подписчиков больше TIMELINE_FANOUT_LIMIT в ленты
+    не раскладываются и подмешиваются при чтении.
+    """
+
+    def __init__(self, user, recipes):
+        self.user = user
+        self.recipes = recipes
+
+    def page(self, position, reverse, limit):
+        """
+        limit рецептов после position (pub_date, id) по убыванию даты,
+        при reverse - до position по возрастанию.
+        """
+        entries = keyset(
+            TimelineEntry.objects.filter(user=self.user),
+            position, reverse, 'pub_date', 'recipe_id',
+        )
+        fan_out_on_read = keyset(
+            Recipe.objects.filter(author__in=Subscription.objects.filter(
+                user=self.user,
+                author__followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+            ).values('author')),
+            position, reverse, 'pub_date', 'id',
+        )
+        keys = []
+        for key in merge(entries[:limit], fan_out_on_read[:limit],
+                         reverse=not reverse):
+            # Рецепт автора, перешедшего порог, может быть в обоих списках.
+            if not keys or keys[-1] != key:
+                keys.append(key)
+        keys = keys[:limit]
+        recipes = self.recipes.in_bulk([pk for _, pk in keys])
+        return [recipes[pk] for _, pk in keys if pk in recipes]
@@ -0,0 +1,88 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .counters import update_counters
+from .models import Recipe, ShoppingCart
+from .shopping_list import refresh, refresh_recipes
+
+# Результаты добавления и удаления рецептов по каждому id.
+ADDED = 'added'
+ALREADY_ADDED = 'already_added'
+REMOVED = 'removed'
+NOT_ADDED = 'not_added'
+NOT_FOUND = 'not_found'
+
+# Пока True, сигналы избранного и корзины не пересчитывают счетчики
+# и список покупок на каждую строку: массовые операции делают это
+# один раз для всех рецептов.
+bulk_change = ContextVar('bulk_change', default=False)
+
+
+@contextmanager
+def _bulk_change():
+    token = bulk_change.set(True)
+    try:
+        yield
+    finally:
+        bulk_change.reset(token)
+
+
+def _recipes(model, user, recipe_ids):
+    """Существующие рецепты из recipe_ids: id -> есть ли он у user."""
+    return dict(Recipe.objects.filter(pk__in=recipe_ids).annotate(
+        added=Exists(model.objects.filter(user=user, recipe=OuterRef('pk')))
+    ).order_by().values_list('pk', 'added'))
+
+
+def add_recipes(model, user, recipe_ids):
+    """
+    Добавляет рецепты recipe_ids в избранное или список покупок
+    (model) пользователя. Возвращает результат по каждому id.
+    """
+    recipes = _recipes(model, user, recipe_ids)
+    new = [pk for pk, added in recipes.items() if not added]
+    with transaction.atomic():
+        model.objects.bulk_create(
+            [model(user=user, recipe_id=pk) for pk in new],
+            ignore_conflicts=True,
+        )
+        update_counters(model, new)
+        if model is ShoppingCart:
+            refresh_recipes([user.pk], new)
+    return {
+        pk: NOT_FOUND if pk not in recipes
+        else ALREADY_ADDED if recipes[pk] else ADDED
+        for pk in recipe_ids
+    }
+
+
+def remove_recipes(model, user, recipe_ids):
+    """Удаляет рецепты recipe_ids, возвращает результат по каждому id."""
+    recipes = _recipes(model, user, recipe_ids)
+    removed = [pk for pk, added in recipes.items() if added]
+    with transaction.atomic(), _bulk_change():
+        model.objects.filter(user=user, recipe_id__in=removed).delete()
+        update_counters(model, removed)
+        if model is ShoppingCart:
+            refresh_recipes([user.pk], removed)
+    return {
+        pk: NOT_FOUND if pk not in recipes
+        else REMOVED if recipes[pk] else NOT_ADDED
+        for pk in recipe_ids
+    }
+
+
+def clear_recipes(model, user):
+    """Удаляет все рецепты пользователя, возвращает их число."""
+    with transaction.atomic(), _bulk_change():
+        removed = list(model.objects.select_for_update().filter(
+            user=user
+        ).values_list('recipe_id', flat=True))
+        model.objects.filter(user=user, recipe_id__in=removed).delete()
+        update_counters(model, removed)
+        if model is ShoppingCart:
+            refresh([user.pk])
+    return len(removed)
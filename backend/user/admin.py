@@ -1,20 +1,35 @@
-from django.contrib import admin
-
-from .models import User, Subscription
-
-
-class UserAdmin(admin.ModelAdmin):
-    list_display = ('username',
-                    'email',
-                    'id',
-                    'first_name',
-                    'last_name',
-                    'role',)
-    search_fields = ('username', 'email')
-    list_filter = ('username', 'email')
-    list_editable = ('email', )
-    empty_value_display = '-пусто-'
-
-
-admin.site.register(User, UserAdmin)
-admin.site.register(Subscription)
+from django.contrib import admin
+
+from backend.denormalized_fields import DenormalizedFieldsAdminMixin
+from menu.paginators import EstimatedCountPaginator
+from .models import User, Subscription
+
+
+class UserAdmin(DenormalizedFieldsAdminMixin, admin.ModelAdmin):
+    list_display = ('username',
+                    'email',
+                    'id',
+                    'first_name',
+                    'last_name',
+                    'role',
+                    'recipes_count',
+                    'followers_count',)
+    search_fields = ('username', 'email')
+    list_filter = ('role',)
+    list_editable = ('email', )
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+class SubscriptionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'author')
+    list_select_related = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+    autocomplete_fields = ('user', 'author')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+admin.site.register(User, UserAdmin)
+admin.site.register(Subscription, SubscriptionAdmin)
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+
+class Command(BaseCommand):
+    help = 'Delete expired auth tokens in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Number of tokens deleted per query')
+        parser.add_argument('--sleep', type=float, default=0,
+                            help='Pause between batches in seconds')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be positive')
+        cutoff = timezone.now() - settings.AUTH_TOKEN_TTL
+        expired = Token.objects.filter(created__lt=cutoff)
+        deleted = 0
+        while True:
+            keys = list(expired.values_list('key', flat=True)[:batch_size])
+            if not keys:
+                break
+            Token.objects.filter(key__in=keys).delete()
+            deleted += len(keys)
+            self.stdout.write(f'{deleted} tokens deleted')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} expired tokens'
+        ))
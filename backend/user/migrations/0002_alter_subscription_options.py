@@ -1,17 +1,17 @@
-# Generated by Django 3.2 on 2024-01-22 08:58
-
-from django.db import migrations
-
-
-class Migration(migrations.Migration):
-
-    dependencies = [
-        ('user', '0001_initial'),
-    ]
-
-    operations = [
-        migrations.AlterModelOptions(
-            name='subscription',
-            options={'verbose_name': 'Подписка', 'verbose_name_plural': 'Подписки'},
-        ),
-    ]
+# Generated by Django 3.2 on 2024-01-22 08:58
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='subscription',
+            options={'verbose_name': 'Подписка', 'verbose_name_plural': 'Подписки'},
+        ),
+    ]